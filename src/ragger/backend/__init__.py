@@ -14,6 +14,7 @@
    limitations under the License.
 """
 from .interface import BackendInterface, RaisePolicy
+from .async_interface import AsyncBackendInterface
 from .stub import StubBackend
 
 
@@ -54,7 +55,29 @@ except ImportError as e:
                              "https://github.com/LedgerHQ/ledgerctl/"))
 
 
+try:
+    from .async_speculos import AsyncSpeculosBackend
+except ImportError as e:
+    if "httpx" not in str(e) and "speculos" not in str(e):
+        raise e
+
+    def AsyncSpeculosBackend(*args, **kwargs):  # type: ignore
+        raise ImportError(
+            ERROR_MSG.format("Speculos and HTTPX", "speculos_async",
+                             "https://github.com/LedgerHQ/speculos/"))
+
+
+try:
+    from .replay import ReplayBackend
+except ImportError as e:
+    if "PIL" not in str(e):
+        raise e
+
+    def ReplayBackend(*args, **kwargs):  # type: ignore
+        raise ImportError(ERROR_MSG.format("Pillow", "speculos", "https://python-pillow.org/"))
+
+
 __all__ = [
     "SpeculosBackend", "LedgerCommBackend", "LedgerWalletBackend", "BackendInterface",
-    "RaisePolicy", "StubBackend"
+    "RaisePolicy", "StubBackend", "AsyncBackendInterface", "AsyncSpeculosBackend", "ReplayBackend"
 ]
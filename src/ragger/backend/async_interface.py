@@ -0,0 +1,283 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from time import monotonic
+from types import TracebackType
+from typing import Any, AsyncContextManager, Callable, List, Optional, Type, \
+    TYPE_CHECKING
+
+from ragger.firmware import Firmware
+from ragger.logger import get_default_logger, get_apdu_logger, set_apdu_logger_file
+from ragger.utils import pack_APDU, RAPDU, Crop
+from ragger.utils.apdu_trace import ApduTraceRecorder
+from .interface import RaisePolicy
+
+if TYPE_CHECKING:
+    from ragger.utils.golden_set import GoldenSet, Key
+
+
+class AsyncBackendInterface(ABC):
+    """
+    The asyncio counterpart of :class:`BackendInterface
+    <ragger.backend.interface.BackendInterface>`.
+
+    Every device interaction is a coroutine, so that a single event loop can
+    drive many devices at once. The semantic of each method is the same as its
+    synchronous counterpart.
+    """
+
+    # Level of the APDU log records
+    _APDU_LOG_LEVEL = logging.INFO
+
+    def __init__(self, firmware: Firmware, log_apdu_file: Optional[Path] = None):
+        """Initializes the Backend
+
+        :param firmware: Which Firmware will be managed
+        :type firmware: Firmware
+        """
+        self._firmware = firmware
+        self._last_async_response: Optional[RAPDU] = None
+        self.raise_policy = RaisePolicy.RAISE_ALL_BUT_0x9000
+
+        if log_apdu_file:
+            set_apdu_logger_file(log_apdu_file=log_apdu_file)
+
+        self.logger = get_default_logger()
+        self.apdu_logger = get_apdu_logger()
+        # Optional binary trace of every exchanged APDU
+        self.apdu_trace: Optional[ApduTraceRecorder] = None
+        # Text log of the exchanged APDUs (apdu_logger). It can be turned off,
+        # typically when the binary trace is enough, so that APDUs are not
+        # formatted at all: the ragger loggers are enabled by default.
+        self.apdu_text_log = True
+        # Optional frame comparator used to compare screenshots with golden
+        # snapshots (see ragger.utils.image_diff), instead of an exact comparison
+        self.image_comparator: Optional[Callable[..., bool]] = None
+
+    def _log_apdu_command(self, data: bytes) -> None:
+        if self.apdu_trace is not None:
+            self.apdu_trace.record_command(data)
+        # Hex formatting is skipped when nothing consumes the APDU log
+        if self.apdu_text_log and self.apdu_logger.isEnabledFor(self._APDU_LOG_LEVEL):
+            self.apdu_logger.log(self._APDU_LOG_LEVEL, "=> %s", data.hex())
+
+    def _log_apdu_response(self, rapdu: RAPDU) -> None:
+        if self.apdu_trace is not None:
+            self.apdu_trace.record_response(rapdu)
+        if self.apdu_text_log and self.apdu_logger.isEnabledFor(self._APDU_LOG_LEVEL):
+            self.apdu_logger.log(self._APDU_LOG_LEVEL, "<= %s%4x", rapdu.data.hex(), rapdu.status)
+
+    @property
+    def firmware(self) -> Firmware:
+        """
+        :return: The currently managed Firmware.
+        :rtype: Firmware
+        """
+        return self._firmware
+
+    @property
+    def last_async_response(self) -> Optional[RAPDU]:
+        """
+        :return: The last RAPDU received after a call to `exchange_async` or
+                 `exchange_async_raw`.
+        :rtype: RAPDU
+        """
+        return self._last_async_response
+
+    @abstractmethod
+    async def __aenter__(self) -> "AsyncBackendInterface":
+        raise NotImplementedError
+
+    @abstractmethod
+    async def __aexit__(self, exc_type: Optional[Type[BaseException]],
+                        exc_val: Optional[BaseException], exc_tb: Optional[TracebackType]):
+        raise NotImplementedError
+
+    def is_raise_required(self, rapdu: RAPDU) -> bool:
+        """
+        :return: If the given status is considered valid or not
+        :rtype: bool
+        """
+        return ((self.raise_policy == RaisePolicy.RAISE_ALL)
+                or ((self.raise_policy == RaisePolicy.RAISE_ALL_BUT_0x9000) and
+                    (rapdu.status != 0x9000)))
+
+    async def send(self, cla: int, ins: int, p1: int = 0, p2: int = 0, data: bytes = b"") -> None:
+        """
+        Formats then sends an APDU to the backend.
+        """
+        await self.send_raw(pack_APDU(cla, ins, p1, p2, data))
+
+    @abstractmethod
+    async def send_raw(self, data: bytes = b"") -> None:
+        """
+        Sends the given APDU to the backend.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def receive(self) -> RAPDU:
+        """
+        Receives a response APDU from the backend.
+
+        :raises ExceptionRAPDU: Depending on the raise policy
+        """
+        raise NotImplementedError
+
+    async def exchange(self,
+                       cla: int,
+                       ins: int,
+                       p1: int = 0,
+                       p2: int = 0,
+                       data: bytes = b"") -> RAPDU:
+        """
+        Formats and sends an APDU to the backend, then receives its response.
+
+        :raises ExceptionRAPDU: Depending on the raise policy
+        """
+        return await self.exchange_raw(pack_APDU(cla, ins, p1, p2, data))
+
+    @abstractmethod
+    async def exchange_raw(self, data: bytes = b"") -> RAPDU:
+        """
+        Sends the given APDU to the backend, then receives its response.
+
+        :raises ExceptionRAPDU: Depending on the raise policy
+        """
+        raise NotImplementedError
+
+    async def exchange_many(self, apdus: List[bytes], stop_on_error: bool = True) -> List[RAPDU]:
+        """
+        Sends the given APDUs one after the other (see :meth:`BackendInterface.exchange_many
+        <ragger.backend.interface.BackendInterface.exchange_many>`).
+        """
+        rapdus: List[RAPDU] = list()
+        for apdu in apdus:
+            rapdu = await self.exchange_raw(apdu)
+            rapdus.append(rapdu)
+            if stop_on_error and rapdu.status != 0x9000:
+                break
+        return rapdus
+
+    def exchange_async(self,
+                       cla: int,
+                       ins: int,
+                       p1: int = 0,
+                       p2: int = 0,
+                       data: bytes = b"") -> AsyncContextManager[None]:
+        """
+        Formats and sends an APDU to the backend, then gives the control back to
+        the caller (``async with backend.exchange_async(...):``). The response
+        is available in `last_async_response` once the context is exited.
+
+        :raises ExceptionRAPDU: Depending on the raise policy
+        """
+        return self.exchange_async_raw(pack_APDU(cla, ins, p1, p2, data))
+
+    @abstractmethod
+    def exchange_async_raw(self, data: bytes = b"") -> AsyncContextManager[None]:
+        """
+        Sends the given APDU to the backend, then gives the control back to the
+        caller (``async with backend.exchange_async_raw(...):``).
+
+        :raises ExceptionRAPDU: Depending on the raise policy
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def right_click(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def left_click(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def both_click(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def finger_touch(self, x: int = 0, y: int = 0, delay: float = 0.5) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def compare_screen_with_snapshot(self,
+                                           golden_snap_path: Path,
+                                           crop: Optional[Crop] = None,
+                                           tmp_snap_path: Optional[Path] = None,
+                                           golden_run: bool = False) -> bool:
+        raise NotImplementedError
+
+    async def match_screen_with_snapshots(self, goldens: "GoldenSet[Key]") -> Optional["Key"]:
+        """
+        Identify the current device screen among a set of snapshots, with a
+        single screenshot (see :meth:`BackendInterface.match_screen_with_snapshots
+        <ragger.backend.interface.BackendInterface.match_screen_with_snapshots>`).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def wait_for_screen_change(self, timeout: float = 10.0) -> None:
+        """
+        Wait until the screen content changes compared to the last reference
+        stored internally by the backend.
+
+        :raises TimeoutError: If the screen does not change in time
+        """
+        raise NotImplementedError
+
+    async def wait_for_home_screen(self, timeout: float = 10.0) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def compare_screen_with_text(self, text: str) -> bool:
+        raise NotImplementedError
+
+    async def wait_for_text_on_screen(self, text: str, timeout: float = 10.0) -> None:
+        """
+        Wait until the screen content contains the text string provided.
+
+        :raises TimeoutError: If the text is not displayed in time
+        """
+        if await self.compare_screen_with_text(text):
+            return
+
+        endtime = monotonic() + timeout
+        while True:
+            await self.wait_for_screen_change(endtime - monotonic())
+            if await self.compare_screen_with_text(text):
+                return
+
+    async def wait_for_text_not_on_screen(self, text: str, timeout: float = 10.0) -> None:
+        """
+        Wait until the screen content does not contain the text string provided.
+
+        :raises TimeoutError: If the text is still displayed after timeout
+        """
+        if not await self.compare_screen_with_text(text):
+            return
+
+        endtime = monotonic() + timeout
+        while True:
+            await self.wait_for_screen_change(endtime - monotonic())
+            if not await self.compare_screen_with_text(text):
+                return
+
+    @abstractmethod
+    async def get_current_screen_content(self) -> Any:
+        raise NotImplementedError
@@ -0,0 +1,551 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from io import BytesIO
+from json import dumps
+from pathlib import Path
+from time import monotonic
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+import httpx
+
+from ragger.error import ExceptionRAPDU
+from ragger.firmware import Firmware
+from ragger.utils import RAPDU, Crop
+from ragger.utils.golden_set import GoldenSet, Key
+from ragger.utils.screenshot import Frame, GoldenCache, GOLDEN_CACHE, compare_with_golden, \
+    decode_frame
+from ragger.utils.snapshot_store import SNAPSHOT_STORES
+from .async_interface import AsyncBackendInterface
+from .speculos import SettleStats, StartupTimings, _backoff
+
+
+class AsyncSpeculosBackend(AsyncBackendInterface):
+    """
+    An asyncio Speculos backend, talking to the Speculos REST API through an
+    `httpx.AsyncClient`.
+
+    The Speculos process, the APDU exchanges and the screen events stream are
+    all driven by the running event loop, so that one loop can drive many
+    instances at once (each one on its own ports). Only the CPU bound work
+    (screenshot decoding, snapshot comparisons) is run in the loop default
+    executor.
+
+    As with :class:`SpeculosBackend <ragger.backend.SpeculosBackend>`, the
+    startup is split into timed phases probed with an exponential backoff, and
+    detected screen changes are followed by a wait for stable frames.
+    """
+
+    # Without any event, the screen is still checked periodically, as some
+    # screen changes (images only) do not trigger text events.
+    _EVENTS_POLL_FALLBACK = 1.0
+
+    def __init__(self,
+                 application: Path,
+                 firmware: Firmware,
+                 host: str = "127.0.0.1",
+                 port: int = 5000,
+                 apdu_port: int = 9999,
+                 log_apdu_file: Optional[Path] = None,
+                 args: Optional[List[str]] = None,
+                 use_events_stream: bool = True,
+                 events_settle_window: float = 0.1,
+                 golden_cache: GoldenCache = GOLDEN_CACHE,
+                 startup_timeout: float = 20.0,
+                 startup_backoff_initial: float = 0.005,
+                 startup_backoff_max: float = 0.25,
+                 settle_frames: int = 3,
+                 settle_interval: float = 0.02,
+                 settle_timeout: float = 0.2,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        :param application: Path of the application to run
+        :type application: Path
+        :param firmware: Which Firmware will be emulated
+        :type firmware: Firmware
+        :param host: Host the Speculos API listens on
+        :type host: str
+        :param port: Speculos REST API TCP port
+        :type port: int
+        :param apdu_port: Speculos APDU TCP port
+        :type apdu_port: int
+        :param args: Additional Speculos command line arguments
+        :type args: List[str]
+        :param transport: Optional HTTP transport replacing the network one
+        :type transport: httpx.AsyncBaseTransport
+        """
+        super().__init__(firmware=firmware, log_apdu_file=log_apdu_file)
+        self._application = application
+        self._host = host
+        self._port = port
+        self._apdu_port = apdu_port
+        self._args = ["--model", firmware.device, "--display", "headless"]
+        # Ports are explicit so that several instances can run side by side
+        extra_args = list(args or [])
+        for option, value in (("--api-port", port), ("--apdu-port", apdu_port)):
+            if option not in extra_args:
+                self._args += [option, str(value)]
+        self._args += extra_args
+        self._use_events_stream = use_events_stream
+        self._events_settle_window = events_settle_window
+        self._golden_cache = golden_cache
+        self._startup_timeout = startup_timeout
+        self._startup_backoff = (startup_backoff_initial, startup_backoff_max)
+        self._startup_timings: Optional[StartupTimings] = None
+        assert settle_frames >= 2, "At least 2 identical frames are needed to detect a stable screen"
+        self._settle_frames = settle_frames
+        self._settle_interval = settle_interval
+        self._settle_timeout = settle_timeout
+        self._settle_stats = SettleStats()
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._pending: Optional["asyncio.Future[RAPDU]"] = None
+        self._last_screenshot: Optional[Frame] = None
+        self._home_screenshot: Optional[Frame] = None
+        self._events_task: Optional["asyncio.Task[None]"] = None
+        self._events_condition: Optional[asyncio.Condition] = None
+        self._events_available = False
+        self._events_sequence = 0
+        self._last_event_time = 0.0
+        # Events sequence number when _last_screenshot was taken
+        self._last_screenshot_sequence = 0
+
+    @property
+    def port(self) -> int:
+        """
+        :return: The Speculos REST API TCP port
+        :rtype: int
+        """
+        return self._port
+
+    @property
+    def url(self) -> str:
+        return f"http://{self._host}:{self._port}"
+
+    @property
+    def events_stream_available(self) -> bool:
+        """
+        :return: True if screen changes are detected through the Speculos
+                 events stream, False if they are detected by polling
+                 screenshots.
+        :rtype: bool
+        """
+        return self._events_available
+
+    @property
+    def events_sequence(self) -> int:
+        """
+        :return: The number of screen events received from the Speculos events
+                 stream so far.
+        :rtype: int
+        """
+        return self._events_sequence
+
+    @property
+    def startup_timings(self) -> Optional[StartupTimings]:
+        """
+        :return: The duration of each phase of the last backend startup, or
+                 None if the backend has not been started.
+        :rtype: StartupTimings
+        """
+        return self._startup_timings
+
+    @property
+    def settle_stats(self) -> SettleStats:
+        """
+        :return: Statistics on the time needed by the screen to settle after
+                 a detected change.
+        :rtype: SettleStats
+        """
+        return SettleStats(**vars(self._settle_stats))
+
+    def reset_settle_stats(self) -> None:
+        self._settle_stats = SettleStats()
+
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        assert self._http is not None, "The backend has not been started"
+        return self._http
+
+    async def _start_process(self, deadline: float) -> None:
+        self._process = await asyncio.create_subprocess_exec(sys.executable, "-m", "speculos",
+                                                             *self._args, str(self._application))
+
+        async def port_is_open() -> bool:
+            try:
+                _, writer = await asyncio.open_connection(self._host, self._port)
+            except OSError:
+                return False
+            writer.close()
+            await writer.wait_closed()
+            return True
+
+        await self._wait_for_startup_phase("API port", port_is_open, deadline)
+
+    async def _stop_process(self) -> None:
+        process, self._process = self._process, None
+        if process is None or process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), 1.0)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    async def _retrieve_client_screen_content(self) -> dict:
+        response = await self._client.get("/events", params={"currentscreenonly": "true"})
+        response.raise_for_status()
+        # Keep only text events (see SpeculosBackend)
+        events = [
+            event for event in response.json().get("events", []) if event.get("text", "").strip()
+        ]
+        return {"events": events}
+
+    async def _get_screenshot(self) -> Frame:
+        response = await self._client.get("/screenshot")
+        response.raise_for_status()
+        # Decoding is CPU bound: it should not block the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, decode_frame,
+                                                                BytesIO(response.content))
+
+    async def _watch_events(self) -> None:
+        assert self._events_condition is not None
+        try:
+            async with self._client.stream("GET",
+                                           "/events",
+                                           params={"stream": "true"},
+                                           timeout=None) as response:
+                if response.status_code != 200 or \
+                        "text/event-stream" not in response.headers.get("content-type", ""):
+                    return
+                self._events_available = True
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    async with self._events_condition:
+                        self._events_sequence += 1
+                        self._last_event_time = monotonic()
+                        self._events_condition.notify_all()
+        except httpx.HTTPError as e:
+            self.logger.debug(f"Speculos events stream closed: {e}")
+        finally:
+            self._events_available = False
+            async with self._events_condition:
+                # Wake up waiters, so that they fall back to polling
+                self._events_condition.notify_all()
+
+    async def _wait_for_event(self, after: int, timeout: float) -> bool:
+        assert self._events_condition is not None
+        async with self._events_condition:
+            try:
+                await asyncio.wait_for(
+                    self._events_condition.wait_for(
+                        lambda: self._events_sequence > after or not self._events_available),
+                    max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+            return self._events_sequence > after
+
+    async def _wait_for_quiet(self, window: float, timeout: float) -> None:
+        endtime = monotonic() + timeout
+        while self._events_available:
+            remaining = self._last_event_time + window - monotonic()
+            if remaining <= 0 or monotonic() >= endtime:
+                return
+            await asyncio.sleep(min(remaining, max(endtime - monotonic(), 0)))
+
+    async def _wait_for_startup_phase(self, phase: str, ready: Callable[[], Awaitable[bool]],
+                                      deadline: float) -> None:
+        delays = _backoff(*self._startup_backoff)
+        while not await ready():
+            if self._process is not None and self._process.returncode is not None:
+                raise RuntimeError(
+                    f"Speculos exited with code {self._process.returncode} upon start")
+            if monotonic() > deadline:
+                raise TimeoutError(
+                    f"Timeout waiting for {phase} upon Ragger Speculos Instance start")
+            await asyncio.sleep(min(next(delays), max(deadline - monotonic(), 0)))
+
+    async def _wait_for_startup(self, deadline: float, timings: StartupTimings) -> Frame:
+        # Wait until the API answers, then until some text is displayed on the screen.
+        content: dict = {"events": []}
+
+        async def api_is_up() -> bool:
+            nonlocal content
+            try:
+                content = await self._retrieve_client_screen_content()
+                return True
+            except httpx.HTTPError:
+                return False
+
+        async def text_is_displayed() -> bool:
+            nonlocal content
+            if not content["events"]:
+                content = await self._retrieve_client_screen_content()
+            return bool(content["events"])
+
+        start = monotonic()
+        await self._wait_for_startup_phase("API", api_is_up, deadline)
+        timings.api = monotonic() - start
+
+        start = monotonic()
+        await self._wait_for_startup_phase("screen content", text_is_displayed, deadline)
+        timings.text = monotonic() - start
+
+        # Wait until the screen stops changing, so that the home screen reference is complete.
+        screenshot = await self._get_screenshot()
+
+        async def frame_is_stable() -> bool:
+            nonlocal screenshot
+            previous, screenshot = screenshot, await self._get_screenshot()
+            return screenshot == previous
+
+        start = monotonic()
+        try:
+            await self._wait_for_startup_phase("a stable screen", frame_is_stable, deadline)
+        except TimeoutError:
+            # Some screens are animated: not fatal, the last screenshot is used
+            self.logger.warning("Screen still changing upon Ragger Speculos Instance start")
+        timings.frame = monotonic() - start
+        return screenshot
+
+    async def __aenter__(self) -> "AsyncSpeculosBackend":
+        self.logger.info(f"Starting {self.__class__.__name__}")
+        self._http = httpx.AsyncClient(base_url=self.url, transport=self._transport)
+        timings = StartupTimings()
+        deadline = monotonic() + self._startup_timeout
+        try:
+            start = monotonic()
+            await self._start_process(deadline)
+            timings.spawn = monotonic() - start
+            screenshot = await self._wait_for_startup(deadline, timings)
+        except BaseException:
+            await self.__aexit__(None, None, None)
+            raise
+        self._startup_timings = timings
+        self.logger.info(f"{self.__class__.__name__} started in {timings.total:.3f}s "
+                         f"(spawn {timings.spawn:.3f}s, API {timings.api:.3f}s, "
+                         f"text {timings.text:.3f}s, stable frame {timings.frame:.3f}s)")
+
+        self._events_condition = asyncio.Condition()
+        if self._use_events_stream:
+            self._events_task = asyncio.ensure_future(self._watch_events())
+
+        self._last_screenshot_sequence = self._events_sequence
+        self._last_screenshot = screenshot
+        # Save current screenshot as _home_screenshot.
+        self._home_screenshot = self._last_screenshot
+        return self
+
+    async def __aexit__(self, *args):
+        if self._events_task is not None:
+            self._events_task.cancel()
+            try:
+                await self._events_task
+            except asyncio.CancelledError:
+                pass
+            self._events_task = None
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        await self._stop_process()
+
+    def _enforce_raise_policy(self, rapdu: RAPDU) -> RAPDU:
+        self._log_apdu_response(rapdu)
+        if self.is_raise_required(rapdu):
+            raise ExceptionRAPDU(rapdu.status, rapdu.data)
+        return rapdu
+
+    async def _apdu_exchange(self, data: bytes) -> RAPDU:
+        # Speculos answers once the application has replied, which can take a
+        # while if a user interaction is expected
+        response = await self._client.post("/apdu", json={"data": data.hex()}, timeout=None)
+        response.raise_for_status()
+        raw = bytes.fromhex(response.json()["data"])
+        return RAPDU(int.from_bytes(raw[-2:], "big"), raw[:-2])
+
+    async def send_raw(self, data: bytes = b"") -> None:
+        self._log_apdu_command(data)
+        self._pending = asyncio.ensure_future(self._apdu_exchange(data))
+
+    async def receive(self) -> RAPDU:
+        assert self._pending is not None
+        pending, self._pending = self._pending, None
+        return self._enforce_raise_policy(await pending)
+
+    async def exchange_raw(self, data: bytes = b"") -> RAPDU:
+        self._log_apdu_command(data)
+        return self._enforce_raise_policy(await self._apdu_exchange(data))
+
+    @asynccontextmanager
+    async def exchange_async_raw(self, data: bytes = b"") -> AsyncIterator[None]:
+        self._log_apdu_command(data)
+        task = asyncio.ensure_future(self._apdu_exchange(data))
+        try:
+            yield
+        except BaseException:
+            task.cancel()
+            raise
+        self._last_async_response = self._enforce_raise_policy(await task)
+
+    async def _press_and_release(self, button: str) -> None:
+        response = await self._client.post(f"/button/{button}",
+                                           json={"action": "press-and-release"})
+        response.raise_for_status()
+
+    async def right_click(self) -> None:
+        await self._press_and_release("right")
+
+    async def left_click(self) -> None:
+        await self._press_and_release("left")
+
+    async def both_click(self) -> None:
+        await self._press_and_release("both")
+
+    async def finger_touch(self, x: int = 0, y: int = 0, delay: float = 0.5) -> None:
+        response = await self._client.post("/finger",
+                                           json={
+                                               "action": "press-and-release",
+                                               "x": x,
+                                               "y": y,
+                                               "delay": delay
+                                           },
+                                           timeout=delay + 5.0)
+        response.raise_for_status()
+
+    async def compare_screen_with_snapshot(self,
+                                           golden_snap_path: Path,
+                                           crop: Optional[Crop] = None,
+                                           tmp_snap_path: Optional[Path] = None,
+                                           golden_run: bool = False) -> bool:
+        response = await self._client.get("/screenshot")
+        response.raise_for_status()
+        snap = response.content
+
+        # Saving and decoding images is CPU and disk bound: keep it off the event loop
+        loop = asyncio.get_running_loop()
+        store = SNAPSHOT_STORES.lookup(golden_snap_path)
+        for path in (tmp_snap_path, golden_snap_path if golden_run and store is None else None):
+            if path:
+                self.logger.info(f"Saving screenshot to image '{path}'")
+                await loop.run_in_executor(None, Path(path).write_bytes, snap)
+        if store is not None:
+            if golden_run:
+                await loop.run_in_executor(None, store.add, golden_snap_path, BytesIO(snap))
+            return await loop.run_in_executor(None, store.compare, BytesIO(snap), golden_snap_path,
+                                              crop, self._golden_cache, self.image_comparator)
+        return await loop.run_in_executor(None, compare_with_golden, BytesIO(snap),
+                                          golden_snap_path, crop, self._golden_cache,
+                                          self.image_comparator)
+
+    async def match_screen_with_snapshots(self, goldens: GoldenSet[Key]) -> Optional[Key]:
+        response = await self._client.get("/screenshot")
+        response.raise_for_status()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, goldens.match, BytesIO(response.content),
+                                          self.image_comparator)
+
+    async def get_current_screen_content(self) -> dict:
+        return await self._retrieve_client_screen_content()
+
+    async def compare_screen_with_text(self, text: str) -> bool:
+        return text in dumps(await self._retrieve_client_screen_content())
+
+    async def _wait_for_stable_frame(self, screenshot: Frame) -> Tuple[Frame, int]:
+        # See SpeculosBackend._wait_for_stable_frame
+        start = monotonic()
+        sequence = self._events_sequence
+        identical = 1
+        timed_out = False
+        while identical < self._settle_frames:
+            if monotonic() - start >= self._settle_timeout:
+                timed_out = True
+                break
+            await asyncio.sleep(self._settle_interval)
+            current = self._events_sequence
+            previous, screenshot = screenshot, await self._get_screenshot()
+            if current == sequence and screenshot == previous:
+                identical += 1
+            else:
+                identical = 1
+                sequence = current
+        self._settle_stats.add(monotonic() - start, timed_out)
+        return screenshot, sequence
+
+    async def _poll_for_screen_change(self, timeout: float) -> None:
+        endtime = monotonic() + timeout
+        delays = _backoff(self._settle_interval, 0.2)
+        screenshot = await self._get_screenshot()
+        while screenshot == self._last_screenshot:
+            await asyncio.sleep(next(delays))
+            if monotonic() > endtime:
+                raise TimeoutError("Timeout waiting for screen change")
+            screenshot = await self._get_screenshot()
+
+        # Wait for the screen to stop changing before returning
+        screenshot, sequence = await self._wait_for_stable_frame(screenshot)
+        self._last_screenshot_sequence = sequence
+        self._last_screenshot = screenshot
+
+    async def _wait_for_screen_change_event(self, timeout: float) -> None:
+        endtime = monotonic() + timeout
+        sequence = self._last_screenshot_sequence
+        while True:
+            remaining = endtime - monotonic()
+            if not self._events_available:
+                await self._poll_for_screen_change(max(remaining, 0))
+                return
+            received = await self._wait_for_event(sequence,
+                                                  min(remaining, self._EVENTS_POLL_FALLBACK))
+            if received:
+                # Wait for the end of the event batch instead of a fixed delay
+                await self._wait_for_quiet(self._events_settle_window,
+                                           max(endtime - monotonic(), 0))
+            sequence = self._events_sequence
+            screenshot = await self._get_screenshot()
+            if screenshot != self._last_screenshot:
+                if not received:
+                    # Screen changed without any event: nothing tells when the
+                    # redisplay ends, so wait for the screen to stop changing
+                    screenshot, sequence = await self._wait_for_stable_frame(screenshot)
+                self._last_screenshot_sequence = sequence
+                self._last_screenshot = screenshot
+                return
+            if monotonic() > endtime:
+                raise TimeoutError("Timeout waiting for screen change")
+
+    async def wait_for_screen_change(self, timeout: float = 10.0) -> None:
+        if self._events_available:
+            await self._wait_for_screen_change_event(timeout)
+        else:
+            await self._poll_for_screen_change(timeout)
+
+    async def wait_for_home_screen(self, timeout: float = 10.0) -> None:
+        if self._last_screenshot == self._home_screenshot:
+            return
+
+        endtime = monotonic() + timeout
+        while True:
+            await self.wait_for_screen_change(endtime - monotonic())
+            if self._last_screenshot == self._home_screenshot:
+                return
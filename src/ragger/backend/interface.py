@@ -13,18 +13,31 @@
    See the License for the specific language governing permissions and
    limitations under the License.
 """
+import logging
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from enum import Enum, auto
 from pathlib import Path
-from time import time
+from time import monotonic, sleep, time
 from types import TracebackType
-from typing import Optional, Type, Generator, Any
+from typing import Optional, Type, Generator, Any, Callable, Iterable, Iterator, List, Tuple, \
+    TypeVar, TYPE_CHECKING
 
 from ragger.firmware import Firmware
-from ragger.utils import pack_APDU, RAPDU, Crop
+from ragger.utils import pack_APDU, RAPDU, Crop, split_message
+from ragger.utils.apdu_trace import ApduTraceRecorder
+from ragger.utils.profiler import NavigationProfiler
+from ragger.utils.screen_text import ScreenText
 from ragger.logger import get_default_logger, get_apdu_logger, set_apdu_logger_file
 
+if TYPE_CHECKING:
+    from ragger.utils.golden_set import GoldenSet, Key
+
+# Buttons of the press sequences
+BUTTONS = ("left", "right", "both")
+
+T = TypeVar("T")
+
 
 class RaisePolicy(Enum):
     RAISE_NOTHING = auto()
@@ -34,6 +47,9 @@ class RaisePolicy(Enum):
 
 class BackendInterface(ABC):
 
+    # Level of the APDU log records
+    _APDU_LOG_LEVEL = logging.INFO
+
     def __init__(self, firmware: Firmware, log_apdu_file: Optional[Path] = None):
         """Initializes the Backend
 
@@ -49,6 +65,30 @@ class BackendInterface(ABC):
 
         self.logger = get_default_logger()
         self.apdu_logger = get_apdu_logger()
+        # Optional binary trace of every exchanged APDU
+        self.apdu_trace: Optional[ApduTraceRecorder] = None
+        # Text log of the exchanged APDUs (apdu_logger). It can be turned off,
+        # typically when the binary trace is enough, so that APDUs are not
+        # formatted at all: the ragger loggers are enabled by default.
+        self.apdu_text_log = True
+        # Optional navigation profiler, set by the Navigator using this backend
+        self.profiler: Optional[NavigationProfiler] = None
+        # Optional frame comparator used to compare screenshots with golden
+        # snapshots (see ragger.utils.image_diff), instead of an exact comparison
+        self.image_comparator: Optional[Callable[..., bool]] = None
+
+    def _log_apdu_command(self, data: bytes) -> None:
+        if self.apdu_trace is not None:
+            self.apdu_trace.record_command(data)
+        # Hex formatting is skipped when nothing consumes the APDU log
+        if self.apdu_text_log and self.apdu_logger.isEnabledFor(self._APDU_LOG_LEVEL):
+            self.apdu_logger.log(self._APDU_LOG_LEVEL, "=> %s", data.hex())
+
+    def _log_apdu_response(self, rapdu: RAPDU) -> None:
+        if self.apdu_trace is not None:
+            self.apdu_trace.record_response(rapdu)
+        if self.apdu_text_log and self.apdu_logger.isEnabledFor(self._APDU_LOG_LEVEL):
+            self.apdu_logger.log(self._APDU_LOG_LEVEL, "<= %s%4x", rapdu.data.hex(), rapdu.status)
 
     @property
     def firmware(self) -> Firmware:
@@ -68,6 +108,44 @@ class BackendInterface(ABC):
         """
         return self._last_async_response
 
+    def flush_tmp_snapshots(self) -> int:
+        """
+        Writes the temporary snapshots kept in memory (see the lazy temporary
+        snapshots mode of :class:`SpeculosBackend
+        <ragger.backend.speculos.SpeculosBackend>`), typically once a test
+        failed.
+
+        :return: The number of written snapshots
+        :rtype: int
+        """
+        return 0
+
+    def discard_tmp_snapshots(self) -> int:
+        """
+        Drops the temporary snapshots kept in memory, typically once a test
+        passed.
+
+        :return: The number of dropped snapshots
+        :rtype: int
+        """
+        return 0
+
+    def invalidate_tmp_snapshots(self, directory: Path, start_idx: int = 0) -> int:
+        """
+        Drops the temporary snapshots of a directory kept in memory, whose
+        index is greater or equal to `start_idx`, and waits for their pending
+        writes, before the directory is cleaned up.
+
+        :param directory: The temporary snapshots directory
+        :type directory: Path
+        :param start_idx: Index of the first dropped snapshot
+        :type start_idx: int
+
+        :return: The number of dropped snapshots
+        :rtype: int
+        """
+        return 0
+
     @abstractmethod
     def __enter__(self) -> "BackendInterface":
         raise NotImplementedError
@@ -87,6 +165,30 @@ class BackendInterface(ABC):
         """
         raise NotImplementedError
 
+    def warm_reset(self, timeout: float = 5.0) -> bool:
+        """
+        Resets the backend state (default raise policy, no pending response)
+        and waits for the application to come back on its home screen, without
+        restarting it if possible.
+
+        Only the backend and the displayed screen are reset: unless the
+        application is restarted, its own state (NVM content such as settings
+        or stored data, RAM state not cleared by going back home) is kept.
+        This allows to share a single backend instance between several tests
+        which do not depend on this state, without paying the application boot
+        cost for each of them.
+
+        :param timeout: Maximum time to wait for the application to come back
+                        on its home screen before falling back to a full
+                        restart.
+        :type timeout: float
+
+        :return: True if the application could be reused as is, False if it
+                 had to be restarted.
+        :rtype: bool
+        """
+        raise NotImplementedError
+
     def is_raise_required(self, rapdu: RAPDU) -> bool:
         """
         :return: If the given status is considered valid or not
@@ -195,6 +297,91 @@ class BackendInterface(ABC):
         """
         raise NotImplementedError
 
+    def exchange_many(self, apdus: Iterable[bytes], stop_on_error: bool = True) -> List[RAPDU]:
+        """
+        Sends the given APDUs to the backend one after the other, receiving the
+        response of each one before sending the next one.
+
+        Every part of the APDUs (including length) are the caller's
+        responsibility.
+
+        Backends can override this method with a faster transport path, as
+        long as the behavior stays the same.
+
+        :param apdus: The APDU messages
+        :type apdus: Iterable[bytes]
+        :param stop_on_error: Stop sending APDUs after the first response which
+                              status is not 0x9000. Defaults to True.
+        :type stop_on_error: bool
+
+        :raises ExceptionRAPDU: If the `raises` attribute is True, this method
+                                  will raise if the backend returns a status code
+                                  not registered as a `valid_statuses`
+
+        :return: The APDU responses, in the same order as the APDUs. If the
+                 exchange stopped on an error, the last response is the
+                 erroneous one.
+        :rtype: List[RAPDU]
+        """
+        rapdus: List[RAPDU] = list()
+        for apdu in apdus:
+            rapdu = self.exchange_raw(apdu)
+            rapdus.append(rapdu)
+            if stop_on_error and rapdu.status != 0x9000:
+                break
+        return rapdus
+
+    def exchange_chunked(self,
+                         cla: int,
+                         ins: int,
+                         data: bytes,
+                         chunk_size: int = 255,
+                         p1: int = 0,
+                         p2: int = 0,
+                         p1_next: Optional[int] = None,
+                         p2_next: Optional[int] = None,
+                         stop_on_error: bool = True) -> List[RAPDU]:
+        """
+        Splits a payload into chunks, then formats and sends one APDU per chunk
+        to the backend (see `exchange_many`).
+
+        :param cla: The application ID
+        :type cla: int
+        :param ins: The command ID
+        :type ins: int
+        :param data: The payload to split
+        :type data: bytes
+        :param chunk_size: Maximum size of each chunk, defaults to 255
+        :type chunk_size: int
+        :param p1: First instruction parameter of the first APDU, defaults to 0
+        :type p1: int
+        :param p2: Second instruction parameter of the first APDU, defaults to 0
+        :type p2: int
+        :param p1_next: First instruction parameter of the next APDUs, defaults
+                        to `p1`
+        :type p1_next: int
+        :param p2_next: Second instruction parameter of the next APDUs, defaults
+                        to `p2`
+        :type p2_next: int
+        :param stop_on_error: Stop sending APDUs after the first response which
+                              status is not 0x9000. Defaults to True.
+        :type stop_on_error: bool
+
+        :raises ExceptionRAPDU: If the `raises` attribute is True, this method
+                                  will raise if the backend returns a status code
+                                  not registered as a `valid_statuses`
+
+        :return: The APDU responses, one per sent chunk
+        :rtype: List[RAPDU]
+        """
+        assert 0 < chunk_size <= 255, "Chunk size must be in [1, 255]"
+        p1_next = p1 if p1_next is None else p1_next
+        p2_next = p2 if p2_next is None else p2_next
+        chunks = split_message(data, chunk_size) or [b""]
+        apdus = [pack_APDU(cla, ins, p1, p2, chunks[0])]
+        apdus += [pack_APDU(cla, ins, p1_next, p2_next, chunk) for chunk in chunks[1:]]
+        return self.exchange_many(apdus, stop_on_error=stop_on_error)
+
     @contextmanager
     def exchange_async(self,
                        cla: int,
@@ -330,6 +517,82 @@ class BackendInterface(ABC):
         """
         raise NotImplementedError
 
+    @staticmethod
+    def _button_sequence(buttons: Iterable[str]) -> List[str]:
+        sequence = list(buttons)
+        for button in sequence:
+            if button not in BUTTONS:
+                raise ValueError(f"Invalid button '{button}', expected one of {BUTTONS}")
+        return sequence
+
+    @staticmethod
+    def _paced(events: Iterable[T], interval: float) -> Iterator[T]:
+        # Yields the events of a sequence, `interval` seconds (wall clock)
+        # between the end of an event and the start of the next one
+        previous: Optional[float] = None
+        for event in events:
+            if previous is not None and interval > 0:
+                sleep(max(previous + interval - monotonic(), 0))
+            yield event
+            previous = monotonic()
+
+    def press_sequence(self,
+                       buttons: Iterable[str],
+                       delay: Optional[float] = None,
+                       interval: float = 0.0) -> None:
+        """
+        Presses then releases the given buttons, one after the other, without
+        waiting for the screen in between.
+
+        By default, this is a plain loop over the click methods. Backends can
+        override this method to inject the sequence faster, as long as the
+        behavior stays the same.
+
+        :param buttons: The buttons to press: "left", "right" or "both"
+        :type buttons: Iterable[str]
+        :param delay: Time (in seconds) each button is held pressed, on the
+                      backends supporting it (their default if None)
+        :type delay: Optional[float]
+        :param interval: Time (in seconds) between the release of a button
+                         and the next press
+        :type interval: float
+
+        :raises ValueError: If a button is unknown (before anything is pressed)
+
+        :return: None
+        :rtype: NoneType
+        """
+        clicks = {"left": self.left_click, "right": self.right_click, "both": self.both_click}
+        for button in self._paced(self._button_sequence(buttons), interval):
+            clicks[button]()
+
+    def touch_sequence(self,
+                       positions: Iterable[Tuple[int, int]],
+                       delay: float = 0.5,
+                       interval: float = 0.0) -> None:
+        """
+        Performs finger touches on the given positions of the device screen,
+        one after the other, without waiting for the screen in between.
+
+        By default, this is a plain loop over :meth:`finger_touch`. Backends
+        can override this method to inject the sequence faster, as long as
+        the behavior stays the same.
+
+        :param positions: The (x, y) coordinates of the finger touches
+        :type positions: Iterable[Tuple[int, int]]
+        :param delay: Time (in seconds) each finger touch is held, as
+                      :meth:`finger_touch` does
+        :type delay: float
+        :param interval: Time (in seconds) between the release of a finger
+                         touch and the next one
+        :type interval: float
+
+        :return: None
+        :rtype: NoneType
+        """
+        for x, y in self._paced(positions, interval):
+            self.finger_touch(x, y, delay)
+
     @abstractmethod
     def compare_screen_with_snapshot(self,
                                      golden_snap_path: Path,
@@ -356,6 +619,44 @@ class BackendInterface(ABC):
         """
         raise NotImplementedError
 
+    def prepare_golden_snapshots(self, dir_path: Path) -> None:
+        """
+        Hook called once a test golden snapshots directory is checked, before
+        its snapshots are compared, so that backends can prepare them ahead
+        of time. Does nothing by default.
+
+        :param dir_path: The golden snapshots directory
+        :type dir_path: Path
+
+        :return: None
+        :rtype: NoneType
+        """
+        return
+
+    def match_screen_with_snapshots(self, goldens: "GoldenSet[Key]") -> Optional["Key"]:
+        """
+        Identify the current device screen among a set of snapshots, with a
+        single screenshot.
+
+        :param goldens: The golden snapshots, by key
+        :type goldens: GoldenSet
+
+        :return: The key of the matching snapshot, or None
+        :rtype: Optional[Hashable]
+        """
+        raise NotImplementedError
+
+    def capture_screenshot(self) -> bytes:
+        """
+        Take a screenshot of the current device screen, without comparing it,
+        so that it can be compared later on (see
+        :class:`ComparePool <ragger.utils.compare_pool.ComparePool>`).
+
+        :return: The screenshot (PNG)
+        :rtype: bytes
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def wait_for_screen_change(self, timeout: float = 10.0) -> None:
         """
@@ -378,6 +679,46 @@ class BackendInterface(ABC):
         """
         raise NotImplementedError
 
+    @property
+    def screen_events_sequence(self) -> Optional[int]:
+        """
+        :return: The sequence number of the screen events received from the
+                 device so far, or None if the backend does not receive screen
+                 events (in which case :meth:`wait_for_screen_events` is not
+                 available).
+        :rtype: Optional[int]
+        """
+        return None
+
+    def wait_for_screen_events(self, after: int, timeout: float = 10.0) -> bool:
+        """
+        Waits until screen events have been received after the `after`
+        sequence number (see :attr:`screen_events_sequence`), and the event
+        batch has settled. Contrary to :meth:`wait_for_screen_change`, no
+        screenshot is taken, and the screen reference is not updated (see
+        :meth:`sync_screen`).
+
+        :param after: The sequence number before the awaited events
+        :type after: int
+        :param timeout: Maximum time to wait for the events
+        :type timeout: float
+
+        :return: True if events have been received, False on timeout
+        :rtype: bool
+        """
+        raise NotImplementedError
+
+    def sync_screen(self) -> None:
+        """
+        Takes the currently displayed screen as the reference of the next
+        screen change waits, once inputs have been sent without waiting for
+        the screen to change.
+
+        :return: None
+        :rtype: NoneType
+        """
+        pass
+
     def wait_for_home_screen(self, timeout: float = 10.0) -> None:
         """
         Wait until the screen content is equal to the app home screen.
@@ -419,6 +760,16 @@ class BackendInterface(ABC):
         """
         raise NotImplementedError
 
+    def get_screen_text(self) -> ScreenText:
+        """
+        Returns the texts displayed on the screen, as an index supporting
+        exact, substring, regular expression and positional queries.
+
+        :return: The screen texts
+        :rtype: ScreenText
+        """
+        raise NotImplementedError
+
     def wait_for_text_on_screen(self, text: str, timeout: float = 10.0) -> None:
         """
         Wait until the screen content contains the text string provider.
@@ -13,9 +13,8 @@
    See the License for the specific language governing permissions and
    limitations under the License.
 """
+import logging
 from pathlib import Path
-from PIL import Image, ImageOps
-from pytesseract import image_to_data, Output
 from types import TracebackType
 from typing import List, Optional, Type
 
@@ -23,15 +22,34 @@ from ragger.firmware import Firmware
 from ragger.gui import RaggerGUI
 from ragger.navigator.instruction import NavInsID
 from ragger.utils import Crop
+from ragger.utils.ocr_cache import OcrCache, OCR_CACHE
+from ragger.utils.profiler import COMPARISON, profile_phase
 from .interface import BackendInterface
 
 
 class PhysicalBackend(BackendInterface):
 
-    def __init__(self, firmware: Firmware, *args, with_gui: bool = False, **kwargs):
+    # Physical backends keep logging their APDUs at DEBUG level, as they did
+    # before the APDU log moved to BackendInterface
+    _APDU_LOG_LEVEL = logging.DEBUG
+
+    def __init__(self,
+                 firmware: Firmware,
+                 *args,
+                 with_gui: bool = False,
+                 ocr_cache: OcrCache = OCR_CACHE,
+                 **kwargs):
         super().__init__(firmware, *args, **kwargs)
         self._ui: Optional[RaggerGUI] = RaggerGUI(device=firmware.device) if with_gui else None
         self._last_valid_snap_path: Optional[Path] = None
+        self._ocr_cache = ocr_cache
+
+    @property
+    def _invert_for_ocr(self) -> bool:
+        # Nano (s,sp,x) snapshots are white/blue text on black background,
+        # tesseract cannot do OCR on these. Invert image so it has
+        # dark text on white background.
+        return self.firmware.device.startswith("nan")
 
     def __exit__(self, exc_type: Optional[Type[BaseException]], exc_val: Optional[BaseException],
                  exc_tb: Optional[TracebackType]):
@@ -84,7 +102,9 @@ class PhysicalBackend(BackendInterface):
         if self._last_valid_snap_path == golden_snap_path:
             return True
 
-        if self._ui.check_screenshot(golden_snap_path):
+        with profile_phase(self.profiler, COMPARISON):
+            valid = self._ui.check_screenshot(golden_snap_path)
+        if valid:
             self._last_valid_snap_path = golden_snap_path
             return True
         else:
@@ -96,20 +116,18 @@ class PhysicalBackend(BackendInterface):
             return True
         self.init_gui()
         if self._last_valid_snap_path:
-            image = Image.open(self._last_valid_snap_path)
-            # Nano (s,sp,x) snapshots are white/blue text on black background,
-            # tesseract cannot do OCR on these. Invert image so it has
-            # dark text on white background.
-            if self.firmware.device.startswith("nan"):
-                image = ImageOps.invert(image)
-            data = image_to_data(image, output_type=Output.DICT)
-            for item in range(len(data["text"])):
-                if text in data["text"][item]:
-                    return True
-            return False
+            # Texts are recognized once per snapshot content
+            return self._ocr_cache.contains(self._last_valid_snap_path, text, self._invert_for_ocr)
         else:
             return self._ui.check_text(text)
 
+    def prepare_golden_snapshots(self, dir_path: Path) -> None:
+        # The golden snapshots texts may be checked once the screen is
+        # validated: recognize them in the background meanwhile
+        if self._ui is None:
+            return
+        self._ocr_cache.prewarm(sorted(Path(dir_path).glob("*.png")), self._invert_for_ocr)
+
     def wait_for_screen_change(self, timeout: float = 10.0) -> None:
         return
 
@@ -0,0 +1,232 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+from types import TracebackType
+from typing import Generator, Optional, Type, Union
+
+from ragger.error import ExceptionRAPDU
+from ragger.firmware import Firmware
+from ragger.utils import RAPDU, Crop
+from ragger.utils.golden_set import GoldenSet, Key
+from ragger.utils.screen_text import ScreenText
+from ragger.utils.screenshot import GoldenCache, GOLDEN_CACHE, compare_with_golden
+from ragger.utils.session_trace import COMMAND, INPUT, RESPONSE, SCREEN, Session, SessionRecord
+from ragger.utils.snapshot_store import SNAPSHOT_STORES
+from .interface import BackendInterface
+
+
+class ReplayError(AssertionError):
+    """
+    Raised when the replayed code diverges from the recorded session.
+    """
+
+
+class ReplayBackend(BackendInterface):
+    """
+    Replays a session recorded by :class:`SpeculosBackend
+    <ragger.backend.SpeculosBackend>` (see its ``session_recorder``
+    attribute), without any emulator: APDU responses, screenshots and screen
+    contents are served from memory.
+
+    The recorded screens are split by the actions (APDUs and navigation
+    inputs) which preceded them. After an action, each screen change wait
+    moves to the next screen recorded before the following action, and times
+    out immediately once there is none. A comparison also moves forward to
+    the first of these screens matching the golden snapshot, as a real device
+    screen would eventually display it.
+    """
+
+    def __init__(self,
+                 firmware: Firmware,
+                 session: Union[str, Path, Session],
+                 log_apdu_file: Optional[Path] = None,
+                 golden_cache: GoldenCache = GOLDEN_CACHE):
+        """
+        :param firmware: Which Firmware was recorded
+        :type firmware: Firmware
+        :param session: The recorded session, or its directory
+        :type session: Union[str, Path, Session]
+        """
+        super().__init__(firmware=firmware, log_apdu_file=log_apdu_file)
+        self._session = session if isinstance(session, Session) else Session.load(session)
+        self._golden_cache = golden_cache
+        self._cursor = 0
+        self._screen: Optional[SessionRecord] = None
+        self._screen_text = ScreenText([])
+        self.rewind()
+
+    def rewind(self) -> None:
+        """
+        Replays the session from its beginning.
+        """
+        self._cursor = 0
+        self._screen = None
+        self._screen_text = ScreenText([])
+        self._last_async_response = None
+        # The screen displayed before any action
+        self._skip_screens()
+
+    @property
+    def remaining(self) -> int:
+        """
+        :return: The number of records not replayed yet
+        :rtype: int
+        """
+        return len(self._session.records) - self._cursor
+
+    def _show(self, cursor: int) -> None:
+        self._screen = self._session.records[cursor]
+        self._screen_text = ScreenText(self._screen.content.get("events", []))
+        self._cursor = cursor + 1
+
+    def _skip_screens(self) -> None:
+        records = self._session.records
+        while self._cursor < len(records) and records[self._cursor].kind == SCREEN:
+            self._show(self._cursor)
+
+    def _next(self, kind: str) -> SessionRecord:
+        # Screens not waited for were displayed before the action anyway
+        self._skip_screens()
+        if self._cursor >= len(self._session.records):
+            raise ReplayError(f"Recorded session is over, no {kind} left to replay")
+        record = self._session.records[self._cursor]
+        if record.kind != kind:
+            raise ReplayError(f"Expected a recorded {kind}, got a {record.kind}")
+        self._cursor += 1
+        return record
+
+    def _command(self, data: bytes) -> None:
+        self._log_apdu_command(data)
+        record = self._next(COMMAND)
+        if record.data != data:
+            raise ReplayError(f"Command {data.hex()} differs from the recorded "
+                              f"{record.data.hex()}")
+
+    def _response(self) -> RAPDU:
+        record = self._next(RESPONSE)
+        rapdu = RAPDU(record.status, record.data)
+        self._log_apdu_response(rapdu)
+        if self.is_raise_required(rapdu):
+            raise ExceptionRAPDU(rapdu.status, rapdu.data)
+        return rapdu
+
+    def _input(self, action: str, *args: int) -> None:
+        record = self._next(INPUT)
+        if (record.action, record.args) != (action, args):
+            raise ReplayError(f"Input {action}{args} differs from the recorded "
+                              f"{record.action}{record.args}")
+
+    def __enter__(self) -> "ReplayBackend":
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc_val: Optional[BaseException],
+                 exc_tb: Optional[TracebackType]):
+        pass
+
+    def handle_usb_reset(self) -> None:
+        pass
+
+    def warm_reset(self, timeout: float = 5.0) -> bool:
+        return True
+
+    def send_raw(self, data: bytes = b"") -> None:
+        self._command(data)
+
+    def receive(self) -> RAPDU:
+        return self._response()
+
+    def exchange_raw(self, data: bytes = b"") -> RAPDU:
+        self._command(data)
+        return self._response()
+
+    @contextmanager
+    def exchange_async_raw(self, data: bytes = b"") -> Generator[None, None, None]:
+        self._command(data)
+        yield
+        self._last_async_response = self._response()
+
+    def right_click(self) -> None:
+        self._input("right_click")
+
+    def left_click(self) -> None:
+        self._input("left_click")
+
+    def both_click(self) -> None:
+        self._input("both_click")
+
+    def finger_touch(self, x: int = 0, y: int = 0, delay: float = 0.5) -> None:
+        self._input("finger_touch", x, y)
+
+    def _screenshot(self) -> bytes:
+        if self._screen is None:
+            raise ReplayError("No screen recorded yet")
+        return self._session.frames[self._screen.frame]
+
+    def _compare(self, screenshot: bytes, golden_snap_path: Path, crop: Optional[Crop]) -> bool:
+        store = SNAPSHOT_STORES.lookup(golden_snap_path)
+        if store is not None:
+            return store.compare(BytesIO(screenshot), golden_snap_path, crop, self._golden_cache,
+                                 self.image_comparator)
+        return compare_with_golden(BytesIO(screenshot), golden_snap_path, crop, self._golden_cache,
+                                   self.image_comparator)
+
+    def compare_screen_with_snapshot(self,
+                                     golden_snap_path: Path,
+                                     crop: Optional[Crop] = None,
+                                     tmp_snap_path: Optional[Path] = None,
+                                     golden_run: bool = False) -> bool:
+        if golden_run:
+            store = SNAPSHOT_STORES.lookup(golden_snap_path)
+            if store is not None:
+                store.add(golden_snap_path, BytesIO(self._screenshot()))
+            else:
+                Path(golden_snap_path).write_bytes(self._screenshot())
+        records = self._session.records
+        matches = self._compare(self._screenshot(), golden_snap_path, crop)
+        # Look for the golden among the screens displayed before the next action
+        cursor = self._cursor
+        while not matches and cursor < len(records) and records[cursor].kind == SCREEN:
+            screenshot = self._session.frames[records[cursor].frame]
+            if self._compare(screenshot, golden_snap_path, crop):
+                self._show(cursor)
+                matches = True
+            cursor += 1
+        if tmp_snap_path:
+            Path(tmp_snap_path).write_bytes(self._screenshot())
+        return matches
+
+    def match_screen_with_snapshots(self, goldens: GoldenSet[Key]) -> Optional[Key]:
+        return goldens.match(BytesIO(self._screenshot()), self.image_comparator)
+
+    def capture_screenshot(self) -> bytes:
+        return self._screenshot()
+
+    def wait_for_screen_change(self, timeout: float = 10.0) -> None:
+        records = self._session.records
+        if self._cursor >= len(records) or records[self._cursor].kind != SCREEN:
+            raise TimeoutError("Timeout waiting for screen change")
+        self._show(self._cursor)
+
+    def get_screen_text(self) -> ScreenText:
+        return self._screen_text
+
+    def compare_screen_with_text(self, text: str) -> bool:
+        return text in self.get_screen_text().serialized
+
+    def get_current_screen_content(self) -> dict:
+        return self.get_screen_text().to_dict()
@@ -13,20 +13,36 @@
    See the License for the specific language governing permissions and
    limitations under the License.
 """
+import socket
+import subprocess
+import sys
 from contextlib import contextmanager
+from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path
 from PIL import Image
-from typing import Optional, Generator
-from time import time, sleep
-from json import dumps
+from threading import Condition, Lock, Thread
+from typing import Callable, Dict, Iterable, Iterator, Optional, Generator, Tuple
+from time import monotonic, time, sleep
+from urllib.parse import urlsplit
 
-from speculos.client import SpeculosClient, screenshot_equal, ApduResponse, ApduException
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from speculos.client import SpeculosClient, screenshot_equal, ApduResponse, ApduException, \
+    ClientException, check_status_code
 
 from ragger.error import ExceptionRAPDU
 from ragger.firmware import Firmware
 from ragger.utils import RAPDU, Crop
-from .interface import BackendInterface
+from ragger.utils.golden_set import GoldenSet, Key
+from ragger.utils.screen_text import ScreenText
+from ragger.utils.session_trace import SessionRecorder
+from ragger.utils.screenshot import GoldenCache, GOLDEN_CACHE, compare_with_golden
+from ragger.utils.snapshot_store import SNAPSHOT_STORES
+from ragger.utils.tmp_snapshots import TmpSnapshotWriter
+from ragger.utils.profiler import SCREENSHOT, COMPARISON, WRITE, profile_phase
+from .interface import BackendInterface, RaisePolicy
 
 
 def raise_policy_enforcer(function):
@@ -38,7 +54,7 @@ def raise_policy_enforcer(function):
         except ApduException as error:
             rapdu = RAPDU(error.sw, error.data)
 
-        self.apdu_logger.info("<= %s%4x", rapdu.data.hex(), rapdu.status)
+        self._log_apdu_response(rapdu)
 
         if self.is_raise_required(rapdu):
             raise ExceptionRAPDU(rapdu.status, rapdu.data)
@@ -48,34 +64,292 @@ def raise_policy_enforcer(function):
     return decoration
 
 
+@dataclass
+class StartupTimings:
+    """
+    Duration (in seconds) of each phase of a Speculos backend startup:
+
+    - ``spawn``: Speculos process start, until its API port accepts connections,
+    - ``api``: until the API answers a screen content request,
+    - ``text``: until some text is displayed on the screen,
+    - ``frame``: until two consecutive screenshots are identical.
+    """
+    spawn: float = 0.0
+    api: float = 0.0
+    text: float = 0.0
+    frame: float = 0.0
+
+    @property
+    def total(self) -> float:
+        return self.spawn + self.api + self.text + self.frame
+
+
+@dataclass
+class EndpointLatency:
+    """
+    Latency (in seconds, until the response headers are received) of the
+    requests sent to a Speculos API endpoint.
+    """
+    count: int = 0
+    total: float = 0.0
+    minimum: float = 0.0
+    maximum: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, latency: float) -> None:
+        self.minimum = min(self.minimum, latency) if self.count else latency
+        self.maximum = max(self.maximum, latency)
+        self.count += 1
+        self.total += latency
+
+
+@dataclass
+class SettleStats:
+    """
+    Time (in seconds) spent waiting for the screen to stop changing after a
+    detected screen change. ``timeouts`` counts the waits which gave up
+    because the screen was still changing after the settle timeout.
+    """
+    count: int = 0
+    total: float = 0.0
+    maximum: float = 0.0
+    timeouts: int = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, duration: float, timed_out: bool = False) -> None:
+        self.count += 1
+        self.total += duration
+        self.maximum = max(self.maximum, duration)
+        self.timeouts += int(timed_out)
+
+
+def _backoff(initial: float, maximum: float) -> Iterator[float]:
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * 2, maximum)
+
+
+class _ScreenEventsWatcher:
+    """
+    Consumes the Speculos events stream in a background thread, so that screen
+    changes can be waited for instead of being polled.
+
+    Each received event increments a sequence number. If the stream can not be
+    read (not opened, closed, or not answering with server-sent events), the
+    watcher flags itself as unavailable and the backend falls back to polling.
+    """
+
+    def __init__(self, client: SpeculosClient):
+        self._client = client
+        self._condition = Condition()
+        self._sequence = 0
+        self._last_event_time = monotonic()
+        self._available = False
+        self._thread: Optional[Thread] = None
+
+    @property
+    def available(self) -> bool:
+        return self._available
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    def start(self) -> None:
+        if getattr(self._client, "stream", None) is None:
+            return
+        self._available = True
+        self._thread = Thread(target=self._run, name="speculos-events", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        # The thread itself ends once the client closes the stream
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        try:
+            while True:
+                self._client.get_next_event()
+                with self._condition:
+                    self._sequence += 1
+                    self._last_event_time = monotonic()
+                    self._condition.notify_all()
+        except Exception:
+            # Stream closed or unusable: waiters must fall back to polling
+            with self._condition:
+                self._available = False
+                self._condition.notify_all()
+
+    def wait_for_event(self, after: int, timeout: float) -> bool:
+        """
+        Waits until at least one event has been received since the `after`
+        sequence number.
+
+        :return: True if a new event has been received, False on timeout or if
+                 the stream became unavailable
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._sequence > after or not self._available,
+                                            max(timeout, 0)) and self._sequence > after
+
+    def wait_for_quiet(self, window: float, timeout: float) -> None:
+        """
+        Waits until no event has been received for `window` seconds, or until
+        `timeout` seconds have elapsed.
+        """
+        deadline = monotonic() + timeout
+        with self._condition:
+            while self._available:
+                now = monotonic()
+                remaining = min(window - (now - self._last_event_time), deadline - now)
+                if remaining <= 0:
+                    return
+                self._condition.wait(remaining)
+
+
 class SpeculosBackend(BackendInterface):
 
     _ARGS_KEY = 'args'
+    # Without any event, the screen is still checked periodically, as some
+    # screen changes (images only) do not trigger text events.
+    _EVENTS_POLL_FALLBACK = 1.0
 
     def __init__(self,
                  application: Path,
                  firmware: Firmware,
                  host: str = "127.0.0.1",
                  port: int = 5000,
+                 apdu_port: int = 9999,
                  log_apdu_file: Optional[Path] = None,
+                 use_events_stream: bool = True,
+                 events_settle_window: float = 0.1,
+                 golden_cache: GoldenCache = GOLDEN_CACHE,
+                 startup_timeout: float = 20.0,
+                 startup_backoff_initial: float = 0.005,
+                 startup_backoff_max: float = 0.25,
+                 http_pool_size: int = 4,
+                 settle_frames: int = 3,
+                 settle_interval: float = 0.02,
+                 settle_timeout: float = 0.2,
+                 lazy_tmp_snapshots: bool = False,
+                 tmp_snapshot_workers: int = 0,
+                 record_session: Optional[Path] = None,
                  **kwargs):
         super().__init__(firmware=firmware, log_apdu_file=log_apdu_file)
         self._host = host
         self._port = port
+        self._apdu_port = apdu_port
         args = ["--model", firmware.device]
+        # Ports are explicit so that several instances can run side by side
+        ports = ["--api-port", str(port), "--apdu-port", str(apdu_port)]
         if self._ARGS_KEY in kwargs:
             assert isinstance(kwargs[self._ARGS_KEY], list), \
                 f"'{self._ARGS_KEY}' ({kwargs[self._ARGS_KEY]}) keyword " \
                 "argument  must be a list of arguments"
+            for option, value in zip(ports[::2], ports[1::2]):
+                if option not in kwargs[self._ARGS_KEY]:
+                    args += [option, value]
             kwargs[self._ARGS_KEY].extend(args)
         else:
-            kwargs[self._ARGS_KEY] = args
+            kwargs[self._ARGS_KEY] = args + ports
         self._client: SpeculosClient = SpeculosClient(app=str(application),
                                                       api_url=self.url,
                                                       **kwargs)
         self._pending: Optional[ApduResponse] = None
         self._last_screenshot: Optional[BytesIO] = None
         self._home_screenshot: Optional[BytesIO] = None
+        self._use_events_stream = use_events_stream
+        self._events_settle_window = events_settle_window
+        self._golden_cache = golden_cache
+        self._startup_timeout = startup_timeout
+        self._startup_backoff = (startup_backoff_initial, startup_backoff_max)
+        self._startup_timings: Optional[StartupTimings] = None
+        self._events_watcher: Optional[_ScreenEventsWatcher] = None
+        # Events sequence number when _last_screenshot was taken
+        self._last_screenshot_sequence = 0
+        self._http_latencies: Dict[str, EndpointLatency] = dict()
+        self._http_latencies_lock = Lock()
+        self._http_adapter = self._configure_http_session(http_pool_size)
+        assert settle_frames >= 2, "At least 2 identical frames are needed to detect a stable screen"
+        self._settle_frames = settle_frames
+        self._settle_interval = settle_interval
+        self._settle_timeout = settle_timeout
+        self._settle_stats = SettleStats()
+        self._tmp_snapshots = TmpSnapshotWriter(lazy_tmp_snapshots, tmp_snapshot_workers)
+        # The screen texts are cached while no screen event is received. Inputs,
+        # APDUs and detected screen changes invalidate them too, as some
+        # screen changes (clearing the texts) do not trigger any event.
+        self._screen_text: Optional[ScreenText] = None
+        self._screen_text_key: Optional[Tuple[int, int]] = None
+        self._screen_generation = 0
+        # Optional recording of the session (APDUs, inputs and screens), to be
+        # replayed by ReplayBackend
+        self.session_recorder: Optional[SessionRecorder] = \
+            SessionRecorder(record_session) if record_session is not None else None
+
+    def _configure_http_session(self, pool_size: int) -> HTTPAdapter:
+        # Every API call goes through the client session: keep-alive connections
+        # are reused instead of being opened on each call. Up to `pool_size`
+        # connections are kept open, as the events stream and a pending APDU
+        # each hold one while screenshots are requested.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session = self._client.session
+        session.mount("http://", adapter)
+        session.hooks["response"].append(self._record_http_latency)
+        return adapter
+
+    def _record_http_latency(self, response: Response, *args, **kwargs) -> None:
+        request = response.request
+        endpoint = f"{request.method} {urlsplit(request.url or '').path}"
+        with self._http_latencies_lock:
+            latency = self._http_latencies.setdefault(endpoint, EndpointLatency())
+            latency.add(response.elapsed.total_seconds())
+
+    @property
+    def http_latencies(self) -> Dict[str, EndpointLatency]:
+        """
+        :return: The latency of the Speculos API requests sent so far, per
+                 endpoint (``"<METHOD> <path>"``, ``"GET /screenshot"`` for
+                 instance).
+        :rtype: Dict[str, EndpointLatency]
+        """
+        with self._http_latencies_lock:
+            return {
+                endpoint: EndpointLatency(**vars(latency))
+                for endpoint, latency in self._http_latencies.items()
+            }
+
+    def reset_http_latencies(self) -> None:
+        with self._http_latencies_lock:
+            self._http_latencies.clear()
+
+    @property
+    def http_connections_opened(self) -> int:
+        """
+        :return: The number of connections opened to the Speculos API since the
+                 backend was started. It stays close to the pool size when
+                 connections are reused.
+        :rtype: int
+        """
+        pools = self._http_adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    @property
+    def port(self) -> int:
+        """
+        :return: The Speculos REST API TCP port
+        :rtype: int
+        """
+        return self._port
 
     @property
     def url(self) -> str:
@@ -95,34 +369,235 @@ class SpeculosBackend(BackendInterface):
                 events.append(event)
         return {"events": events}
 
-    def __enter__(self) -> "SpeculosBackend":
-        self.logger.info(f"Starting {self.__class__.__name__} stream")
-        self._client.__enter__()
+    def _screen_may_change(self) -> None:
+        self._screen_generation += 1
+
+    def _input(self, action: str, *args: int) -> None:
+        self._screen_may_change()
+        if self.session_recorder is not None:
+            self.session_recorder.record_input(action, *args)
+
+    def _record_screen(self, screenshot: bytes) -> None:
+        if self.session_recorder is not None:
+            self.session_recorder.record_screen(screenshot, self._retrieve_client_screen_content)
+
+    def _log_apdu_command(self, data: bytes) -> None:
+        super()._log_apdu_command(data)
+        if self.session_recorder is not None:
+            self.session_recorder.record_command(data)
+
+    def _log_apdu_response(self, rapdu: RAPDU) -> None:
+        super()._log_apdu_response(rapdu)
+        if self.session_recorder is not None:
+            self.session_recorder.record_response(rapdu.status, rapdu.data)
+
+    def get_screen_text(self) -> ScreenText:
+        key = (self.events_sequence, self._screen_generation)
+        if self._screen_text is not None and self.events_stream_available \
+                and key == self._screen_text_key:
+            return self._screen_text
+        screen_text = ScreenText(self._retrieve_client_screen_content()["events"])
+        # Without events stream, the content is fetched each time, but only
+        # indexed again if it changed
+        if screen_text != self._screen_text:
+            self._screen_text = screen_text
+        self._screen_text_key = key
+        return self._screen_text
+
+    def _wait_for_startup_phase(self,
+                                phase: str,
+                                ready: Callable[[], bool],
+                                deadline: float,
+                                watcher: Optional[_ScreenEventsWatcher] = None) -> None:
+        delays = _backoff(*self._startup_backoff)
+        while not ready():
+            if time() > deadline:
+                raise TimeoutError(
+                    f"Timeout waiting for {phase} upon Ragger Speculos Instance start")
+            delay = min(next(delays), max(deadline - time(), 0))
+            if watcher is not None and watcher.available:
+                # Wakes up as soon as something is displayed
+                watcher.wait_for_event(watcher.sequence, delay)
+            else:
+                # Give some time to other threads, and mostly Speculos one
+                sleep(delay)
+
+    def _spawn(self, deadline: float) -> None:
+        # The process is started here instead of through the client, whose own
+        # readiness polling is fixed and not bounded by the startup timeout
+        cmd = [sys.executable or "python3", "-m", "speculos", *self._client.args, self._client.app]
+        self.logger.info(f"Starting Speculos with command: {' '.join(cmd)}")
+        process = subprocess.Popen(cmd)
+        self._client.process = process
+
+        def port_is_open() -> bool:
+            if process.poll() is not None:
+                raise RuntimeError(f"Speculos exited with code {process.returncode} upon start")
+            try:
+                socket.create_connection((self._host, self._port),
+                                         timeout=max(deadline - time(), 0.01)).close()
+                return True
+            except OSError:
+                return False
+
+        self._wait_for_startup_phase("API port", port_is_open, deadline)
+
+    def _start(self, deadline: float, timings: StartupTimings) -> BytesIO:
+        start = time()
+        self._spawn(deadline)
+        timings.spawn = time() - start
+
+        # Wait until the API answers (with the events stream opened, as the
+        # client would have done), then until some text is displayed on the screen.
+        content: dict = {"events": []}
+
+        def api_is_up() -> bool:
+            nonlocal content
+            try:
+                if self._client.stream is None:
+                    self._client.open_stream()
+                content = self._retrieve_client_screen_content()
+                return True
+            except (ClientException, RequestException):
+                # The stream is set even if its request failed
+                if self._client.stream is not None and self._client.stream.status_code != 200:
+                    self._client.close_stream()
+                return False
+
+        def text_is_displayed() -> bool:
+            nonlocal content
+            if not content["events"]:
+                content = self._retrieve_client_screen_content()
+            return bool(content["events"])
 
-        # Wait until some text is displayed on the screen.
         start = time()
-        while not self._retrieve_client_screen_content()["events"]:
-            # Give some time to other threads, and mostly Speculos one
-            sleep(0.25)
-            if (time() - start > 20.0):
-                raise TimeoutError(
-                    "Timeout waiting for screen content upon Ragger Speculos Instance start")
+        self._wait_for_startup_phase("API", api_is_up, deadline)
+        timings.api = time() - start
 
-        self._last_screenshot = BytesIO(self._client.get_screenshot())
+        if self._use_events_stream:
+            self._events_watcher = _ScreenEventsWatcher(self._client)
+            self._events_watcher.start()
+
+        start = time()
+        self._wait_for_startup_phase("screen content", text_is_displayed, deadline,
+                                     self._events_watcher)
+        timings.text = time() - start
+
+        # Wait until the screen stops changing, so that the home screen reference is complete.
+        screenshot = BytesIO(self._client.get_screenshot())
+
+        def frame_is_stable() -> bool:
+            nonlocal screenshot
+            previous, screenshot = screenshot, BytesIO(self._client.get_screenshot())
+            return screenshot_equal(previous, screenshot)
+
+        start = time()
+        try:
+            self._wait_for_startup_phase("a stable screen", frame_is_stable, deadline)
+        except TimeoutError:
+            # Some screens are animated: not fatal, the last screenshot is used
+            self.logger.warning("Screen still changing upon Ragger Speculos Instance start")
+        timings.frame = time() - start
+        return screenshot
+
+    def __enter__(self) -> "SpeculosBackend":
+        self.logger.info(f"Starting {self.__class__.__name__} stream")
+        timings = StartupTimings()
+        deadline = time() + self._startup_timeout
+        if self.session_recorder is not None:
+            # Closed if the backend was stopped before (see warm_reset)
+            self.session_recorder.reopen()
+
+        try:
+            screenshot = self._start(deadline, timings)
+        except BaseException:
+            # Closes the events stream too, which ends the watcher thread
+            self._client.stop()
+            if self._events_watcher is not None:
+                self._events_watcher.stop()
+                self._events_watcher = None
+            raise
+
+        self._startup_timings = timings
+        self.logger.info(f"{self.__class__.__name__} started in {timings.total:.3f}s "
+                         f"(spawn {timings.spawn:.3f}s, API {timings.api:.3f}s, "
+                         f"text {timings.text:.3f}s, stable frame {timings.frame:.3f}s)")
+
+        self._last_screenshot_sequence = self.events_sequence
+        self._last_screenshot = screenshot
+        self._screen_may_change()
+        self._record_screen(screenshot.getvalue())
 
         # Save current screenshot as _home_screenshot.
         self._home_screenshot = self._last_screenshot
 
         return self
 
+    @property
+    def startup_timings(self) -> Optional[StartupTimings]:
+        """
+        :return: The duration of each phase of the last backend startup, or
+                 None if the backend has not been started.
+        :rtype: StartupTimings
+        """
+        return self._startup_timings
+
     def __exit__(self, *args):
+        self._tmp_snapshots.wait()
+        if self.session_recorder is not None:
+            self.session_recorder.close()
         self._client.__exit__(*args)
+        # Kept-alive connections target the stopped instance
+        self._http_adapter.poolmanager.clear()
+        if self._events_watcher is not None:
+            self._events_watcher.stop()
+            self._events_watcher = None
+
+    @property
+    def events_stream_available(self) -> bool:
+        """
+        :return: True if screen changes are detected through the Speculos
+                 events stream, False if they are detected by polling
+                 screenshots.
+        :rtype: bool
+        """
+        return self._events_watcher is not None and self._events_watcher.available
+
+    @property
+    def events_sequence(self) -> int:
+        """
+        :return: The number of screen events received from the Speculos events
+                 stream so far (always 0 if the stream is not available).
+        :rtype: int
+        """
+        return self._events_watcher.sequence if self._events_watcher is not None else 0
 
     def handle_usb_reset(self) -> None:
         pass
 
+    def warm_reset(self, timeout: float = 5.0) -> bool:
+        self._pending = None
+        self._last_async_response = None
+        self.raise_policy = RaisePolicy.RAISE_ALL_BUT_0x9000
+        self._screen_may_change()
+
+        # The application may still be displaying a transient screen (status
+        # after a signature for instance) before going back to its home screen.
+        self._last_screenshot_sequence = self.events_sequence
+        self._last_screenshot = BytesIO(self._client.get_screenshot())
+        try:
+            self.wait_for_home_screen(timeout)
+            return True
+        except TimeoutError:
+            self.logger.info("Application did not come back to its home screen, "
+                             f"restarting {self.__class__.__name__}")
+        self.__exit__(None, None, None)
+        self.__enter__()
+        return False
+
     def send_raw(self, data: bytes = b"") -> None:
-        self.apdu_logger.info("=> %s", data.hex())
+        self._screen_may_change()
+        self._log_apdu_command(data)
         self._pending = ApduResponse(self._client._apdu_exchange_nowait(data))
 
     @raise_policy_enforcer
@@ -133,7 +608,8 @@ class SpeculosBackend(BackendInterface):
 
     @raise_policy_enforcer
     def exchange_raw(self, data: bytes = b"") -> RAPDU:
-        self.apdu_logger.info("=> %s", data.hex())
+        self._screen_may_change()
+        self._log_apdu_command(data)
         return RAPDU(0x9000, self._client._apdu_exchange(data))
 
     @raise_policy_enforcer
@@ -142,7 +618,8 @@ class SpeculosBackend(BackendInterface):
 
     @contextmanager
     def exchange_async_raw(self, data: bytes = b"") -> Generator[None, None, None]:
-        self.apdu_logger.info("=> %s", data.hex())
+        self._screen_may_change()
+        self._log_apdu_command(data)
         with self._client.apdu_exchange_nowait(cla=data[0],
                                                ins=data[1],
                                                p1=data[2],
@@ -152,17 +629,51 @@ class SpeculosBackend(BackendInterface):
             self._last_async_response = self._get_last_async_response(response)
 
     def right_click(self) -> None:
+        self._input("right_click")
         self._client.press_and_release("right")
 
     def left_click(self) -> None:
+        self._input("left_click")
         self._client.press_and_release("left")
 
     def both_click(self) -> None:
+        self._input("both_click")
         self._client.press_and_release("both")
 
     def finger_touch(self, x: int = 0, y: int = 0, delay: float = 0.5) -> None:
+        self._input("finger_touch", x, y)
         self._client.finger_touch(x, y, delay)
 
+    def _post_input(self, endpoint: str, payload: dict) -> None:
+        with self._client.session.post(f"{self._client.api_url}{endpoint}",
+                                       json=payload) as response:
+            check_status_code(response, endpoint)
+
+    def press_sequence(self,
+                       buttons: Iterable[str],
+                       delay: Optional[float] = None,
+                       interval: float = 0.0) -> None:
+        # Speculos has no multi-event endpoint: each event is still one API
+        # request, posted on the kept-alive connection with a payload built
+        # once. Speculos holds each press for `delay` seconds (wall clock)
+        # before answering.
+        payload: Dict[str, object] = {"action": "press-and-release"}
+        if delay is not None:
+            payload["delay"] = delay
+        for button in self._paced(self._button_sequence(buttons), interval):
+            self._input(f"{button}_click")
+            self._post_input(f"/button/{button}", payload)
+
+    def touch_sequence(self,
+                       positions: Iterable[Tuple[int, int]],
+                       delay: float = 0.5,
+                       interval: float = 0.0) -> None:
+        payload: Dict[str, object] = {"action": "press-and-release", "delay": delay}
+        for x, y in self._paced(positions, interval):
+            self._input("finger_touch", x, y)
+            payload.update(x=x, y=y)
+            self._post_input("/finger", payload)
+
     def _save_screen_snapshot(self, snap: BytesIO, path: Path) -> None:
         self.logger.info(f"Saving screenshot to image '{path}'")
         img = Image.open(snap)
@@ -173,49 +684,182 @@ class SpeculosBackend(BackendInterface):
                                      crop: Optional[Crop] = None,
                                      tmp_snap_path: Optional[Path] = None,
                                      golden_run: bool = False) -> bool:
-        snap = BytesIO(self._client.get_screenshot())
-
-        # Save snap in tmp folder.
-        # It allows the user to access the screenshots in case of comparison failure
-        if tmp_snap_path:
-            self._save_screen_snapshot(snap, tmp_snap_path)
-
-        # Allow to generate golden snapshots
-        if golden_run:
-            self._save_screen_snapshot(snap, golden_snap_path)
-
-        if crop is not None:
-            return screenshot_equal(f"{golden_snap_path}",
-                                    snap,
-                                    left=crop.left,
-                                    upper=crop.upper,
-                                    right=crop.right,
-                                    lower=crop.lower)
-        else:
-            return screenshot_equal(f"{golden_snap_path}", snap)
+        with profile_phase(self.profiler, SCREENSHOT):
+            snap = BytesIO(self._client.get_screenshot())
+        self._record_screen(snap.getvalue())
+
+        store = SNAPSHOT_STORES.lookup(golden_snap_path)
+        with profile_phase(self.profiler, WRITE):
+            # Save snap in tmp folder.
+            # It allows the user to access the screenshots in case of comparison failure
+            if tmp_snap_path and not self._tmp_snapshots.lazy:
+                self._tmp_snapshots.save(tmp_snap_path, snap.getvalue())
+
+            # Allow to generate golden snapshots
+            if golden_run and store is not None:
+                store.add(golden_snap_path, snap)
+            elif golden_run:
+                self._save_screen_snapshot(snap, golden_snap_path)
+
+        # Goldens are decoded once, then compared as raw pixel buffers
+        matches: Optional[bool] = None
+        try:
+            with profile_phase(self.profiler, COMPARISON):
+                if store is not None:
+                    matches = store.compare(snap, golden_snap_path, crop, self._golden_cache,
+                                            self.image_comparator)
+                else:
+                    matches = compare_with_golden(snap, golden_snap_path, crop, self._golden_cache,
+                                                  self.image_comparator)
+            return matches
+        finally:
+            # In lazy mode, only non matching screenshots are written right away
+            if tmp_snap_path and self._tmp_snapshots.lazy:
+                with profile_phase(self.profiler, WRITE):
+                    self._tmp_snapshots.save(tmp_snap_path, snap.getvalue(), matches)
+
+    def match_screen_with_snapshots(self, goldens: GoldenSet[Key]) -> Optional[Key]:
+        with profile_phase(self.profiler, SCREENSHOT):
+            snap = BytesIO(self._client.get_screenshot())
+        self._record_screen(snap.getvalue())
+        with profile_phase(self.profiler, COMPARISON):
+            return goldens.match(snap, self.image_comparator)
+
+    def capture_screenshot(self) -> bytes:
+        with profile_phase(self.profiler, SCREENSHOT):
+            screenshot = self._client.get_screenshot()
+        self._record_screen(screenshot)
+        return screenshot
+
+    def flush_tmp_snapshots(self) -> int:
+        return self._tmp_snapshots.flush()
+
+    def discard_tmp_snapshots(self) -> int:
+        return self._tmp_snapshots.discard()
+
+    def invalidate_tmp_snapshots(self, directory: Path, start_idx: int = 0) -> int:
+        return self._tmp_snapshots.invalidate(directory, start_idx)
 
     def get_current_screen_content(self) -> dict:
-        return self._retrieve_client_screen_content()
+        return self.get_screen_text().to_dict()
 
     def compare_screen_with_text(self, text: str) -> bool:
-        return text in dumps(self._retrieve_client_screen_content())
+        return text in self.get_screen_text().serialized
 
-    def wait_for_screen_change(self, timeout: float = 10.0) -> None:
+    @property
+    def settle_stats(self) -> SettleStats:
+        """
+        :return: Statistics on the time needed by the screen to settle after
+                 the screen changes detected so far.
+        :rtype: SettleStats
+        """
+        return SettleStats(**vars(self._settle_stats))
+
+    def reset_settle_stats(self) -> None:
+        self._settle_stats = SettleStats()
+
+    def _wait_for_stable_frame(self, screenshot: BytesIO) -> Tuple[BytesIO, int]:
+        # Returns once `settle_frames` consecutive screenshots are identical
+        # without any screen event in between, or after `settle_timeout`
+        # if the screen keeps changing (animations for instance).
+        start = time()
+        sequence = self.events_sequence
+        identical = 1
+        timed_out = False
+        while identical < self._settle_frames:
+            if time() - start >= self._settle_timeout:
+                timed_out = True
+                break
+            sleep(self._settle_interval)
+            current = self.events_sequence
+            previous, screenshot = screenshot, BytesIO(self._client.get_screenshot())
+            # Speculos encodes identical frame buffers into identical images
+            if current == sequence and screenshot.getvalue() == previous.getvalue():
+                identical += 1
+            else:
+                identical = 1
+                sequence = current
+        self._settle_stats.add(time() - start, timed_out)
+        return screenshot, sequence
+
+    def _poll_for_screen_change(self, timeout: float) -> None:
         start = time()
+        delays = _backoff(self._settle_interval, 0.2)
         screenshot = BytesIO(self._client.get_screenshot())
         while screenshot_equal(screenshot, self._last_screenshot):
             # Give some time to other threads, and mostly Speculos one
-            sleep(0.2)
+            sleep(next(delays))
             if (time() - start > timeout):
                 raise TimeoutError("Timeout waiting for screen change")
             screenshot = BytesIO(self._client.get_screenshot())
 
         # Speculos has received at least one new event to redisplay the screen
-        # Wait a bit to ensure the event batch is received and processed by Speculos before returning
-        sleep(0.2)
+        # Wait for the screen to stop changing before returning
+        screenshot, sequence = self._wait_for_stable_frame(screenshot)
 
         # Update self._last_screenshot to use it as reference for next calls
-        self._last_screenshot = BytesIO(self._client.get_screenshot())
+        self._last_screenshot_sequence = sequence
+        self._last_screenshot = screenshot
+        self._screen_may_change()
+        self._record_screen(screenshot.getvalue())
+
+    def _wait_for_screen_change_event(self, watcher: _ScreenEventsWatcher, timeout: float) -> None:
+        endtime = time() + timeout
+        sequence = self._last_screenshot_sequence
+        while True:
+            remaining = endtime - time()
+            if not watcher.available:
+                self._poll_for_screen_change(max(remaining, 0))
+                return
+            received = watcher.wait_for_event(sequence, min(remaining, self._EVENTS_POLL_FALLBACK))
+            if received:
+                # Wait for the end of the event batch instead of a fixed delay
+                watcher.wait_for_quiet(self._events_settle_window, max(endtime - time(), 0))
+            sequence = watcher.sequence
+            screenshot = BytesIO(self._client.get_screenshot())
+            if not screenshot_equal(screenshot, self._last_screenshot):
+                if not received:
+                    # Screen changed without any event: nothing tells when the
+                    # redisplay ends, so wait for the screen to stop changing
+                    screenshot, sequence = self._wait_for_stable_frame(screenshot)
+                # Update self._last_screenshot to use it as reference for next calls
+                self._last_screenshot_sequence = sequence
+                self._last_screenshot = screenshot
+                self._screen_may_change()
+                self._record_screen(screenshot.getvalue())
+                return
+            if time() > endtime:
+                raise TimeoutError("Timeout waiting for screen change")
+
+    def wait_for_screen_change(self, timeout: float = 10.0) -> None:
+        watcher = self._events_watcher
+        if watcher is not None and watcher.available:
+            self._wait_for_screen_change_event(watcher, timeout)
+        else:
+            self._poll_for_screen_change(timeout)
+
+    @property
+    def screen_events_sequence(self) -> Optional[int]:
+        return self.events_sequence if self.events_stream_available else None
+
+    def wait_for_screen_events(self, after: int, timeout: float = 10.0) -> bool:
+        watcher = self._events_watcher
+        if watcher is None or not watcher.available:
+            return False
+        endtime = time() + timeout
+        if not watcher.wait_for_event(after, timeout):
+            return False
+        # Wait for the end of the event batch, so that the whole screen is known
+        watcher.wait_for_quiet(self._events_settle_window, max(endtime - time(), 0))
+        self._screen_may_change()
+        return True
+
+    def sync_screen(self) -> None:
+        screenshot, sequence = self._wait_for_stable_frame(BytesIO(self._client.get_screenshot()))
+        self._last_screenshot_sequence = sequence
+        self._last_screenshot = screenshot
+        self._screen_may_change()
+        self._record_screen(screenshot.getvalue())
 
     def wait_for_home_screen(self, timeout: float = 10.0) -> None:
         if screenshot_equal(self._last_screenshot, self._home_screenshot):
@@ -41,6 +41,9 @@ class StubBackend(BackendInterface):
     def handle_usb_reset(self) -> None:
         pass
 
+    def warm_reset(self, timeout: float = 5.0) -> bool:
+        return True
+
     def send_raw(self, data: bytes = b""):
         pass
 
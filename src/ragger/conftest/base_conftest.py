@@ -1,15 +1,19 @@
 import pytest
-from typing import Optional
+from typing import Any, Dict, Optional
 from pathlib import Path
 from ragger.firmware import Firmware
-from ragger.backend import SpeculosBackend, LedgerCommBackend, LedgerWalletBackend
+from ragger.backend import BackendInterface, SpeculosBackend, LedgerCommBackend, LedgerWalletBackend
 from ragger.navigator import NanoNavigator, StaxNavigator
+from ragger.navigator.snapshot_dirs import SnapshotDirManager
 from ragger.utils import find_project_root_dir, app_path_from_app_name
+from ragger.utils.apdu_trace import ApduTraceRecorder
+from ragger.utils.profiler import NavigationProfiler
 from ragger.utils.misc import get_current_app_name_and_version, exit_current_app, open_app_from_dashboard
 from ragger.logger import get_default_logger
 from dataclasses import fields
 
 from . import configuration as conf
+from .speculos_pool import SpeculosPool
 
 BACKENDS = ["speculos", "ledgercomm", "ledgerwallet"]
 
@@ -37,7 +41,22 @@ def pytest_addoption(parser):
                      help="Do not compare the snapshots during testing, but instead save the live "
                      "ones. Will only work with 'speculos' as the backend")
     parser.addoption("--log_apdu_file", action="store", default=None, help="Log the APDU in a file")
+    parser.addoption("--apdu_trace_file",
+                     action="store",
+                     default=None,
+                     help="Record the APDU in a binary trace file (see "
+                     "ragger.utils.apdu_trace.convert_trace_to_text)")
     parser.addoption("--seed", action="store", default=None, help="Set a custom seed")
+    parser.addoption("--profile_navigation",
+                     action="store_true",
+                     default=False,
+                     help="Profile the navigator instructions, and print a summary at the end of "
+                     "the session")
+    parser.addoption("--profile_navigation_json",
+                     action="store",
+                     default=None,
+                     help="Profile the navigator instructions, and export the results into the "
+                     "given JSON file")
 
 
 @pytest.fixture(scope="session")
@@ -61,6 +80,16 @@ def log_apdu_file(pytestconfig):
     return Path(filename).resolve() if filename is not None else None
 
 
+@pytest.fixture(scope="session")
+def apdu_trace(pytestconfig):
+    filename = pytestconfig.getoption("apdu_trace_file")
+    if filename is None:
+        yield None
+        return
+    with ApduTraceRecorder(Path(filename).resolve()) as recorder:
+        yield recorder
+
+
 @pytest.fixture(scope="session")
 def cli_user_seed(pytestconfig):
     return pytestconfig.getoption("seed")
@@ -155,6 +184,34 @@ def prepare_speculos_args(root_pytest_dir: Path, firmware: Firmware, display: bo
     return (app_path, {"args": speculos_args})
 
 
+def speculos_backend_args():
+    return {
+        "startup_timeout": conf.OPTIONAL.SPECULOS_STARTUP_TIMEOUT,
+        "startup_backoff_initial": conf.OPTIONAL.SPECULOS_STARTUP_BACKOFF_INITIAL,
+        "startup_backoff_max": conf.OPTIONAL.SPECULOS_STARTUP_BACKOFF_MAX,
+        "settle_frames": conf.OPTIONAL.SPECULOS_SETTLE_FRAMES,
+        "settle_interval": conf.OPTIONAL.SPECULOS_SETTLE_INTERVAL,
+        "settle_timeout": conf.OPTIONAL.SPECULOS_SETTLE_TIMEOUT,
+        "lazy_tmp_snapshots": conf.OPTIONAL.LAZY_TMP_SNAPSHOTS,
+        "tmp_snapshot_workers": conf.OPTIONAL.TMP_SNAPSHOT_WORKERS
+    }
+
+
+# OCR results are shared by all the physical backends of the session
+_OCR_CACHES: Dict[Path, Any] = dict()
+
+
+def physical_backend_args(root_pytest_dir: Path):
+    if not conf.OPTIONAL.OCR_CACHE_DIR:
+        return {}
+    # Physical backends dependencies (Tesseract) are only needed when used
+    from ragger.utils.ocr_cache import OcrCache
+    directory = root_pytest_dir / conf.OPTIONAL.OCR_CACHE_DIR
+    if directory not in _OCR_CACHES:
+        _OCR_CACHES[directory] = OcrCache(directory)
+    return {"ocr_cache": _OCR_CACHES[directory]}
+
+
 # Depending on the "--backend" option value, a different backend is
 # instantiated, and the tests will either run on Speculos or on a physical
 # device depending on the backend
@@ -164,26 +221,73 @@ def create_backend(root_pytest_dir: Path, backend_name: str, firmware: Firmware,
         return LedgerCommBackend(firmware=firmware,
                                  interface="hid",
                                  log_apdu_file=log_apdu_file,
-                                 with_gui=display)
+                                 with_gui=display,
+                                 **physical_backend_args(root_pytest_dir))
     elif backend_name.lower() == "ledgerwallet":
-        return LedgerWalletBackend(firmware=firmware, log_apdu_file=log_apdu_file, with_gui=display)
+        return LedgerWalletBackend(firmware=firmware,
+                                   log_apdu_file=log_apdu_file,
+                                   with_gui=display,
+                                   **physical_backend_args(root_pytest_dir))
     elif backend_name.lower() == "speculos":
         app_path, speculos_args = prepare_speculos_args(root_pytest_dir, firmware, display,
                                                         cli_user_seed)
         return SpeculosBackend(app_path,
                                firmware=firmware,
                                log_apdu_file=log_apdu_file,
+                               **speculos_backend_args(),
                                **speculos_args)
     else:
         raise ValueError(f"Backend '{backend_name}' is unknown. Valid backends are: {BACKENDS}")
 
 
+# Speculos instances are started on dynamically picked ports, so that several pytest-xdist
+# workers can run in parallel. They are kept running across backend scopes if warm reset is
+# enabled.
+@pytest.fixture(scope="session")
+def speculos_pool(root_pytest_dir, display, log_apdu_file, cli_user_seed):
+
+    def factory(firmware: Firmware, port: int, apdu_port: int) -> SpeculosBackend:
+        app_path, speculos_args = prepare_speculos_args(root_pytest_dir, firmware, display,
+                                                        cli_user_seed)
+        return SpeculosBackend(app_path,
+                               firmware=firmware,
+                               port=port,
+                               apdu_port=apdu_port,
+                               log_apdu_file=log_apdu_file,
+                               **speculos_backend_args(),
+                               **speculos_args)
+
+    pool = SpeculosPool(factory,
+                        warm_reset=conf.OPTIONAL.WARM_RESET,
+                        warm_reset_timeout=conf.OPTIONAL.WARM_RESET_TIMEOUT)
+    yield pool
+    pool.close()
+
+
+def _set_apdu_trace(backend: BackendInterface, apdu_trace: Optional[ApduTraceRecorder],
+                    log_apdu_file: Optional[Path]) -> None:
+    backend.apdu_trace = apdu_trace
+    # With a binary trace, APDUs are only logged as text into a requested file
+    backend.apdu_text_log = apdu_trace is None or log_apdu_file is not None
+
+
 # Backend scope can be configured by the user
 @pytest.fixture(scope=conf.OPTIONAL.BACKEND_SCOPE)
-def backend(root_pytest_dir, backend_name, firmware, display, log_apdu_file, cli_user_seed):
+def backend(root_pytest_dir, backend_name, firmware, display, log_apdu_file, cli_user_seed,
+            speculos_pool, apdu_trace):
+    if backend_name.lower() == "speculos":
+        b = speculos_pool.acquire(firmware)
+        _set_apdu_trace(b, apdu_trace, log_apdu_file)
+        try:
+            yield b
+        finally:
+            speculos_pool.release(b)
+        return
+
     with create_backend(root_pytest_dir, backend_name, firmware, display, log_apdu_file,
                         cli_user_seed) as b:
-        if backend_name.lower() != "speculos" and conf.OPTIONAL.APP_NAME:
+        _set_apdu_trace(b, apdu_trace, log_apdu_file)
+        if conf.OPTIONAL.APP_NAME:
             # Make sure the app is restarted as this is what is requested by the fixture scope
             app_name, version = get_current_app_name_and_version(b)
             requested_app = conf.OPTIONAL.APP_NAME
@@ -197,14 +301,40 @@ def backend(root_pytest_dir, backend_name, firmware, display, log_apdu_file, cli
         yield b
 
 
+# Snapshots directories are checked and cleaned up once per session
+@pytest.fixture(scope="session")
+def snapshot_dirs() -> SnapshotDirManager:
+    return SnapshotDirManager()
+
+
 @pytest.fixture(scope=conf.OPTIONAL.BACKEND_SCOPE)
-def navigator(backend, firmware, golden_run):
+def navigator(backend, firmware, golden_run, navigation_profiler, snapshot_dirs):
     if firmware.device.startswith("nano"):
-        return NanoNavigator(backend, firmware, golden_run)
+        nav = NanoNavigator(backend, firmware, golden_run)
     elif firmware.device.startswith("stax"):
-        return StaxNavigator(backend, firmware, golden_run)
+        nav = StaxNavigator(backend, firmware, golden_run)
     else:
         raise ValueError(f"Device '{firmware.device}' is unsupported.")
+    nav.profiler = navigation_profiler
+    nav.snapshot_dirs = snapshot_dirs
+    return nav
+
+
+NAVIGATION_PROFILER = pytest.StashKey[NavigationProfiler]()
+
+
+@pytest.fixture(scope="session")
+def navigation_profiler(pytestconfig) -> Optional[NavigationProfiler]:
+    return pytestconfig.stash.get(NAVIGATION_PROFILER, None)
+
+
+@pytest.fixture(autouse=True)
+def profile_navigation_per_test(request, navigation_profiler):
+    if navigation_profiler is None:
+        yield
+        return
+    with navigation_profiler.test(request.node.nodeid):
+        yield
 
 
 @pytest.fixture(autouse=True)
@@ -216,11 +346,52 @@ def use_only_on_backend(request, backend_name):
             pytest.skip(f'skipped on this backend: "{current_backend}"')
 
 
+TEST_REPORTS = pytest.StashKey[Dict[str, pytest.TestReport]]()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    item.stash.setdefault(TEST_REPORTS, dict())[report.when] = report
+
+
+# Temporary snapshots kept in memory by the backend (lazy mode) are only
+# written if the test fails
+@pytest.fixture(autouse=True)
+def tmp_snapshots_on_failure(request):
+    if "backend" not in request.fixturenames:
+        yield
+        return
+    b = request.getfixturevalue("backend")
+    yield
+    reports = request.node.stash.get(TEST_REPORTS, dict())
+    if any(report.failed for report in reports.values()):
+        b.flush_tmp_snapshots()
+    else:
+        b.discard_tmp_snapshots()
+
+
 def pytest_configure(config):
     config.addinivalue_line(
         "markers",
         "use_on_backend(backend): skip test if not on the specified backend",
     )
+    if config.getoption("profile_navigation") or config.getoption("profile_navigation_json"):
+        config.stash[NAVIGATION_PROFILER] = NavigationProfiler()
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    profiler = config.stash.get(NAVIGATION_PROFILER, None)
+    if profiler is None:
+        return
+    json_path = config.getoption("profile_navigation_json")
+    if json_path:
+        profiler.dump_json(json_path)
+    if config.getoption("profile_navigation"):
+        terminalreporter.section("Navigation profile (seconds)")
+        for line in profiler.summary():
+            terminalreporter.write_line(line)
 
 
 def log_full_conf():
@@ -9,6 +9,17 @@ class OptionalOptions:
     SIDELOADED_APPS_DIR: str
     BACKEND_SCOPE: str
     CUSTOM_SEED: str
+    WARM_RESET: bool
+    WARM_RESET_TIMEOUT: float
+    SPECULOS_STARTUP_TIMEOUT: float
+    SPECULOS_STARTUP_BACKOFF_INITIAL: float
+    SPECULOS_STARTUP_BACKOFF_MAX: float
+    SPECULOS_SETTLE_FRAMES: int
+    SPECULOS_SETTLE_INTERVAL: float
+    SPECULOS_SETTLE_TIMEOUT: float
+    LAZY_TMP_SNAPSHOTS: bool
+    TMP_SNAPSHOT_WORKERS: int
+    OCR_CACHE_DIR: str
 
 
 OPTIONAL = OptionalOptions(
@@ -36,10 +47,51 @@ OPTIONAL = OptionalOptions(
     # You can choose to share the backend instance between {session / module / class / function}
     # When using "session" all your tests will share a single backend instance (faster)
     # When using "function" each test will have its independent backend instance (no collusion)
+    # Speculos instances run on dynamically picked ports, so tests can be parallelized with pytest-xdist
     BACKEND_SCOPE="class",
 
     # Use this parameter if you want speculos to use a custom seed instead of the default one.
     # This would result in speculos being launched with --seed <CUSTOM_SEED>
     # If a seed is provided through the "--seed" pytest command line option, it will override this one.
     CUSTOM_SEED=str(),
+
+    # Use this parameter if you want Speculos instances to be shared between backend scopes.
+    # Instead of being restarted, the running application is then expected to come back on its home
+    # screen (waiting at most WARM_RESET_TIMEOUT seconds), and is only restarted if it does not.
+    # This saves the application boot time for each scope, but the application state which is not
+    # reset by going back to the home screen is shared between scopes: NVM content (settings,
+    # stored keys or data) and RAM state kept by the application. Only enable it for tests which
+    # do not depend on this state.
+    # This is only used for the Speculos backend.
+    WARM_RESET=False,
+    WARM_RESET_TIMEOUT=5.0,
+
+    # Speculos readiness is probed with an exponential backoff, starting at
+    # SPECULOS_STARTUP_BACKOFF_INITIAL seconds between probes and doubling up to
+    # SPECULOS_STARTUP_BACKOFF_MAX seconds. Startup fails after SPECULOS_STARTUP_TIMEOUT seconds.
+    # The duration of each startup phase is logged, and available in `backend.startup_timings`.
+    SPECULOS_STARTUP_TIMEOUT=20.0,
+    SPECULOS_STARTUP_BACKOFF_INITIAL=0.005,
+    SPECULOS_STARTUP_BACKOFF_MAX=0.25,
+
+    # Once a screen change is detected, the Speculos backend waits until SPECULOS_SETTLE_FRAMES
+    # consecutive screenshots (taken every SPECULOS_SETTLE_INTERVAL seconds) are identical, so that
+    # the screen is completely redrawn. It stops waiting after SPECULOS_SETTLE_TIMEOUT seconds if
+    # the screen keeps changing. Settling statistics are available in `backend.settle_stats`.
+    SPECULOS_SETTLE_FRAMES=3,
+    SPECULOS_SETTLE_INTERVAL=0.02,
+    SPECULOS_SETTLE_TIMEOUT=0.2,
+
+    # Screenshots compared with golden snapshots are saved into the "snapshots-tmp" directory.
+    # With LAZY_TMP_SNAPSHOTS, the Speculos backend only saves the screenshots which do not match
+    # their golden snapshot, and the other ones of a test only if it fails.
+    # With TMP_SNAPSHOT_WORKERS > 0, they are saved by as many background threads.
+    LAZY_TMP_SNAPSHOTS=False,
+    TMP_SNAPSHOT_WORKERS=0,
+
+    # On physical backends with the GUI, texts are recognized (OCR) in the validated snapshots. The
+    # results are cached in memory and, if OCR_CACHE_DIR is set (relative path from the pytest root
+    # directory, example: ".ocr_cache"), on disk so that they are reused across runs.
+    # The golden snapshots of a test are recognized in the background as soon as it starts.
+    OCR_CACHE_DIR=str(),
 )
@@ -0,0 +1,113 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from typing import Callable, Dict, List
+
+from ragger.backend import SpeculosBackend
+from ragger.firmware import Firmware
+from ragger.logger import get_default_logger
+from ragger.utils.misc import find_free_ports
+
+SpeculosFactory = Callable[[Firmware, int, int], SpeculosBackend]
+
+
+class SpeculosPool:
+    """
+    A session-wide pool of running Speculos instances.
+
+    Every instance is started on its own API and APDU ports, picked dynamically,
+    so that several pools (one per pytest-xdist worker) can run side by side on
+    the same host.
+
+    Released instances are stopped, unless `warm_reset` is set: they are then
+    kept running, and warm reset (see :meth:`BackendInterface.warm_reset`:
+    the application NVM state is kept) before being handed back on the next
+    acquisition for the same firmware, instead of being restarted.
+    """
+
+    def __init__(self,
+                 factory: SpeculosFactory,
+                 warm_reset: bool = False,
+                 warm_reset_timeout: float = 5.0,
+                 host: str = "127.0.0.1"):
+        """
+        :param factory: Builds a (not yet started) backend from a firmware, an
+                        API port and an APDU port
+        :type factory: Callable[[Firmware, int, int], SpeculosBackend]
+        :param warm_reset: Keep released instances running, and warm reset them
+                           before handing them back
+        :type warm_reset: bool
+        :param warm_reset_timeout: Maximum time to wait for the application home
+                                   screen during a warm reset
+        :type warm_reset_timeout: float
+        :param host: Host the instances listen on
+        :type host: str
+        """
+        self._factory = factory
+        self._warm_reset = warm_reset
+        self._warm_reset_timeout = warm_reset_timeout
+        self._host = host
+        self._idle: Dict[Firmware, SpeculosBackend] = dict()
+        self._busy: List[SpeculosBackend] = list()
+        self.logger = get_default_logger()
+
+    @property
+    def reuse(self) -> bool:
+        return self._warm_reset
+
+    def acquire(self, firmware: Firmware) -> SpeculosBackend:
+        """
+        Returns a started Speculos backend emulating the given firmware.
+
+        :param firmware: The firmware to emulate
+        :type firmware: Firmware
+
+        :return: A started backend, exclusively owned by the caller until
+                 released
+        :rtype: SpeculosBackend
+        """
+        backend = self._idle.pop(firmware, None)
+        if backend is not None and self._warm_reset:
+            backend.warm_reset(self._warm_reset_timeout)
+        if backend is None:
+            api_port, apdu_port = find_free_ports(2, self._host)
+            self.logger.info(f"Starting Speculos for {firmware.device} on ports "
+                             f"{api_port} (API) / {apdu_port} (APDU)")
+            backend = self._factory(firmware, api_port, apdu_port).__enter__()
+        self._busy.append(backend)
+        return backend
+
+    def release(self, backend: SpeculosBackend) -> None:
+        """
+        Gives back a backend obtained through `acquire`. It is either kept
+        running for later reuse or stopped.
+
+        :param backend: The backend to release
+        :type backend: SpeculosBackend
+        """
+        self._busy.remove(backend)
+        if self._warm_reset and backend.firmware not in self._idle:
+            self._idle[backend.firmware] = backend
+        else:
+            backend.__exit__(None, None, None)
+
+    def close(self) -> None:
+        """
+        Stops every instance of the pool.
+        """
+        for backend in list(self._idle.values()) + self._busy:
+            backend.__exit__(None, None, None)
+        self._idle.clear()
+        self._busy.clear()
@@ -62,10 +62,21 @@ class Suggestions(_Layout):
 # Keyboards
 class _GenericKeyboard(_Layout):
 
-    def write(self, word: str):
-        for letter in word.lower():
-            logging.info("Writing letter '%s', position '%s'", letter, self.positions[letter])
-            self.client.finger_touch(*self.positions[letter])
+    def write(self, word: str, delay: float = 0.5):
+        """
+        Writes a word, touching all its letters in one input sequence.
+
+        :param word: The word to write
+        :type word: str
+        :param delay: Time (in seconds) each key is held, as the default finger
+                      touch. Applications which handle shorter touches can be
+                      written faster with a lower delay (0.1 for instance).
+        :type delay: float
+        """
+        positions = self.positions
+        touches = [tuple(positions[letter]) for letter in word.lower()]
+        logging.info("Writing word '%s', positions '%s'", word, touches)
+        self.client.touch_sequence(touches, delay=delay)
 
     def back(self):
         self.client.finger_touch(*self.positions["back"])
@@ -17,5 +17,9 @@ from .instruction import NavInsID, NavIns
 from .navigator import Navigator
 from .stax_navigator import StaxNavigator
 from .nano_navigator import NanoNavigator
+from .async_navigator import AsyncNavigator, AsyncNanoNavigator
 
-__all__ = ["NavInsID", "NavIns", "Navigator", "StaxNavigator", "NanoNavigator"]
+__all__ = [
+    "NavInsID", "NavIns", "Navigator", "StaxNavigator", "NanoNavigator", "AsyncNavigator",
+    "AsyncNanoNavigator"
+]
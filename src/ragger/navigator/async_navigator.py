@@ -0,0 +1,154 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from abc import ABC
+from asyncio import sleep
+from time import monotonic
+from typing import Awaitable, Callable, Dict, List, Union
+
+from ragger.backend import AsyncBackendInterface
+from ragger.firmware import Firmware
+
+from .instruction import NavIns, NavInsID
+
+AsyncCallback = Callable[..., Awaitable[None]]
+
+# These instructions already wait for a screen change in their callback
+_WAITING_INSTRUCTIONS = (NavInsID.WAIT_FOR_SCREEN_CHANGE, NavInsID.WAIT_FOR_HOME_SCREEN,
+                         NavInsID.WAIT_FOR_TEXT_ON_SCREEN, NavInsID.WAIT_FOR_TEXT_NOT_ON_SCREEN)
+
+
+class AsyncNavigator(ABC):
+    """
+    The asyncio counterpart of :class:`Navigator
+    <ragger.navigator.navigator.Navigator>`, driving an
+    :class:`AsyncBackendInterface <ragger.backend.async_interface.AsyncBackendInterface>`
+    with coroutine callbacks.
+    """
+
+    def __init__(self, backend: AsyncBackendInterface, firmware: Firmware,
+                 callbacks: Dict[NavInsID, AsyncCallback]):
+        """
+        :param backend: Which Backend will be managed
+        :type backend: AsyncBackendInterface
+        :param firmware: Which Firmware will be managed
+        :type firmware: Firmware
+        :param callbacks: Coroutine callbacks to use to navigate
+        :type callbacks: Dict[NavInsID, Callable[..., Awaitable[None]]]
+        """
+        self._backend = backend
+        self._firmware = firmware
+        self._callbacks = callbacks
+
+    def add_callback(self,
+                     ins_id: NavInsID,
+                     callback: AsyncCallback,
+                     override: bool = True) -> None:
+        """
+        Register a new coroutine callback (see :meth:`Navigator.add_callback
+        <ragger.navigator.navigator.Navigator.add_callback>`).
+
+        :raises KeyError: If the navigation instruction ID already exists and `override` is set to
+                          False
+        """
+        if not override and ins_id in self._callbacks:
+            raise KeyError(f"Navigation instruction ID '{ins_id}' already exists in the "
+                           "registered callbacks")
+        self._callbacks[ins_id] = callback
+
+    async def _run_instruction(self,
+                               instruction: Union[NavIns, NavInsID],
+                               timeout: float = 10.0,
+                               wait_for_screen_change: bool = True) -> None:
+        if isinstance(instruction, NavInsID):
+            instruction = NavIns(instruction)
+        if instruction.id not in self._callbacks:
+            raise NotImplementedError(f"No callback registered for instruction ID {instruction.id}")
+
+        await self._callbacks[instruction.id](*instruction.args, **instruction.kwargs)
+
+        # Wait for screen change unless explicitly specify otherwise
+        if wait_for_screen_change and instruction.id not in _WAITING_INSTRUCTIONS:
+            await self._backend.wait_for_screen_change(timeout)
+
+    async def navigate(self,
+                       instructions: List[Union[NavIns, NavInsID]],
+                       timeout: float = 10.0,
+                       screen_change_before_first_instruction: bool = True,
+                       screen_change_after_last_instruction: bool = True) -> None:
+        """
+        Navigate on the device according to a set of navigation instructions
+        provided (see :meth:`Navigator.navigate
+        <ragger.navigator.navigator.Navigator.navigate>`).
+
+        :raises NotImplementedError: If the navigation instruction is not implemented.
+        """
+        if screen_change_before_first_instruction:
+            await self._backend.wait_for_screen_change(timeout)
+
+        for idx, instruction in enumerate(instructions):
+            await self._run_instruction(
+                instruction,
+                timeout,
+                wait_for_screen_change=(idx + 1 != len(instructions)
+                                        or screen_change_after_last_instruction))
+
+    async def navigate_until_text(self,
+                                  navigate_instruction: Union[NavIns, NavInsID],
+                                  validation_instructions: List[Union[NavIns, NavInsID]],
+                                  text: str,
+                                  timeout: float = 300,
+                                  screen_change_before_first_instruction: bool = True,
+                                  screen_change_after_last_instruction: bool = True) -> None:
+        """
+        Navigate until some text is found on the screen content displayed (see
+        :meth:`Navigator.navigate_until_text
+        <ragger.navigator.navigator.Navigator.navigate_until_text>`).
+
+        :raises TimeoutError: If the text is not found.
+        """
+        endtime = monotonic() + timeout
+        if screen_change_before_first_instruction:
+            await self._backend.wait_for_screen_change(timeout)
+
+        # Navigate until the text specified in argument is found.
+        while not await self._backend.compare_screen_with_text(text):
+            remaining = endtime - monotonic()
+            if remaining < 0:
+                raise TimeoutError(f"Timeout waiting for text {text}")
+            await self._run_instruction(navigate_instruction, remaining)
+
+        if validation_instructions:
+            await self.navigate(
+                validation_instructions,
+                timeout=endtime - monotonic(),
+                screen_change_before_first_instruction=False,
+                screen_change_after_last_instruction=screen_change_after_last_instruction)
+
+
+class AsyncNanoNavigator(AsyncNavigator):
+
+    def __init__(self, backend: AsyncBackendInterface, firmware: Firmware):
+        callbacks: Dict[NavInsID, AsyncCallback] = {
+            NavInsID.WAIT: sleep,
+            NavInsID.WAIT_FOR_SCREEN_CHANGE: backend.wait_for_screen_change,
+            NavInsID.WAIT_FOR_HOME_SCREEN: backend.wait_for_home_screen,
+            NavInsID.WAIT_FOR_TEXT_ON_SCREEN: backend.wait_for_text_on_screen,
+            NavInsID.WAIT_FOR_TEXT_NOT_ON_SCREEN: backend.wait_for_text_not_on_screen,
+            NavInsID.RIGHT_CLICK: backend.right_click,
+            NavInsID.LEFT_CLICK: backend.left_click,
+            NavInsID.BOTH_CLICK: backend.both_click
+        }
+        super().__init__(backend, firmware, callbacks)
@@ -21,17 +21,34 @@ from ragger.firmware import Firmware
 from .navigator import NavInsID, Navigator
 
 
+def _clicks(click: Callable[[], None], backend: BackendInterface,
+            button: str) -> Callable[[int], None]:
+
+    def clicks(count: int = 1) -> None:
+        # Repeated clicks are injected as a single press sequence, the screen
+        # is only waited for after the last one
+        if count == 1:
+            click()
+        else:
+            backend.press_sequence([button] * count)
+
+    return clicks
+
+
 class NanoNavigator(Navigator):
 
     def __init__(self, backend: BackendInterface, firmware: Firmware, golden_run: bool = False):
-        callbacks: Dict[NavInsID, Callable] = {
+        super().__init__(backend, firmware, self._build_callbacks(backend, firmware), golden_run)
+
+    @staticmethod
+    def _build_callbacks(backend: BackendInterface, firmware: Firmware) -> Dict[NavInsID, Callable]:
+        return {
             NavInsID.WAIT: sleep,
             NavInsID.WAIT_FOR_SCREEN_CHANGE: backend.wait_for_screen_change,
             NavInsID.WAIT_FOR_HOME_SCREEN: backend.wait_for_home_screen,
             NavInsID.WAIT_FOR_TEXT_ON_SCREEN: backend.wait_for_text_on_screen,
             NavInsID.WAIT_FOR_TEXT_NOT_ON_SCREEN: backend.wait_for_text_not_on_screen,
-            NavInsID.RIGHT_CLICK: backend.right_click,
-            NavInsID.LEFT_CLICK: backend.left_click,
-            NavInsID.BOTH_CLICK: backend.both_click
+            NavInsID.RIGHT_CLICK: _clicks(backend.right_click, backend, "right"),
+            NavInsID.LEFT_CLICK: _clicks(backend.left_click, backend, "left"),
+            NavInsID.BOTH_CLICK: _clicks(backend.both_click, backend, "both")
         }
-        super().__init__(backend, firmware, callbacks, golden_run)
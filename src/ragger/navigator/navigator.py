@@ -14,16 +14,70 @@
    limitations under the License.
 """
 from abc import ABC
+from concurrent.futures import Future
+from dataclasses import dataclass
 from pathlib import Path
 from tempfile import NamedTemporaryFile
-from time import time
-from typing import Callable, Dict, List, Optional, Union
+from time import sleep, time
+from typing import Callable, Dict, Hashable, List, Mapping, Optional, Tuple, Union, \
+    cast
 
 from ragger.backend import BackendInterface, SpeculosBackend
 from ragger.firmware import Firmware
 from ragger.utils import Crop
+from ragger.utils.compare_pool import CompareJob, ComparePool
+from ragger.utils.golden_set import GoldenSet, Key
+from ragger.utils.profiler import NavigationProfiler, CALLBACK, COMPARISON, SETTLE, \
+    profile_instruction, profile_phase
+from ragger.utils.snapshot_bundle import BUNDLE_SUFFIX, SNAPSHOT_BUNDLES
+from ragger.utils.snapshot_store import SNAPSHOT_STORES, is_snapshot_store
 
 from .instruction import NavIns, NavInsID
+from .plan import NO_WAIT, PLAN_CACHE, PROGRESS, SCREEN_CHANGE, SLEEP, ActionTracer, \
+    NavigationPlan, PlanAction, PlanCache, PlanStep
+from .snapshot_dirs import SnapshotDirManager
+
+# Consecutive clicks of a step are sent as a press sequence of these buttons
+_BATCHED_CLICKS = {"right_click": "right", "left_click": "left", "both_click": "both"}
+
+# These instructions already wait for a screen change in their callback
+WAITING_INSTRUCTIONS = (NavInsID.WAIT_FOR_SCREEN_CHANGE, NavInsID.WAIT_FOR_HOME_SCREEN,
+                        NavInsID.WAIT_FOR_TEXT_ON_SCREEN, NavInsID.WAIT_FOR_TEXT_NOT_ON_SCREEN)
+
+
+@dataclass
+class SnapWaitStats:
+    """
+    Number of screen comparisons performed by the waits for a snapshot.
+    ``last`` is the number of comparisons of the latest wait, ``timeouts``
+    counts the waits which did not find the snapshot.
+    """
+    count: int = 0
+    comparisons: int = 0
+    maximum: int = 0
+    last: int = 0
+    timeouts: int = 0
+
+    @property
+    def mean(self) -> float:
+        return self.comparisons / self.count if self.count else 0.0
+
+    def add(self, comparisons: int, timed_out: bool = False) -> None:
+        self.count += 1
+        self.comparisons += comparisons
+        self.maximum = max(self.maximum, comparisons)
+        self.last = comparisons
+        self.timeouts += int(timed_out)
+
+
+@dataclass
+class FastForwardStats:
+    """
+    Number of navigation inputs sent by the fast forward navigations, and
+    number of times the device fell behind and had to be resynchronized.
+    """
+    inputs: int = 0
+    resyncs: int = 0
 
 
 class Navigator(ABC):
@@ -31,6 +85,11 @@ class Navigator(ABC):
     GOLDEN_INSTRUCTION_SLEEP_MULTIPLIER_FIRST = 2
     GOLDEN_INSTRUCTION_SLEEP_MULTIPLIER_MIDDLE = 5
     GOLDEN_INSTRUCTION_SLEEP_MULTIPLIER_LAST = 2
+    # Time given to the device to emit the screen events of a fast forward
+    # input, before it is considered to have fallen behind
+    FAST_FORWARD_STEP_TIMEOUT = 1.0
+    # Time given to the device to catch up once it fell behind
+    FAST_FORWARD_RESYNC_TIMEOUT = 10.0
 
     def __init__(self,
                  backend: BackendInterface,
@@ -51,7 +110,96 @@ class Navigator(ABC):
         self._backend = backend
         self._firmware = firmware
         self._callbacks = callbacks
+        # The callbacks given at instantiation, which can be resolved into
+        # backend actions (see compile())
+        self._builtin_callbacks = dict(callbacks)
+        self._tracer = ActionTracer()
+        self._traced_callbacks: Optional[Dict[NavInsID, Callable]] = None
+        self.plan_cache: PlanCache = PLAN_CACHE
         self._golden_run = golden_run
+        self._profiler: Optional[NavigationProfiler] = None
+        self._snapshot_dirs: Optional[SnapshotDirManager] = None
+        self._compare_pool: Optional[ComparePool] = None
+        self._snap_wait_stats = SnapWaitStats()
+        self._fast_forward_stats = FastForwardStats()
+
+    @staticmethod
+    def _build_callbacks(backend: BackendInterface, firmware: Firmware) -> Dict[NavInsID, Callable]:
+        # The navigator callbacks, built upon `backend`. Overridden by the
+        # device navigators, so that their instructions can be resolved into
+        # backend actions by calling the callbacks on a tracing backend.
+        return dict()
+
+    @property
+    def profiler(self) -> Optional[NavigationProfiler]:
+        """
+        The (opt-in) profiler recording the time spent in each navigation
+        instruction. It is shared with the backend, which records the
+        screenshot, comparison and disk write phases.
+
+        :rtype: Optional[NavigationProfiler]
+        """
+        return self._profiler
+
+    @profiler.setter
+    def profiler(self, profiler: Optional[NavigationProfiler]) -> None:
+        self._profiler = profiler
+        self._backend.profiler = profiler
+
+    @property
+    def snapshot_dirs(self) -> Optional[SnapshotDirManager]:
+        """
+        The (opt-in) cache of the snapshots directories state. Without it, the
+        directories are checked and scanned on each navigation start.
+
+        :rtype: Optional[SnapshotDirManager]
+        """
+        return self._snapshot_dirs
+
+    @snapshot_dirs.setter
+    def snapshot_dirs(self, snapshot_dirs: Optional[SnapshotDirManager]) -> None:
+        self._snapshot_dirs = snapshot_dirs
+
+    @property
+    def compare_pool(self) -> Optional[ComparePool]:
+        """
+        The (opt-in) pool of worker processes the snapshots of
+        :meth:`navigate_and_compare` are compared in. With it, the screenshots
+        are only captured during the navigation, and compared in the
+        background while the next instructions are run. Golden runs are not
+        pipelined.
+
+        :rtype: Optional[ComparePool]
+        """
+        return self._compare_pool
+
+    @compare_pool.setter
+    def compare_pool(self, compare_pool: Optional[ComparePool]) -> None:
+        self._compare_pool = compare_pool
+
+    @property
+    def snap_wait_stats(self) -> SnapWaitStats:
+        """
+        :return: Statistics on the number of screen comparisons performed
+                 while waiting for a snapshot to be displayed.
+        :rtype: SnapWaitStats
+        """
+        return SnapWaitStats(**vars(self._snap_wait_stats))
+
+    def reset_snap_wait_stats(self) -> None:
+        self._snap_wait_stats = SnapWaitStats()
+
+    @property
+    def fast_forward_stats(self) -> FastForwardStats:
+        """
+        :return: Statistics on the fast forward navigations (see
+                 :meth:`navigate_until_text`).
+        :rtype: FastForwardStats
+        """
+        return FastForwardStats(**vars(self._fast_forward_stats))
+
+    def reset_fast_forward_stats(self) -> None:
+        self._fast_forward_stats = FastForwardStats()
 
     def _get_snaps_dir_path(self, path: Path, test_case_name: Path, is_golden: bool) -> Path:
         if is_golden:
@@ -60,18 +208,54 @@ class Navigator(ABC):
             subdir = "snapshots-tmp"
         return path / subdir / self._firmware.device / test_case_name
 
+    def _get_snaps_bundle_path(self, path: Path) -> Path:
+        return path / "snapshots" / f"{self._firmware.device}{BUNDLE_SUFFIX}"
+
+    def _open_snaps_bundle(self, path: Path) -> bool:
+        # Golden snapshots are read from the device bundle, if any, instead
+        # of the snapshots directory. Golden runs still write directories.
+        if self._golden_run:
+            return False
+        bundle_path = self._get_snaps_bundle_path(path)
+        if not bundle_path.is_file():
+            return False
+        SNAPSHOT_BUNDLES.open(bundle_path, path / "snapshots" / self._firmware.device)
+        return True
+
     def _check_snaps_dir_path(self, path: Path, test_case_name: Path, is_golden: bool) -> Path:
         dir_path = self._get_snaps_dir_path(path, test_case_name, is_golden)
+        if self._snapshot_dirs is None:
+            return self._do_check_snaps_dir_path(path, dir_path, is_golden)
+        if not self._snapshot_dirs.is_checked(dir_path):
+            self._do_check_snaps_dir_path(path, dir_path, is_golden)
+            self._snapshot_dirs.set_checked(dir_path)
+        return dir_path
+
+    def _do_check_snaps_dir_path(self, path: Path, dir_path: Path, is_golden: bool) -> Path:
+        if is_golden and self._open_snaps_bundle(path):
+            return dir_path
+        device_path = path / "snapshots" / self._firmware.device
+        if is_golden and is_snapshot_store(device_path):
+            # Golden snapshots are compared (and recorded) through the
+            # content-addressed store of the device
+            SNAPSHOT_STORES.open(device_path)
         if not dir_path.is_dir():
             if self._golden_run:
                 dir_path.mkdir(parents=True)
             else:
                 raise ValueError(f"Golden snapshots directory ({dir_path}) does not exist.")
+        if is_golden and not self._golden_run:
+            self._backend.prepare_golden_snapshots(dir_path)
         return dir_path
 
     def _init_snaps_temp_dir(self, path: Path, test_case_name: Path, start_idx: int = 0) -> Path:
         snaps_tmp_path = self._get_snaps_dir_path(path, test_case_name, False)
-        if snaps_tmp_path.exists():
+        # Screenshots kept in memory or being written by the backend would
+        # otherwise be written back once removed
+        self._backend.invalidate_tmp_snapshots(snaps_tmp_path, start_idx)
+        if self._snapshot_dirs is not None:
+            self._snapshot_dirs.init_tmp_dir(snaps_tmp_path, start_idx)
+        elif snaps_tmp_path.exists():
             for file in snaps_tmp_path.iterdir():
                 # Remove all files in format "index.png" with index >= start_idx
                 if not file.name.endswith(".png"):
@@ -89,22 +273,47 @@ class Navigator(ABC):
     def _get_snap_path(self, path: Path, index: int) -> Path:
         return path / f"{str(index).zfill(5)}.png"
 
+    def _get_tmp_snap_path(self, path: Path, index: int) -> Path:
+        snap_path = self._get_snap_path(path, index)
+        if self._snapshot_dirs is not None:
+            self._snapshot_dirs.record(snap_path)
+        return snap_path
+
+    def _wait_for_screen_change(self, timeout: float) -> bool:
+        # Returns False if the screen did not change before the timeout
+        try:
+            with profile_phase(self._profiler, SETTLE):
+                self._backend.wait_for_screen_change(max(timeout, 0))
+        except TimeoutError:
+            return False
+        return True
+
     def _compare_snap_with_timeout(self,
                                    path: Path,
                                    timeout_s: float = 5.0,
                                    crop: Optional[Crop] = None,
                                    tmp_snap_path: Optional[Path] = None) -> bool:
-        start = time()
-        now = start
-        while not (now - start > timeout_s):
+        # The screen is compared again only once it changed: the backend
+        # notifies screen changes instead of the screen being polled.
+        endtime = time() + timeout_s
+        comparisons = 0
+        found = False
+        while True:
+            comparisons += 1
             if self._backend.compare_screen_with_snapshot(path, crop, tmp_snap_path=tmp_snap_path):
-                return True
-            now = time()
-        return False
+                found = True
+                break
+            remaining = endtime - time()
+            if remaining <= 0 or not self._wait_for_screen_change(remaining):
+                break
+        self._snap_wait_stats.add(comparisons, not found)
+        self._backend.logger.debug(f"Snapshot {path} {'found' if found else 'not found'} after "
+                                   f"{comparisons} comparison(s)")
+        return found
 
     def _compare_snap(self, snaps_tmp_path: Path, snaps_golden_path: Path, index: int):
         golden = self._get_snap_path(snaps_golden_path, index)
-        tmp = self._get_snap_path(snaps_tmp_path, index)
+        tmp = self._get_tmp_snap_path(snaps_tmp_path, index)
 
         assert self._backend.compare_screen_with_snapshot(
             golden, tmp_snap_path=tmp,
@@ -139,13 +348,79 @@ class Navigator(ABC):
                          wait_for_screen_change: bool = True,
                          path: Optional[Path] = None,
                          test_case_name: Optional[Path] = None,
-                         snap_idx: int = 0) -> None:
+                         snap_idx: int = 0,
+                         step: Optional[PlanStep] = None) -> None:
+        # `step` is the instruction already resolved by compile(), in which
+        # case the other navigation arguments are the ones it was compiled with
         if isinstance(instruction, NavInsID):
             instruction = NavIns(instruction)
+        if step is None:
+            step = self._resolve(instruction, wait_for_screen_change, snap_idx)
+        self._run_step(step, timeout, path, test_case_name)
+
+    def _run_step(self, step: PlanStep, timeout: float, path: Optional[Path],
+                  test_case_name: Optional[Path]) -> None:
+        with profile_instruction(self._profiler, step.instruction):
+            self._execute_step(step, timeout, path, test_case_name)
+
+    def _traced(self, ins_id: NavInsID) -> Optional[Callable]:
+        # The callback resolving the instruction into backend actions, unless
+        # the instruction callback was replaced by a custom one
+        if self._traced_callbacks is None:
+            self._traced_callbacks = self._build_callbacks(cast(BackendInterface, self._tracer),
+                                                           self._firmware)
+        builtin = self._builtin_callbacks.get(ins_id)
+        if builtin is None or self._callbacks.get(ins_id) is not builtin:
+            return None
+        return self._traced_callbacks.get(ins_id)
+
+    def _resolve(self, instruction: NavIns, wait_for_screen_change: bool,
+                 snap_idx: Optional[int]) -> PlanStep:
         if instruction.id not in self._callbacks:
             raise NotImplementedError(f"No callback registered for instruction ID {instruction.id}")
+        args, kwargs = tuple(instruction.args), dict(instruction.kwargs)
+        actions: Optional[Tuple[PlanAction, ...]] = None
+        traced = self._traced(instruction.id)
+        if traced is sleep:
+            actions = (PlanAction(SLEEP, args, kwargs), )
+        elif traced is not None:
+            actions = self._tracer.trace(traced, *args, **kwargs)
+
+        if not wait_for_screen_change or instruction.id in WAITING_INSTRUCTIONS:
+            wait = NO_WAIT
+        elif instruction.id == NavInsID.USE_CASE_REVIEW_CONFIRM:
+            wait = PROGRESS
+        else:
+            wait = SCREEN_CHANGE
+        return PlanStep(instruction.id, actions, wait, snap_idx, args, kwargs)
+
+    def _send_actions(self, name: str, actions: List[PlanAction]) -> None:
+        if len(actions) > 1 and name in _BATCHED_CLICKS:
+            self._backend.press_sequence([_BATCHED_CLICKS[name]] * len(actions))
+            return
+        if len(actions) > 1 and name == "finger_touch":
+            self._backend.touch_sequence([action.args for action in actions])
+            return
+        for action in actions:
+            if name == SLEEP:
+                sleep(*action.args, **action.kwargs)
+            else:
+                getattr(self._backend, name)(*action.args, **action.kwargs)
+
+    def _run_step_actions(self, step: PlanStep) -> None:
+        with profile_phase(self._profiler, CALLBACK):
+            if step.actions is None:
+                if step.instruction not in self._callbacks:
+                    raise NotImplementedError(
+                        f"No callback registered for instruction ID {step.instruction}")
+                self._callbacks[step.instruction](*step.args, **step.kwargs)
+            else:
+                for name, actions in step.input_batches():
+                    self._send_actions(name, actions)
 
-        if instruction.id == NavInsID.USE_CASE_REVIEW_CONFIRM:
+    def _execute_step(self, step: PlanStep, timeout: float, path: Optional[Path],
+                      test_case_name: Optional[Path]) -> None:
+        if step.wait == PROGRESS:
             # Specific handling due to the fact that the screen is updated multiple
             # time with a progress bar during this instruction callback execution.
             # Indeed, this progress bar implies a screen change with previous screen
@@ -158,50 +433,157 @@ class Navigator(ABC):
             with NamedTemporaryFile(suffix='.png') as tmp:
                 tmp_file = Path(tmp.name)
                 # Backup screen content before instruction in tmp file
-                self._backend.compare_screen_with_snapshot(tmp_file,
-                                                           tmp_snap_path=tmp_file,
-                                                           golden_run=True)
-
-                # Call instruction callback
-                self._callbacks[instruction.id](*instruction.args, **instruction.kwargs)
-
-                # Wait for screen change unless explicitly specify otherwise
-                if wait_for_screen_change:
-                    # Compare to previous backup file without considering the bottom
-                    # which holds the progress bar.
-                    cropping = Crop(lower=220)
-                    endtime = time() + timeout
-                    while True:
+                self._backend.compare_screen_with_snapshot(tmp_file, golden_run=True)
+
+                self._run_step_actions(step)
+
+                # Compare to previous backup file without considering the bottom
+                # which holds the progress bar.
+                cropping = Crop(lower=220)
+                endtime = time() + timeout
+                while True:
+                    with profile_phase(self._profiler, SETTLE):
                         self._backend.wait_for_screen_change(endtime - time())
-                        if not self._backend.compare_screen_with_snapshot(tmp_file, cropping):
-                            break
+                    if not self._backend.compare_screen_with_snapshot(tmp_file, cropping):
+                        break
 
         else:
-            # Call instruction callback
-            self._callbacks[instruction.id](*instruction.args, **instruction.kwargs)
-
-            # Wait for screen change unless explicitly specify otherwise
-            if wait_for_screen_change:
-                if instruction.id == NavInsID.WAIT_FOR_SCREEN_CHANGE or \
-                   instruction.id == NavInsID.WAIT_FOR_HOME_SCREEN or \
-                   instruction.id == NavInsID.WAIT_FOR_TEXT_ON_SCREEN or \
-                   instruction.id == NavInsID.WAIT_FOR_TEXT_NOT_ON_SCREEN:
-                    # Function wait_for_screen_change() is already called during
-                    # instruction callback execution above.
-                    pass
-                else:
+            self._run_step_actions(step)
+
+            # Waiting instructions already called wait_for_screen_change() in
+            # their actions above, their wait policy is NO_WAIT.
+            if step.wait == SCREEN_CHANGE:
+                with profile_phase(self._profiler, SETTLE):
                     self._backend.wait_for_screen_change(timeout)
 
         # Compare snap with golden reference
-        if path and test_case_name:
-            if snap_idx == 0:
-                snaps_tmp_path = self._init_snaps_temp_dir(path, test_case_name)
-                snaps_golden_path = self._check_snaps_dir_path(path, test_case_name, True)
+        if path and test_case_name and step.snap_idx is not None:
+            snaps_tmp_path, snaps_golden_path = self._snaps_dir_paths(path, test_case_name,
+                                                                      step.snap_idx)
+            self._compare_snap(snaps_tmp_path, snaps_golden_path, step.snap_idx)
+
+    def _snaps_dir_paths(self, path: Path, test_case_name: Path, index: int) -> Tuple[Path, Path]:
+        # The temporary and golden snapshots directories, initialized with
+        # the first snapshot of the navigation
+        if index == 0:
+            return (self._init_snaps_temp_dir(path, test_case_name),
+                    self._check_snaps_dir_path(path, test_case_name, True))
+        return (self._get_snaps_dir_path(path, test_case_name, False),
+                self._get_snaps_dir_path(path, test_case_name, True))
+
+    def _submit_snap(self, compare_pool: ComparePool, path: Path, test_case_name: Path,
+                     index: int) -> Tuple[CompareJob, "Future[Tuple[int, bool]]"]:
+        snaps_tmp_path, snaps_golden_path = self._snaps_dir_paths(path, test_case_name, index)
+        job = CompareJob.create(index,
+                                self._backend.capture_screenshot(),
+                                self._get_snap_path(snaps_golden_path, index),
+                                self._get_tmp_snap_path(snaps_tmp_path, index),
+                                comparator=self._backend.image_comparator)
+        return job, compare_pool.submit(job)
+
+    def _plan_key(self, instructions: List[NavIns], *options) -> Optional[Hashable]:
+        # Plans of the resolved instructions only depend on the navigator
+        # class and on the firmware
+        key = (type(self), self._firmware, options,
+               tuple((instruction.id, self._traced(instruction.id) is not None,
+                      tuple(instruction.args), tuple(sorted(instruction.kwargs.items())))
+                     for instruction in instructions))
+        try:
+            hash(key)
+        except TypeError:
+            # Unhashable instruction arguments
+            return None
+        return key
+
+    def compile(self,
+                instructions: List[Union[NavIns, NavInsID]],
+                screen_change_before_first_instruction: bool = True,
+                screen_change_after_last_instruction: bool = True,
+                snap_start_idx: int = 0) -> NavigationPlan:
+        """
+        Resolves a set of navigation instructions into a navigation plan: each
+        instruction callback is resolved (once per device and instructions,
+        plans are cached) into the backend actions it performs, such as the
+        touch coordinates of a layout, its wait policy and snapshot index.
+        Instructions with a custom callback are not resolved, the callback is
+        called when the plan is executed.
+
+        The arguments are the ones of :meth:`navigate_and_compare`.
+
+        :raises NotImplementedError: If the navigation instruction is not implemented.
+
+        :return: The navigation plan
+        :rtype: NavigationPlan
+        """
+        navigation = [
+            NavIns(instruction) if isinstance(instruction, NavInsID) else instruction
+            for instruction in instructions
+        ]
+        key = self._plan_key(navigation, screen_change_before_first_instruction,
+                             screen_change_after_last_instruction, snap_start_idx)
+        plan = self.plan_cache.get(key) if key is not None else None
+        if plan is not None:
+            return plan
+
+        # Navigation initialization: no-op instruction to:
+        # - wait for screen change depending on screen_change_before_first_instruction.
+        #   this is necessary:
+        #   - when an APDU was just sent and we want to make sure the screen already
+        #     displays the first review page.
+        #   - when called to finish the execution of a navigate_until_text() call.
+        # - compare the initial screen content with the golden reference if path and
+        #   test_case_name are valid.
+        steps = [
+            self._resolve(NavIns(NavInsID.WAIT, (0, )), screen_change_before_first_instruction,
+                          snap_start_idx)
+        ]
+        for idx, instruction in enumerate(navigation):
+            if idx + 1 != len(navigation) or screen_change_after_last_instruction:
+                # Nominal case, either:
+                # - middle instruction
+                # - last instruction but with screen_change_after_last_instruction=True
+                # => wait_for_screen_change()
+                # => screenshot comparison if path and test_case_name are valid
+                steps.append(self._resolve(instruction, True, snap_start_idx + idx + 1))
             else:
-                snaps_tmp_path = self._get_snaps_dir_path(path, test_case_name, False)
-                snaps_golden_path = self._get_snaps_dir_path(path, test_case_name, True)
+                # Last instruction case with screen_change_after_last_instruction=False
+                # => no wait_for_screen_change()
+                # => no screenshot comparison
+                steps.append(self._resolve(instruction, False, None))
+        plan = NavigationPlan(steps)
+        if key is not None:
+            self.plan_cache.put(key, plan)
+        return plan
+
+    def execute_plan(self,
+                     plan: NavigationPlan,
+                     path: Optional[Path] = None,
+                     test_case_name: Optional[Path] = None,
+                     timeout: float = 10.0) -> None:
+        """
+        Navigate on the device according to a navigation plan (see
+        :meth:`compile`), then compare each step snapshot with "golden images"
+        if `path` and `test_case_name` are given.
 
-            self._compare_snap(snaps_tmp_path, snaps_golden_path, snap_idx)
+        Consecutive inputs of a step (keyboard letters for instance) are sent
+        to the backend as a batch.
+
+        :param plan: The navigation plan
+        :type plan: NavigationPlan
+        :param path: Absolute path to the snapshots directory.
+        :type path: Optional[Path]
+        :param test_case_name: Relative path to the test case snapshots directory (from path).
+        :type test_case_name: Optional[Path]
+        :param timeout: Timeout for each navigation step.
+        :type timeout: float
+
+        :raises AssertionError: If one of the snapshots does not match.
+
+        :return: None
+        :rtype: NoneType
+        """
+        for step in plan.steps:
+            self._run_step(step, timeout, path, test_case_name)
 
     def navigate_and_compare(self,
                              path: Optional[Path],
@@ -234,47 +616,38 @@ class Navigator(ABC):
         :type snap_start_idx: int
 
         :raises ValueError: If one of the snapshots does not match.
+        :raises SnapshotMismatchError: If snapshots compared by the
+                                       :attr:`compare_pool` do not match, all
+                                       of them being reported.
 
         :return: None
         :rtype: NoneType
         """
 
-        # Navigation initialization: no-op instruction to:
-        # - wait for screen change depending on screen_change_before_first_instruction.
-        #   this is necessary:
-        #   - when an APDU was just sent and we want to make sure the screen already
-        #     displays the first review page.
-        #   - when called to finish the execution of a navigate_until_text() call.
-        # - compare the initial screen content with the golden reference if path and
-        #   test_case_name are valid.
-        self._run_instruction(NavIns(NavInsID.WAIT, (0, )),
-                              timeout,
-                              wait_for_screen_change=screen_change_before_first_instruction,
-                              path=path,
-                              test_case_name=test_case_name,
-                              snap_idx=snap_start_idx)
-
-        for idx, instruction in enumerate(instructions):
-            if idx + 1 != len(instructions) or screen_change_after_last_instruction:
-                # Nominal case, either:
-                # - middle instruction
-                # - last instruction but with screen_change_after_last_instruction=True
-                # => wait_for_screen_change()
-                # => screenshot comparison if path and test_case_name are valid
+        plan = self.compile(instructions, screen_change_before_first_instruction,
+                            screen_change_after_last_instruction, snap_start_idx)
+        # The first step is the navigation initialization (see compile())
+        navigation = [NavIns(NavInsID.WAIT, (0, ))] + list(instructions)
+        compare_pool = self._compare_pool
+        if compare_pool is None or self._golden_run or not (path and test_case_name):
+            for instruction, step in zip(navigation, plan.steps):
                 self._run_instruction(instruction,
                                       timeout,
-                                      wait_for_screen_change=True,
                                       path=path,
                                       test_case_name=test_case_name,
-                                      snap_idx=snap_start_idx + idx + 1)
-            else:
-                # Last instruction case with screen_change_after_last_instruction=False
-                # => no wait_for_screen_change()
-                # => no screenshot comparison
-                self._run_instruction(instruction,
-                                      timeout,
-                                      wait_for_screen_change=False,
-                                      snap_idx=snap_start_idx + idx + 1)
+                                      step=step)
+            return
+
+        # Pipelined comparisons: the screenshot of each step is compared in
+        # the pool while the next steps are run, failures are reported at the
+        # end of the navigation
+        jobs = list()
+        for instruction, step in zip(navigation, plan.steps):
+            self._run_instruction(instruction, timeout, step=step)
+            if step.snap_idx is not None:
+                jobs.append(self._submit_snap(compare_pool, path, test_case_name, step.snap_idx))
+        with profile_phase(self._profiler, COMPARISON):
+            compare_pool.check(jobs)
 
     def navigate(self,
                  instructions: List[Union[NavIns, NavInsID]],
@@ -377,7 +750,7 @@ class Navigator(ABC):
 
         # Take snapshots if required.
         if take_snaps:
-            tmp_snap_path = self._get_snap_path(snaps_tmp_path, img_idx)
+            tmp_snap_path = self._get_tmp_snap_path(snaps_tmp_path, img_idx)
         else:
             tmp_snap_path = None
 
@@ -392,7 +765,7 @@ class Navigator(ABC):
             while True:
                 if take_snaps:
                     # Take snapshots if required.
-                    tmp_snap_path = self._get_snap_path(snaps_tmp_path, img_idx)
+                    tmp_snap_path = self._get_tmp_snap_path(snaps_tmp_path, img_idx)
 
                 if self._compare_snap_with_timeout(last_golden_snap,
                                                    timeout_s=0.5,
@@ -416,6 +789,7 @@ class Navigator(ABC):
             start = time()
             last_screen_update_timeout = 2
             while self._compare_snap_with_timeout(last_golden_snap, timeout_s=0.5, crop=crop_last):
+                self._wait_for_screen_change(last_screen_update_timeout - (time() - start))
                 now = time()
                 if (now - start > last_screen_update_timeout):
                     raise TimeoutError(
@@ -425,6 +799,94 @@ class Navigator(ABC):
             raise ValueError(f"Could not find first snapshot {first_golden_snap}")
         return img_idx
 
+    def match_snap(self,
+                   path: Path,
+                   test_case_name: Path,
+                   snaps: Mapping[Key, str],
+                   crop: Optional[Crop] = None,
+                   timeout: float = 0.0) -> Optional[Key]:
+        """
+        Identify the screen displayed among several golden snapshots.
+
+        The screen is captured once per try and looked up among all the
+        snapshots at once, which allows to resolve a branching flow (for
+        instance, which of several warning screens is displayed) with a
+        single round-trip instead of one comparison per candidate.
+
+        :param path: Absolute path to the snapshots directory.
+        :type path: Path
+        :param test_case_name: Relative path to the test case snapshots directory (from path).
+        :type test_case_name: Path
+        :param snaps: Snapshot file names (in the test case snapshots directory), by key.
+        :type snaps: Mapping[Hashable, str]
+        :param crop: Crop (left, upper, right or lower pixels) snapshot images for comparison.
+        :type crop: Crop
+        :param timeout: How long to retry if the screen matches none of the snapshots.
+        :type timeout: float
+
+        :raises FileNotFoundError: If a golden snapshot does not exist.
+
+        :return: The key of the snapshot matching the screen, or None
+        :rtype: Optional[Hashable]
+        """
+        snaps_golden_path = self._check_snaps_dir_path(path, test_case_name, True)
+        goldens = GoldenSet({
+            key: snaps_golden_path / name
+            for key, name in snaps.items()
+        },
+                            crop=crop)
+        endtime = time() + timeout
+        while True:
+            key = self._backend.match_screen_with_snapshots(goldens)
+            remaining = endtime - time()
+            if key is not None or remaining <= 0 or not self._wait_for_screen_change(remaining):
+                return key
+
+    def _resync_screen(self, sequence: int, deadline: float) -> None:
+        # Waits for the screen events of the latest fast forward input, once
+        # the device fell behind, then aligns the backend on the displayed
+        # screen. Bounded per input, not by the whole navigation timeout.
+        self._fast_forward_stats.resyncs += 1
+        timeout = max(min(self.FAST_FORWARD_RESYNC_TIMEOUT, deadline - time()), 0)
+        with profile_phase(self._profiler, SETTLE):
+            if self._backend.screen_events_sequence is None:
+                # The events stream was lost
+                self._backend.wait_for_screen_change(timeout)
+                return
+            if not self._backend.wait_for_screen_events(sequence, timeout):
+                raise TimeoutError("Timeout waiting for screen change")
+            self._backend.sync_screen()
+
+    def _fast_forward_until_text(self, navigate_instruction: Union[NavIns, NavInsID], text: str,
+                                 deadline: float) -> int:
+        # Sends each navigation input as soon as the screen events of the
+        # previous one are received, without waiting for the screen to settle
+        # nor taking any screenshot: any new event (sequence number) after an
+        # input confirms it, even if the new screen displays the same text.
+        # Returns the number of inputs sent.
+        if isinstance(navigate_instruction, NavInsID):
+            navigate_instruction = NavIns(navigate_instruction)
+        step = self._resolve(navigate_instruction, False, None)
+        inputs = 0
+        while not self._backend.compare_screen_with_text(text):
+            remaining = deadline - time()
+            if remaining < 0:
+                raise TimeoutError(f"Timeout waiting for text {text}")
+            sequence = self._backend.screen_events_sequence
+            self._run_step(step, remaining, None, None)
+            inputs += 1
+            if sequence is None:
+                # No events stream (anymore): default screen change wait
+                with profile_phase(self._profiler, SETTLE):
+                    self._backend.wait_for_screen_change(remaining)
+            elif not self._backend.wait_for_screen_events(
+                    sequence, min(remaining, self.FAST_FORWARD_STEP_TIMEOUT)):
+                self._resync_screen(sequence, deadline)
+        self._fast_forward_stats.inputs += inputs
+        # Next screen change waits compare with the screen actually displayed
+        self._backend.sync_screen()
+        return inputs
+
     def navigate_until_text_and_compare(self,
                                         navigate_instruction: Union[NavIns, NavInsID],
                                         validation_instructions: List[Union[NavIns, NavInsID]],
@@ -433,7 +895,8 @@ class Navigator(ABC):
                                         test_case_name: Optional[Path] = None,
                                         timeout: int = 300,
                                         screen_change_before_first_instruction: bool = True,
-                                        screen_change_after_last_instruction: bool = True) -> None:
+                                        screen_change_after_last_instruction: bool = True,
+                                        fast_forward: bool = False) -> None:
         """
         Navigate until some text is found on the screen content displayed then
         compare each step snapshot with "golden images".
@@ -463,12 +926,19 @@ class Navigator(ABC):
         :type screen_change_before_first_instruction: bool
         :param screen_change_after_last_instruction: Wait for a screen change after last instruction.
         :type screen_change_after_last_instruction: bool
+        :param fast_forward: Send each navigation input as soon as the previous one is
+                             confirmed by screen events, see :meth:`navigate_until_text`. Not available when the
+                             snapshots are compared.
+        :type fast_forward: bool
 
         :raises TimeoutError: If the text is not found.
+        :raises ValueError: If fast forward is requested while comparing snapshots.
 
         :return: None
         :rtype: NoneType
         """
+        if fast_forward and path and test_case_name:
+            raise ValueError("Fast forward navigation does not compare the intermediate screens")
         idx = 0
         start = time()
         if not isinstance(self._backend, SpeculosBackend):
@@ -490,25 +960,28 @@ class Navigator(ABC):
                               test_case_name=test_case_name,
                               snap_idx=idx)
 
-        # Navigate until the text specified in argument is found.
-        while True:
-            if self._backend.compare_screen_with_text(text):
-                # Validation screen text found, exit the loop
-                break
-            else:
-                # Global navigation loop timeout in case the text is never found.
-                remaining = timeout - (time() - start)
-                if (remaining < 0):
-                    raise TimeoutError(f"Timeout waiting for text {text}")
-
-                # Go to the next screen.
-                idx += 1
-                self._run_instruction(navigate_instruction,
-                                      remaining,
-                                      wait_for_screen_change=True,
-                                      path=path,
-                                      test_case_name=test_case_name,
-                                      snap_idx=idx)
+        if fast_forward and self._backend.screen_events_sequence is not None:
+            idx = self._fast_forward_until_text(navigate_instruction, text, start + timeout)
+        else:
+            # Navigate until the text specified in argument is found.
+            while True:
+                if self._backend.compare_screen_with_text(text):
+                    # Validation screen text found, exit the loop
+                    break
+                else:
+                    # Global navigation loop timeout in case the text is never found.
+                    remaining = timeout - (time() - start)
+                    if (remaining < 0):
+                        raise TimeoutError(f"Timeout waiting for text {text}")
+
+                    # Go to the next screen.
+                    idx += 1
+                    self._run_instruction(navigate_instruction,
+                                          remaining,
+                                          wait_for_screen_change=True,
+                                          path=path,
+                                          test_case_name=test_case_name,
+                                          snap_idx=idx)
 
         # Perform navigation validation instructions in an "navigate_and_compare" way.
         if validation_instructions:
@@ -528,10 +1001,23 @@ class Navigator(ABC):
                             text: str,
                             timeout: int = 300,
                             screen_change_before_first_instruction: bool = True,
-                            screen_change_after_last_instruction: bool = True) -> None:
+                            screen_change_after_last_instruction: bool = True,
+                            fast_forward: bool = False) -> None:
         """
         Navigate until some text is found on the screen content displayed.
 
+        In fast forward mode, each navigation input is sent as soon as the
+        screen events of the previous one are received: the screen is neither
+        waited for to settle nor captured between them, only its text content
+        is checked. Any new screen event (see
+        :attr:`BackendInterface.screen_events_sequence
+        <ragger.backend.interface.BackendInterface.screen_events_sequence>`)
+        confirms an input, screens displaying the same text included. If the
+        device falls behind (no event within ``FAST_FORWARD_STEP_TIMEOUT``),
+        the navigation waits for it (up to ``FAST_FORWARD_RESYNC_TIMEOUT``)
+        and resynchronizes on the displayed screen before going on. Backends
+        without screen events navigate in the default mode.
+
         This method may be left void on backends connecting to physical devices,
         where a physical interaction must be performed instead.
         This will prevent the instrumentation to fail (the void method won't
@@ -553,6 +1039,9 @@ class Navigator(ABC):
         :type screen_change_before_first_instruction: bool
         :param screen_change_after_last_instruction: Wait for a screen change after last instruction.
         :type screen_change_after_last_instruction: bool
+        :param fast_forward: Send each navigation input as soon as the previous one is
+                             confirmed by screen events, until the text is found.
+        :type fast_forward: bool
 
         :raises TimeoutError: If the text is not found.
 
@@ -562,4 +1051,4 @@ class Navigator(ABC):
         self.navigate_until_text_and_compare(navigate_instruction, validation_instructions, text,
                                              None, None, timeout,
                                              screen_change_before_first_instruction,
-                                             screen_change_after_last_instruction)
+                                             screen_change_after_last_instruction, fast_forward)
@@ -0,0 +1,257 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+from collections import OrderedDict
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .instruction import NavInsID
+
+PLAN_VERSION = 1
+
+# Wait policies, applied after the actions of a step:
+# - no wait at all (or the actions already wait by themselves),
+# - wait for a screen change,
+# - wait for the screen to change, ignoring the progress bar at its bottom
+#   (review confirmation)
+NO_WAIT = "none"
+SCREEN_CHANGE = "screen_change"
+PROGRESS = "progress"
+WAIT_POLICIES = (NO_WAIT, SCREEN_CHANGE, PROGRESS)
+
+# Special action, not performed by the backend
+SLEEP = "sleep"
+# Backend inputs
+INPUT_ACTIONS = ("right_click", "left_click", "both_click", "finger_touch", "press_sequence",
+                 "touch_sequence")
+# Single inputs which can be sent within a press or touch sequence
+BATCHABLE_ACTIONS = ("right_click", "left_click", "both_click", "finger_touch")
+# Backend methods an instruction can be resolved into
+TRACEABLE_ACTIONS = INPUT_ACTIONS + ("wait_for_screen_change", "wait_for_home_screen",
+                                     "wait_for_text_on_screen", "wait_for_text_not_on_screen")
+
+
+class PlanAction(NamedTuple):
+    """
+    A backend call (``getattr(backend, name)(*args, **kwargs)``), or a
+    ``sleep``.
+    """
+    name: str
+    args: Tuple[Any, ...] = ()
+    kwargs: Dict[str, Any] = {}
+
+    @property
+    def is_batchable(self) -> bool:
+        """
+        :return: True if the action is a single click or a finger touch with
+                 the default delay, which can be sent within a sequence
+        :rtype: bool
+        """
+        return self.name in BATCHABLE_ACTIONS and len(self.args) <= 2 and not self.kwargs
+
+
+class PlanStep(NamedTuple):
+    """
+    A navigation instruction, resolved into the backend actions it performs.
+
+    ``actions`` is None when the instruction could not be resolved (custom
+    callback): the navigator callback is then called with ``args`` and
+    ``kwargs``. ``snap_idx`` is the index of the snapshot compared after the
+    step, or None if the screen is not compared.
+    """
+    instruction: NavInsID
+    actions: Optional[Tuple[PlanAction, ...]]
+    wait: str = SCREEN_CHANGE
+    snap_idx: Optional[int] = None
+    args: Tuple[Any, ...] = ()
+    kwargs: Dict[str, Any] = {}
+
+    def input_batches(self) -> List[Tuple[str, List[PlanAction]]]:
+        """
+        :return: The step actions, consecutive batchable inputs of a same kind
+                 grouped together, so that they can be sent to the backend at
+                 once
+        :rtype: List[Tuple[str, List[PlanAction]]]
+        """
+        batches: List[Tuple[str, List[PlanAction]]] = list()
+        for action in self.actions or ():
+            if action.is_batchable and batches and batches[-1][0] == action.name \
+                    and batches[-1][1][-1].is_batchable:
+                batches[-1][1].append(action)
+            else:
+                batches.append((action.name, [action]))
+        return batches
+
+
+def _instruction_to_json(instruction: NavInsID) -> Union[str, int]:
+    # Custom instruction IDs may not be NavInsID members
+    return instruction.name if isinstance(instruction, Enum) else instruction
+
+
+def _instruction_from_json(instruction: Union[str, int]) -> NavInsID:
+    return NavInsID[instruction] if isinstance(instruction, str) else NavInsID(instruction)
+
+
+class NavigationPlan:
+    """
+    A navigation compiled by :meth:`Navigator.compile
+    <ragger.navigator.navigator.Navigator.compile>`: the instructions are
+    resolved once into flat steps (actions, wait policy, snapshot index),
+    which can be cached, serialized and replayed with
+    :meth:`Navigator.execute_plan
+    <ragger.navigator.navigator.Navigator.execute_plan>`.
+    """
+
+    def __init__(self, steps: Sequence[PlanStep]):
+        self.steps = tuple(steps)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, NavigationPlan) and self.steps == other.steps
+
+    @property
+    def is_resolved(self) -> bool:
+        """
+        :return: True if every step was resolved into backend actions
+        :rtype: bool
+        """
+        return all(step.actions is not None for step in self.steps)
+
+    def to_json(self) -> dict:
+        """
+        :raises TypeError: If an instruction argument can not be serialized
+        """
+        steps = list()
+        for step in self.steps:
+            steps.append({
+                "instruction":
+                _instruction_to_json(step.instruction),
+                "actions":
+                None if step.actions is None else
+                [[action.name, list(action.args), action.kwargs] for action in step.actions],
+                "wait":
+                step.wait,
+                "snap_idx":
+                step.snap_idx,
+                "args":
+                list(step.args),
+                "kwargs":
+                step.kwargs
+            })
+        # Checks every argument can be serialized
+        json.dumps(steps)
+        return {"version": PLAN_VERSION, "steps": steps}
+
+    @classmethod
+    def from_json(cls, plan: dict) -> "NavigationPlan":
+        """
+        :raises ValueError: If the plan version is not supported
+        """
+        if plan.get("version") != PLAN_VERSION:
+            raise ValueError(f"Unsupported navigation plan version {plan.get('version')}")
+        steps = list()
+        for step in plan["steps"]:
+            actions = step["actions"]
+            steps.append(
+                PlanStep(instruction=_instruction_from_json(step["instruction"]),
+                         actions=None if actions is None else tuple(
+                             PlanAction(name, tuple(args), kwargs)
+                             for name, args, kwargs in actions),
+                         wait=step["wait"],
+                         snap_idx=step["snap_idx"],
+                         args=tuple(step["args"]),
+                         kwargs=step["kwargs"]))
+        return cls(steps)
+
+    def dump(self, path: Union[str, Path]) -> None:
+        Path(path).write_text(json.dumps(self.to_json()))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "NavigationPlan":
+        return cls.from_json(json.loads(Path(path).read_text()))
+
+
+class ActionTracer:
+    """
+    Stands for the backend while navigation callbacks are resolved: the
+    backend calls are recorded instead of being performed.
+    """
+
+    def __init__(self) -> None:
+        self.actions: List[PlanAction] = list()
+
+    def __getattr__(self, name: str):
+        if name not in TRACEABLE_ACTIONS:
+            raise AttributeError(f"'{name}' can not be traced")
+
+        def record(*args, **kwargs) -> None:
+            self.actions.append(PlanAction(name, tuple(args), dict(kwargs)))
+
+        return record
+
+    def trace(self, callback, *args, **kwargs) -> Tuple[PlanAction, ...]:
+        """
+        :return: The backend actions performed by the callback
+        :rtype: Tuple[PlanAction, ...]
+        """
+        self.actions = list()
+        callback(*args, **kwargs)
+        return tuple(self.actions)
+
+
+class PlanCache:
+    """
+    A size-bounded LRU of compiled navigation plans.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self._max_entries = max_entries
+        self._lock = Lock()
+        self._plans: "OrderedDict[Hashable, NavigationPlan]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def get(self, key: Hashable) -> Optional[NavigationPlan]:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._plans.move_to_end(key)
+            return plan
+
+    def put(self, key: Hashable, plan: NavigationPlan) -> None:
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self._max_entries:
+                self._plans.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+
+
+# Process-wide cache used by default by the navigators
+PLAN_CACHE = PlanCache()
@@ -0,0 +1,100 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from os import scandir
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Set
+
+
+class SnapshotDirManager:
+    """
+    Caches the state of the snapshots directories for a whole session, so
+    that navigations do not check and scan them again and again:
+
+    - golden snapshots directories are only checked once,
+    - each temporary snapshots directory is scanned (and cleaned up) once,
+      then the snapshots written into it are tracked, so that later cleanups
+      only remove these files, without listing the directory.
+
+    The manager assumes it is the only one writing into the temporary
+    snapshots directories during the session.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._golden_dirs: Set[Path] = set()
+        # Temporary snapshots directory -> snapshot file names, by index
+        self._tmp_dirs: Dict[Path, Dict[int, str]] = dict()
+        self.scans = 0
+
+    def is_checked(self, dir_path: Path) -> bool:
+        """
+        :return: True if the golden snapshots directory was already checked
+        :rtype: bool
+        """
+        return dir_path in self._golden_dirs
+
+    def set_checked(self, dir_path: Path) -> None:
+        with self._lock:
+            self._golden_dirs.add(dir_path)
+
+    def init_tmp_dir(self, dir_path: Path, start_idx: int = 0) -> None:
+        """
+        Makes sure a temporary snapshots directory exists, and removes its
+        snapshots whose index is greater or equal to `start_idx`.
+
+        :param dir_path: The temporary snapshots directory
+        :type dir_path: Path
+        :param start_idx: Index of the first snapshot to remove
+        :type start_idx: int
+        """
+        with self._lock:
+            snaps = self._tmp_dirs.get(dir_path)
+            if snaps is None:
+                snaps = self._scan(dir_path)
+                self._tmp_dirs[dir_path] = snaps
+            removed = [idx for idx in snaps if idx >= start_idx]
+            for idx in removed:
+                (dir_path / snaps.pop(idx)).unlink(missing_ok=True)
+
+    def _scan(self, dir_path: Path) -> Dict[int, str]:
+        self.scans += 1
+        dir_path.mkdir(parents=True, exist_ok=True)
+        snaps: Dict[int, str] = dict()
+        with scandir(dir_path) as entries:
+            for entry in entries:
+                # Files in format "index.png"
+                index = entry.name[:-len(".png")]
+                if entry.name.endswith(".png") and index.isnumeric():
+                    snaps[int(index)] = entry.name
+        return snaps
+
+    def record(self, snap_path: Path) -> None:
+        """
+        Tracks a temporary snapshot (possibly) written by the backend.
+
+        :param snap_path: The temporary snapshot path (``<dir>/<index>.png``)
+        :type snap_path: Path
+        """
+        with self._lock:
+            snaps = self._tmp_dirs.get(snap_path.parent)
+            if snaps is not None:
+                snaps[int(snap_path.stem)] = snap_path.name
+
+    def clear(self) -> None:
+        with self._lock:
+            self._golden_dirs.clear()
+            self._tmp_dirs.clear()
@@ -26,8 +26,12 @@ from .instruction import NavInsID
 class StaxNavigator(Navigator):
 
     def __init__(self, backend: BackendInterface, firmware: Firmware, golden_run: bool = False):
+        super().__init__(backend, firmware, self._build_callbacks(backend, firmware), golden_run)
+
+    @staticmethod
+    def _build_callbacks(backend: BackendInterface, firmware: Firmware) -> Dict[NavInsID, Callable]:
         screen = FullScreen(backend, firmware)
-        callbacks: Dict[NavInsID, Callable] = {
+        return {
             NavInsID.WAIT: sleep,
             NavInsID.WAIT_FOR_SCREEN_CHANGE: backend.wait_for_screen_change,
             NavInsID.WAIT_FOR_HOME_SCREEN: backend.wait_for_home_screen,
@@ -79,4 +83,3 @@ class StaxNavigator(Navigator):
             NavInsID.USE_CASE_ADDRESS_CONFIRMATION_CONFIRM: screen.address_confirmation.confirm,
             NavInsID.USE_CASE_ADDRESS_CONFIRMATION_CANCEL: screen.address_confirmation.cancel,
         }
-        super().__init__(backend, firmware, callbacks, golden_run)
@@ -0,0 +1,226 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from dataclasses import dataclass
+from enum import IntEnum
+from pathlib import Path
+from struct import Struct
+from threading import Event, Lock, Thread
+from time import monotonic, time
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+from .structs import RAPDU
+
+# File layout: the magic, then a sequence of records, each one being a fixed
+# size header followed by the raw APDU bytes.
+TRACE_MAGIC = b"RAGTRC\x00\x01"
+# timestamp (s), direction, status, latency (s), data length
+_RECORD_HEADER = Struct("<dBHfI")
+
+
+class Direction(IntEnum):
+    COMMAND = 0
+    RESPONSE = 1
+
+
+@dataclass(frozen=True)
+class ApduTraceRecord:
+    """
+    A traced APDU. ``status`` and ``latency`` (time elapsed since the previous
+    command, in seconds) are only meaningful for responses.
+    """
+    timestamp: float
+    direction: Direction
+    data: bytes
+    status: int = 0
+    latency: float = 0.0
+
+    def to_text(self) -> str:
+        """
+        :return: The record in the APDU log file format (``=> <hex>`` or
+                 ``<= <hex><status>``)
+        :rtype: str
+        """
+        if self.direction == Direction.COMMAND:
+            return f"=> {self.data.hex()}"
+        return "<= %s%4x" % (self.data.hex(), self.status)
+
+
+class ApduTraceRecorder:
+    """
+    Records APDUs into an append-only binary trace file.
+
+    Recording only packs a fixed size header in an in-memory buffer: the
+    buffer is written to the file by a background thread, either periodically
+    or as soon as it exceeds `buffer_size`. No string formatting is involved,
+    see :func:`convert_trace_to_text` to get a human readable log.
+    """
+
+    def __init__(self,
+                 path: Union[str, Path],
+                 buffer_size: int = 64 * 1024,
+                 flush_interval: float = 0.5):
+        """
+        :param path: Path of the trace file. It is truncated on opening.
+        :type path: Union[str, Path]
+        :param buffer_size: Buffered size triggering a write to the file
+        :type buffer_size: int
+        :param flush_interval: Maximum time a record stays in memory
+        :type flush_interval: float
+        """
+        self._path = Path(path)
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._chunks: List[bytes] = list()
+        self._buffered = 0
+        self._lock = Lock()
+        self._file_lock = Lock()
+        self._wake_up = Event()
+        self._closed = Event()
+        self._command_time: Optional[float] = None
+        self._file: BinaryIO = open(self._path, "wb")
+        self._file.write(TRACE_MAGIC)
+        self._file.flush()
+        self._thread = Thread(target=self._run, name="apdu-trace-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def _append(self, direction: Direction, data: bytes, status: int, latency: float) -> None:
+        if self._closed.is_set():
+            # The record would never be written
+            raise ValueError(f"APDU trace '{self._path}' is closed")
+        record = _RECORD_HEADER.pack(time(), direction, status, latency, len(data)) + data
+        with self._lock:
+            self._chunks.append(record)
+            self._buffered += len(record)
+            if self._buffered >= self._buffer_size:
+                self._wake_up.set()
+
+    def record_command(self, data: bytes) -> None:
+        """
+        Records a command APDU.
+
+        :param data: The raw command APDU
+        :type data: bytes
+
+        :raises ValueError: If the trace is closed
+        """
+        self._command_time = monotonic()
+        self._append(Direction.COMMAND, data, 0, 0.0)
+
+    def record_response(self, rapdu: RAPDU) -> None:
+        """
+        Records a response APDU, with its latency since the last recorded
+        command.
+
+        :param rapdu: The response APDU
+        :type rapdu: RAPDU
+
+        :raises ValueError: If the trace is closed
+        """
+        latency = monotonic() - self._command_time if self._command_time is not None else 0.0
+        self._append(Direction.RESPONSE, rapdu.data, rapdu.status, latency)
+
+    def _write_pending(self) -> None:
+        # Held while writing, so that records are written in order
+        with self._file_lock:
+            with self._lock:
+                chunks, self._chunks = self._chunks, list()
+                self._buffered = 0
+            if chunks:
+                self._file.write(b"".join(chunks))
+                self._file.flush()
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            self._wake_up.wait(self._flush_interval)
+            self._wake_up.clear()
+            self._write_pending()
+
+    def flush(self) -> None:
+        """
+        Synchronously writes the buffered records to the file.
+        """
+        self._write_pending()
+
+    def close(self) -> None:
+        """
+        Stops the background writer, then writes the remaining records.
+        """
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake_up.set()
+        self._thread.join()
+        self._write_pending()
+        self._file.close()
+
+    def __enter__(self) -> "ApduTraceRecorder":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def read_trace(path: Union[str, Path]) -> Iterator[ApduTraceRecord]:
+    """
+    Reads a binary APDU trace.
+
+    :param path: Path of the trace file
+    :type path: Union[str, Path]
+
+    :raises ValueError: If the file is not an APDU trace, or is truncated
+
+    :return: The traced APDUs, in recording order
+    :rtype: Iterator[ApduTraceRecord]
+    """
+    with open(path, "rb") as trace:
+        if trace.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError(f"'{path}' is not an APDU trace file")
+        while True:
+            header = trace.read(_RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) != _RECORD_HEADER.size:
+                raise ValueError(f"Truncated APDU trace file '{path}'")
+            timestamp, direction, status, latency, length = _RECORD_HEADER.unpack(header)
+            data = trace.read(length)
+            if len(data) != length:
+                raise ValueError(f"Truncated APDU trace file '{path}'")
+            yield ApduTraceRecord(timestamp, Direction(direction), data, status, latency)
+
+
+def convert_trace_to_text(trace_path: Union[str, Path], text_path: Union[str, Path]) -> int:
+    """
+    Converts a binary APDU trace into the text format of the APDU log file
+    (see :func:`ragger.logger.set_apdu_logger_file`).
+
+    :param trace_path: Path of the binary trace
+    :type trace_path: Union[str, Path]
+    :param text_path: Path of the text file to write
+    :type text_path: Union[str, Path]
+
+    :return: The number of converted records
+    :rtype: int
+    """
+    count = 0
+    with open(text_path, "w") as text:
+        for record in read_trace(trace_path):
+            text.write(record.to_text() + "\n")
+            count += 1
+    return count
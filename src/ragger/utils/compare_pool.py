@@ -0,0 +1,194 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from threading import Lock
+from typing import List, Optional, Tuple, Union
+
+from .golden_set import _golden_source
+from .screenshot import GOLDEN_CACHE, FrameComparator, decode_frame
+from .snapshot_bundle import SNAPSHOT_BUNDLES
+from .structs import Crop
+
+
+@dataclass(frozen=True)
+class CompareJob:
+    """
+    A screenshot to compare with its golden snapshot in a worker process.
+
+    The golden is resolved in the calling process, where the snapshot bundles
+    and stores are registered: it is either an image file (``golden_path``)
+    or the content of a bundled image (``golden``).
+    """
+    index: int
+    screenshot: bytes
+    golden_path: Optional[str] = None
+    golden: Optional[bytes] = None
+    tmp_path: Optional[str] = None
+    crop: Optional[Crop] = None
+    comparator: Optional[FrameComparator] = None
+
+    @classmethod
+    def create(cls,
+               index: int,
+               screenshot: bytes,
+               golden_path: Union[str, Path],
+               tmp_path: Optional[Union[str, Path]] = None,
+               crop: Optional[Crop] = None,
+               comparator: Optional[FrameComparator] = None) -> "CompareJob":
+        """
+        :param index: The snapshot index
+        :type index: int
+        :param screenshot: The screenshot (PNG)
+        :type screenshot: bytes
+        :param golden_path: The golden snapshot path
+        :type golden_path: Union[str, Path]
+        :param tmp_path: Optional path where the screenshot is saved
+        :type tmp_path: Union[str, Path]
+        :param crop: Optional crop applied on both images before comparison
+        :type crop: Crop
+        :param comparator: Compares the screenshot and golden frames. It must
+                           be picklable. Defaults to an exact comparison.
+        :type comparator: Callable[[Frame, Frame], bool]
+
+        :return: The job, its golden resolved
+        :rtype: CompareJob
+        """
+        tmp = str(tmp_path) if tmp_path is not None else None
+        found = SNAPSHOT_BUNDLES.lookup(golden_path)
+        if found is not None:
+            bundle, name = found
+            return cls(index,
+                       screenshot,
+                       golden=bundle.read(name),
+                       tmp_path=tmp,
+                       crop=crop,
+                       comparator=comparator)
+        return cls(index,
+                   screenshot,
+                   golden_path=str(_golden_source(Path(golden_path))),
+                   tmp_path=tmp,
+                   crop=crop,
+                   comparator=comparator)
+
+
+def run_compare_job(job: CompareJob) -> Tuple[int, bool]:
+    """
+    Saves the screenshot of a job, then compares it with its golden. Run by
+    the worker processes, whose golden cache keeps the decoded goldens from
+    one job to the next.
+
+    :raises FileNotFoundError: If the golden snapshot does not exist
+
+    :return: The job index, and True if the screenshot matches its golden
+    :rtype: Tuple[int, bool]
+    """
+    if job.tmp_path is not None:
+        Path(job.tmp_path).write_bytes(job.screenshot)
+    if job.golden is not None:
+        golden = decode_frame(BytesIO(job.golden), job.crop)
+    else:
+        assert job.golden_path is not None
+        golden = GOLDEN_CACHE.get(job.golden_path, job.crop)
+    frame = decode_frame(BytesIO(job.screenshot), job.crop)
+    if job.comparator is None:
+        return job.index, frame == golden
+    return job.index, job.comparator(frame, golden)
+
+
+class SnapshotMismatchError(AssertionError):
+    """
+    Raised when screenshots compared by a :class:`ComparePool` do not match
+    their golden snapshots. All the failing indexes are reported at once.
+    """
+
+    def __init__(self, failures: List[Tuple[int, str]]):
+        """
+        :param failures: The failing snapshot indexes, with the failure reason
+        :type failures: List[Tuple[int, str]]
+        """
+        self.failures = failures
+        self.indexes = [index for index, _ in failures]
+        details = "\n".join(f"  {index}: {reason}" for index, reason in failures)
+        super().__init__(f"Screens do not match goldens at indexes {self.indexes}:\n{details}")
+
+
+class ComparePool:
+    """
+    Compares screenshots with their golden snapshots in a pool of worker
+    processes, so that the decoding, comparison and saving of a screenshot
+    do not block the navigation: the screenshots are only captured by the
+    calling process.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        :param workers: Number of worker processes. Defaults to the number of
+                        processors.
+        :type workers: int
+        """
+        self._workers = workers
+        self._lock = Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, job: CompareJob) -> "Future[Tuple[int, bool]]":
+        """
+        :return: The future result of :func:`run_compare_job`
+        :rtype: Future[Tuple[int, bool]]
+        """
+        with self._lock:
+            # Workers are only spawned once needed
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            executor = self._executor
+        return executor.submit(run_compare_job, job)
+
+    @staticmethod
+    def check(jobs: List[Tuple[CompareJob, "Future[Tuple[int, bool]]"]]) -> None:
+        """
+        Waits for compare jobs, then reports all their failures.
+
+        :param jobs: The submitted jobs, with their future result
+        :type jobs: List[Tuple[CompareJob, Future]]
+
+        :raises SnapshotMismatchError: If screenshots do not match their
+                                       golden, or could not be compared
+        """
+        failures: List[Tuple[int, str]] = list()
+        for job, future in jobs:
+            try:
+                _, matches = future.result()
+            except Exception as error:
+                failures.append((job.index, f"{type(error).__name__}: {error}"))
+                continue
+            if not matches:
+                failures.append((job.index, f"Screen does not match golden {job.tmp_path}."))
+        if failures:
+            raise SnapshotMismatchError(failures)
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self) -> "ComparePool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,104 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from pathlib import Path
+from typing import Dict, Generic, Hashable, List, Mapping, Optional, Tuple, TypeVar, Union
+
+from .screenshot import Frame, FrameComparator, GoldenCache, GOLDEN_CACHE, ImageSource, decode_frame
+from .snapshot_store import SNAPSHOT_STORES
+from .structs import Crop
+
+Key = TypeVar("Key", bound=Hashable)
+
+
+def _golden_source(path: Path) -> Path:
+    # Goldens of a content-addressed store are read from the shared frame file
+    store = SNAPSHOT_STORES.lookup(path)
+    if store is not None:
+        digest = store.digest(path)
+        if digest is not None:
+            return store.frame_path(digest)
+    return path
+
+
+class GoldenSet(Generic[Key]):
+    """
+    A set of golden snapshots, indexed by the hash of their (cropped) frame,
+    so that a screenshot is identified among them with a single decoding and
+    a dictionary lookup.
+    """
+
+    def __init__(self,
+                 goldens: Mapping[Key, Union[str, Path]],
+                 crop: Optional[Crop] = None,
+                 cache: Optional[GoldenCache] = None):
+        """
+        :param goldens: The golden snapshot paths, by key
+        :type goldens: Mapping[Hashable, Union[str, Path]]
+        :param crop: Optional crop applied on the goldens and the screenshots
+        :type crop: Crop
+        :param cache: The golden cache to decode goldens through. Defaults to
+                      the process-wide one.
+        :type cache: GoldenCache
+
+        :raises FileNotFoundError: If a golden snapshot does not exist
+        """
+        cache = cache if cache is not None else GOLDEN_CACHE
+        self._crop = crop
+        self._frames: List[Tuple[Key, Frame]] = [(key, cache.get(_golden_source(Path(path)), crop))
+                                                 for key, path in goldens.items()]
+        self._index: Dict[str, Key] = dict()
+        # The first key wins for identical goldens
+        for key, frame in reversed(self._frames):
+            self._index[frame.digest] = key
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def keys(self) -> List[Key]:
+        return [key for key, _ in self._frames]
+
+    def match_frame(self,
+                    frame: Frame,
+                    comparator: Optional[FrameComparator] = None) -> Optional[Key]:
+        """
+        :param frame: The (already cropped) frame to identify
+        :type frame: Frame
+        :param comparator: Compares the frame with each golden if no golden is
+                           identical to it
+        :type comparator: Callable[[Frame, Frame], bool]
+
+        :return: The key of the matching golden, or None
+        :rtype: Optional[Hashable]
+        """
+        key = self._index.get(frame.digest)
+        if key is not None or comparator is None:
+            return key
+        return next((key for key, golden in self._frames if comparator(frame, golden)), None)
+
+    def match(self,
+              screenshot: ImageSource,
+              comparator: Optional[FrameComparator] = None) -> Optional[Key]:
+        """
+        :param screenshot: The screenshot to identify
+        :type screenshot: Union[str, Path, BinaryIO]
+        :param comparator: Compares the screenshot with each golden if no
+                           golden is identical to it
+        :type comparator: Callable[[Frame, Frame], bool]
+
+        :return: The key of the matching golden, or None
+        :rtype: Optional[Hashable]
+        """
+        return self.match_frame(decode_frame(screenshot, self._crop), comparator)
@@ -0,0 +1,223 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from .screenshot import Frame, GoldenCache, GOLDEN_CACHE, ImageSource, decode_frame
+from .structs import Crop
+
+# `ImageComparator.match` first compares one row out of _SAMPLE_STEP: as the
+# sampled differing pixels are a subset of the differing pixels, most goldens
+# are rejected at a fraction of the cost of a full comparison
+_SAMPLE_STEP = 8
+
+
+@dataclass(frozen=True)
+class Region:
+    """
+    A rectangular region of a frame, in pixels. `right` and `lower` are
+    excluded.
+    """
+    left: int
+    upper: int
+    right: int
+    lower: int
+
+
+def to_array(frame: Frame) -> np.ndarray:
+    """
+    :return: A (read-only) view of the frame pixels, as a (height, width, 3)
+             array
+    :rtype: numpy.ndarray
+    """
+    width, height = frame.size
+    return np.frombuffer(frame.pixels, dtype=np.uint8).reshape(height, width, 3)
+
+
+def _channels_delta(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    return np.abs(first.astype(np.int16) - second)
+
+
+def _delta(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    # Absolute difference, per pixel (largest channel difference). Reducing
+    # the 3 channels explicitly is much faster than `max(axis=-1)`.
+    delta = _channels_delta(first, second)
+    return np.maximum(np.maximum(delta[..., 0], delta[..., 1]), delta[..., 2])
+
+
+_ALL_ROWS = slice(None)
+
+
+@dataclass
+class DiffResult:
+    """
+    The result of a comparison between a frame and a golden frame.
+    """
+    equal: bool
+    differing_pixels: int
+    max_delta: int
+    # Per pixel difference (largest channel difference), 0 in masked regions
+    delta: np.ndarray = field(repr=False)
+    golden: np.ndarray = field(repr=False)
+
+    def heatmap(self) -> Image.Image:
+        """
+        :return: The dimmed golden frame, with differing pixels in red (the
+                 larger the difference, the brighter)
+        :rtype: PIL.Image.Image
+        """
+        heat = np.repeat((self.golden.mean(axis=-1) // 4).astype(np.uint8)[..., None], 3, axis=-1)
+        differing = self.delta > 0
+        heat[differing] = 0
+        heat[..., 0][differing] = 128 + self.delta[differing] // 2
+        return Image.fromarray(heat, "RGB")
+
+    def save_heatmap(self, path: Union[str, Path]) -> None:
+        self.heatmap().save(path)
+
+
+class ImageComparator:
+    """
+    Compares frames as NumPy arrays, with an optional per-pixel tolerance and
+    masked regions.
+
+    An instance is a frame comparator: it can be set as the
+    ``image_comparator`` of a backend, so that
+    :meth:`compare_screen_with_snapshot` uses it instead of an exact
+    comparison.
+    """
+
+    def __init__(self,
+                 tolerance: int = 0,
+                 max_differing_pixels: int = 0,
+                 masks: Sequence[Region] = ()):
+        """
+        :param tolerance: Largest channel difference (0-255) for two pixels to
+                          be considered identical
+        :type tolerance: int
+        :param max_differing_pixels: Number of differing pixels still
+                                     considered as a match
+        :type max_differing_pixels: int
+        :param masks: Regions ignored by the comparison
+        :type masks: Sequence[Region]
+        """
+        self._tolerance = tolerance
+        self._max_differing_pixels = max_differing_pixels
+        self._masks = tuple(masks)
+        self._mask_cache: Dict[Tuple[int, int], Optional[np.ndarray]] = dict()
+
+    @property
+    def exact(self) -> bool:
+        return not (self._tolerance or self._max_differing_pixels or self._masks)
+
+    def _mask(self, size: Tuple[int, int]) -> Optional[np.ndarray]:
+        # Boolean (height, width) array, True on compared pixels
+        if not self._masks:
+            return None
+        if size not in self._mask_cache:
+            width, height = size
+            mask = np.ones((height, width), dtype=bool)
+            for region in self._masks:
+                mask[region.upper:region.lower, region.left:region.right] = False
+            self._mask_cache[size] = mask
+        return self._mask_cache[size]
+
+    def diff(self, actual: Frame, golden: Frame) -> DiffResult:
+        """
+        :raises ValueError: If the frames do not have the same size
+
+        :return: The detailed comparison of both frames
+        :rtype: DiffResult
+        """
+        if actual.size != golden.size:
+            raise ValueError(f"Frame sizes differ: {actual.size} != {golden.size}")
+        golden_array = to_array(golden)
+        delta = _delta(to_array(actual), golden_array)
+        mask = self._mask(actual.size)
+        if mask is not None:
+            delta = np.where(mask, delta, 0)
+        differing = delta > self._tolerance
+        delta = np.where(differing, delta, 0).astype(np.uint8)
+        count = int(np.count_nonzero(differing))
+        return DiffResult(equal=count <= self._max_differing_pixels,
+                          differing_pixels=count,
+                          max_delta=int(delta.max()) if delta.size else 0,
+                          delta=delta,
+                          golden=golden_array)
+
+    def _count(self, actual: np.ndarray, golden: np.ndarray, rows: slice = _ALL_ROWS) -> int:
+        over = _channels_delta(actual[rows], golden[rows]) > self._tolerance
+        differing = over[..., 0] | over[..., 1] | over[..., 2]
+        mask = self._mask((actual.shape[1], actual.shape[0]))
+        if mask is not None:
+            differing &= mask[rows]
+        return int(np.count_nonzero(differing))
+
+    def __call__(self, actual: Frame, golden: Frame) -> bool:
+        if actual.size != golden.size:
+            return False
+        if actual.pixels == golden.pixels:
+            return True
+        if self.exact:
+            return False
+        return self._count(to_array(actual), to_array(golden)) <= self._max_differing_pixels
+
+    def match(self, actual: Frame, goldens: Sequence[Frame]) -> Optional[int]:
+        """
+        Compares a frame with many goldens. Identical goldens are looked for
+        first, then goldens matching within the tolerance and masks.
+
+        :param actual: The frame to look for
+        :type actual: Frame
+        :param goldens: The golden frames
+        :type goldens: Sequence[Frame]
+
+        :return: The index of the matching golden, or None
+        :rtype: Optional[int]
+        """
+        candidates = [idx for idx, golden in enumerate(goldens) if golden.size == actual.size]
+        identical = next((idx for idx in candidates if goldens[idx].pixels == actual.pixels), None)
+        if identical is not None or self.exact:
+            return identical
+        array = to_array(actual)
+        sample = slice(None, None, _SAMPLE_STEP)
+        for idx in candidates:
+            golden = to_array(goldens[idx])
+            if self._count(array, golden, sample) > self._max_differing_pixels:
+                continue
+            if self._count(array, golden) <= self._max_differing_pixels:
+                return idx
+        return None
+
+
+def diff_with_golden(screenshot: ImageSource,
+                     golden_path: Union[str, Path],
+                     comparator: ImageComparator,
+                     crop: Optional[Crop] = None,
+                     cache: Optional[GoldenCache] = None) -> DiffResult:
+    """
+    Compares a screenshot with a golden snapshot (going through the golden
+    cache), typically to get the heatmap of a failed comparison.
+
+    :return: The detailed comparison
+    :rtype: DiffResult
+    """
+    cache = cache if cache is not None else GOLDEN_CACHE
+    return comparator.diff(decode_frame(screenshot, crop), cache.get(golden_path, crop))
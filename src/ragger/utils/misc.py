@@ -13,6 +13,8 @@
    See the License for the specific language governing permissions and
    limitations under the License.
 """
+import socket
+from contextlib import ExitStack
 from typing import Optional, Tuple, List
 from pathlib import Path
 from ragger.error import ExceptionRAPDU
@@ -52,6 +54,39 @@ def find_project_root_dir(origin: Path) -> Path:
     return project_root_dir
 
 
+def find_free_port(host: str = "127.0.0.1") -> int:
+    """
+    Returns a TCP port currently available on the given host, as picked by the
+    operating system.
+
+    :param host: The host address the port will be bound on
+    :type host: str
+    """
+    return find_free_ports(1, host)[0]
+
+
+def find_free_ports(count: int, host: str = "127.0.0.1") -> List[int]:
+    """
+    Returns distinct TCP ports currently available on the given host, as picked
+    by the operating system.
+
+    All the sockets are kept bound until every port is picked, so that the same
+    port cannot be returned twice.
+
+    :param count: The number of ports to pick
+    :type count: int
+    :param host: The host address the ports will be bound on
+    :type host: str
+    """
+    with ExitStack() as stack:
+        ports = list()
+        for _ in range(count):
+            sock = stack.enter_context(socket.socket(socket.AF_INET, socket.SOCK_STREAM))
+            sock.bind((host, 0))
+            ports.append(sock.getsockname()[1])
+        return ports
+
+
 def prefix_with_len(to_prefix: bytes) -> bytes:
     return len(to_prefix).to_bytes(1, byteorder="big") + to_prefix
 
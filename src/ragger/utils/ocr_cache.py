@@ -0,0 +1,224 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from hashlib import sha256
+from io import BytesIO
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from PIL import Image, ImageOps
+from pytesseract import image_to_data, Output
+
+# Bumped when the recognized texts of a same image may change (OCR settings or
+# pre-processing), so that stale results stored on disk are not used anymore
+_FORMAT_VERSION = 1
+
+
+def tesseract_texts(image: Image.Image) -> List[str]:
+    """
+    :return: The words recognized by Tesseract in the image
+    :rtype: List[str]
+    """
+    return list(image_to_data(image, output_type=Output.DICT)["text"])
+
+
+class OcrCache:
+    """
+    Caches the texts recognized in snapshots, by hash of the snapshot content,
+    in a size-bounded in-memory LRU and (optionally) on disk, so that a same
+    snapshot is recognized once, across checks and across runs.
+
+    Snapshots can be recognized ahead of time by a pool of background workers
+    (:meth:`prewarm`).
+    """
+
+    def __init__(self,
+                 directory: Optional[Union[str, Path]] = None,
+                 max_entries: int = 512,
+                 workers: int = 2,
+                 ocr: Callable[[Image.Image], List[str]] = tesseract_texts):
+        """
+        :param directory: Where the results are persisted (memory only if None)
+        :type directory: Union[str, Path]
+        :param max_entries: Number of results kept in memory
+        :type max_entries: int
+        :param workers: Number of background workers used by :meth:`prewarm`
+        :type workers: int
+        :param ocr: Recognizes the texts in an image
+        :type ocr: Callable[[PIL.Image.Image], List[str]]
+        """
+        self._directory = Path(directory) if directory is not None else None
+        self._max_entries = max_entries
+        self._workers = workers
+        self._ocr = ocr
+        self._lock = Lock()
+        self._entries: "OrderedDict[str, List[str]]" = OrderedDict()
+        # Recognitions in progress, so that a same snapshot is never
+        # recognized twice at the same time
+        self._pending: Dict[str, Future] = dict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(content: bytes, invert: bool = False) -> str:
+        """
+        :return: The cache key of a snapshot, given its (encoded) content and
+                 whether it is inverted before recognition
+        :rtype: str
+        """
+        flavor = "inverted" if invert else "plain"
+        return f"{sha256(content).hexdigest()}-{flavor}-v{_FORMAT_VERSION}"
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        return self._directory / f"{key}.json" if self._directory is not None else None
+
+    def _remember(self, key: str, texts: List[str]) -> None:
+        with self._lock:
+            self._entries[key] = texts
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[List[str]]:
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            return list(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key: str, texts: List[str]) -> None:
+        path = self._disk_path(key)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written atomically, as several processes (pytest-xdist workers) may
+        # share the directory
+        with NamedTemporaryFile("w", dir=path.parent, suffix=".tmp", delete=False) as output:
+            json.dump(texts, output)
+        os.replace(output.name, path)
+
+    def _recognize(self, key: str, content: bytes, invert: bool) -> List[str]:
+        texts = self._load(key)
+        if texts is None:
+            image: Image.Image = Image.open(BytesIO(content))
+            if invert:
+                image = ImageOps.invert(image.convert("RGB"))
+            texts = self._ocr(image)
+            self._store(key, texts)
+        self._remember(key, texts)
+        return texts
+
+    def _get(self, content: bytes, invert: bool) -> List[str]:
+        key = self.key(content, invert)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+            future = self._pending.get(key)
+            if future is None:
+                future = Future()
+                self._pending[key] = future
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return future.result()
+        try:
+            texts = self._recognize(key, content, invert)
+            future.set_result(texts)
+            return texts
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def texts(self, path: Union[str, Path], invert: bool = False) -> List[str]:
+        """
+        :param path: The snapshot
+        :type path: Union[str, Path]
+        :param invert: Invert the snapshot colors before recognition (light
+                       text on dark background)
+        :type invert: bool
+
+        :return: The texts recognized in the snapshot
+        :rtype: List[str]
+        """
+        return self._get(Path(path).read_bytes(), invert)
+
+    def contains(self, path: Union[str, Path], text: str, invert: bool = False) -> bool:
+        """
+        :return: True if one of the texts recognized in the snapshot contains
+                 `text`
+        :rtype: bool
+        """
+        return any(text in recognized for recognized in self.texts(path, invert))
+
+    def prewarm(self, paths: Iterable[Union[str, Path]], invert: bool = False) -> List[Future]:
+        """
+        Recognizes the texts of snapshots in the background.
+
+        :param paths: The snapshots
+        :type paths: Iterable[Union[str, Path]]
+        :param invert: Invert the snapshots colors before recognition
+        :type invert: bool
+
+        :return: The recognitions futures
+        :rtype: List[Future]
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(self._workers, 1),
+                                                    thread_name_prefix="ocr-prewarm")
+            executor = self._executor
+        return [executor.submit(self.texts, path, invert) for path in paths]
+
+    def wait(self, futures: Iterable[Future]) -> None:
+        """
+        Waits for prewarm recognitions, raising the first error if any.
+        """
+        futures = list(futures)
+        wait(futures)
+        for future in futures:
+            future.result()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+# Process-wide cache (memory only) used by default by the physical backends
+OCR_CACHE = OcrCache()
@@ -0,0 +1,233 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from typing import ContextManager, Dict, Generator, List, Optional, Tuple, Union
+
+# Phases of a navigation instruction
+CALLBACK = "callback"
+SETTLE = "settle"
+SCREENSHOT = "screenshot"
+COMPARISON = "comparison"
+WRITE = "write"
+PHASES = (CALLBACK, SETTLE, SCREENSHOT, COMPARISON, WRITE)
+
+# Instruction used for the time spent outside of any navigation instruction
+NO_INSTRUCTION = "NONE"
+
+
+@dataclass
+class PhaseStats:
+    """
+    Cumulated durations (in seconds) of a phase.
+    """
+    count: int = 0
+    total: float = 0.0
+    maximum: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        self.maximum = max(self.maximum, duration)
+
+    def merge(self, other: "PhaseStats") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+
+Breakdown = Dict[str, PhaseStats]
+
+
+class NavigationProfiler:
+    """
+    Records the time spent in each phase of the navigation instructions:
+
+    - ``callback``: the instruction callback itself (clicks, touches, ...),
+    - ``settle``: waiting for the screen to change,
+    - ``screenshot``: fetching screenshots to compare,
+    - ``comparison``: comparing screenshots with golden snapshots,
+    - ``write``: writing snapshots on disk.
+
+    Durations are aggregated per test and per navigation instruction ID.
+    A profiler is shared by a :class:`Navigator <ragger.navigator.Navigator>`
+    and its backend (see :attr:`Navigator.profiler
+    <ragger.navigator.Navigator.profiler>`).
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._stats: Dict[Tuple[str, str], Breakdown] = dict()
+        self._test = ""
+        self._instructions: List[str] = list()
+
+    @contextmanager
+    def test(self, name: str) -> Generator[None, None, None]:
+        """
+        Attributes the phases recorded in this context to the given test.
+        """
+        previous, self._test = self._test, name
+        try:
+            yield
+        finally:
+            self._test = previous
+
+    @contextmanager
+    def instruction(self, instruction: Union[Enum, str]) -> Generator[None, None, None]:
+        """
+        Attributes the phases recorded in this context to the given
+        navigation instruction.
+        """
+        self._instructions.append(
+            instruction.name if isinstance(instruction, Enum) else instruction)
+        try:
+            yield
+        finally:
+            self._instructions.pop()
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        """
+        Measures the duration of the context as the given phase of the current
+        instruction.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, perf_counter() - start)
+
+    def record(self, phase: str, duration: float) -> None:
+        instruction = self._instructions[-1] if self._instructions else NO_INSTRUCTION
+        with self._lock:
+            breakdown = self._stats.setdefault((self._test, instruction), dict())
+            breakdown.setdefault(phase, PhaseStats()).add(duration)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def _aggregate(self, index: int) -> Dict[str, Breakdown]:
+        result: Dict[str, Breakdown] = dict()
+        with self._lock:
+            for key, breakdown in self._stats.items():
+                aggregated = result.setdefault(key[index], dict())
+                for phase, stats in breakdown.items():
+                    aggregated.setdefault(phase, PhaseStats()).merge(stats)
+        return result
+
+    def per_instruction(self) -> Dict[str, Breakdown]:
+        """
+        :return: The phases durations, per navigation instruction ID
+        :rtype: Dict[str, Dict[str, PhaseStats]]
+        """
+        return self._aggregate(1)
+
+    def per_test(self) -> Dict[str, Breakdown]:
+        """
+        :return: The phases durations, per test
+        :rtype: Dict[str, Dict[str, PhaseStats]]
+        """
+        return self._aggregate(0)
+
+    def to_dict(self) -> dict:
+        """
+        :return: The per instruction and per test breakdowns, as plain
+                 (JSON serializable) values
+        :rtype: dict
+        """
+
+        def serialize(breakdowns: Dict[str, Breakdown]) -> dict:
+            return {
+                key: {
+                    phase: {
+                        "count": stats.count,
+                        "total": stats.total,
+                        "mean": stats.mean,
+                        "max": stats.maximum
+                    }
+                    for phase, stats in breakdown.items()
+                }
+                for key, breakdown in breakdowns.items()
+            }
+
+        return {
+            "per_instruction": serialize(self.per_instruction()),
+            "per_test": serialize(self.per_test())
+        }
+
+    def dump_json(self, path: Union[str, Path]) -> None:
+        with open(path, "w") as output:
+            json.dump(self.to_dict(), output, indent=2)
+
+    def summary(self, slowest_tests: int = 10) -> List[str]:
+        """
+        :param slowest_tests: Number of tests to list, slowest first
+        :type slowest_tests: int
+
+        :return: A human readable summary: a table of the per instruction
+                 breakdown, followed by the slowest tests
+        :rtype: List[str]
+        """
+        header = f"{'instruction':<40}{'count':>8}" + "".join(f"{phase:>12}" for phase in PHASES)
+        lines = [header + f"{'total':>12}"]
+        for instruction, breakdown in sorted(self.per_instruction().items(),
+                                             key=lambda item: -_total(item[1])):
+            count = breakdown[CALLBACK].count if CALLBACK in breakdown else 0
+            line = f"{instruction:<40}{count:>8}"
+            line += "".join(f"{breakdown[phase].total if phase in breakdown else 0:>12.3f}"
+                            for phase in PHASES)
+            lines.append(line + f"{_total(breakdown):>12.3f}")
+
+        tests = sorted(self.per_test().items(), key=lambda item: -_total(item[1]))
+        if tests and slowest_tests:
+            lines.append("")
+            lines.append("Slowest tests (navigation time, in seconds):")
+            for test, breakdown in tests[:slowest_tests]:
+                lines.append(f"{_total(breakdown):>10.3f}  {test or '<no test>'}")
+        return lines
+
+
+def _total(breakdown: Breakdown) -> float:
+    return sum(stats.total for stats in breakdown.values())
+
+
+def profile_phase(profiler: Optional[NavigationProfiler], name: str) -> ContextManager:
+    """
+    :return: A context measuring the given phase, or doing nothing without
+             profiler
+    :rtype: ContextManager
+    """
+    return nullcontext() if profiler is None else profiler.phase(name)
+
+
+def profile_instruction(profiler: Optional[NavigationProfiler],
+                        instruction: Union[Enum, str]) -> ContextManager:
+    """
+    :return: A context attributing phases to the given instruction, or doing
+             nothing without profiler
+    :rtype: ContextManager
+    """
+    return nullcontext() if profiler is None else profiler.instruction(instruction)
@@ -0,0 +1,163 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import re
+from dataclasses import dataclass
+from json import dumps
+from typing import Iterable, List, Optional, Pattern, Sequence, Union
+
+# Separates the event texts in the string searched for substrings, so that a
+# substring never spans two events
+_SEPARATOR = "\x00"
+
+
+@dataclass(frozen=True)
+class TextEvent:
+    """
+    A text displayed on the screen, at the (`x`, `y`) position (top left
+    corner, in pixels).
+    """
+    text: str
+    x: int = 0
+    y: int = 0
+
+    @classmethod
+    def from_dict(cls, event: dict) -> "TextEvent":
+        return cls(event.get("text", ""), int(event.get("x", 0)), int(event.get("y", 0)))
+
+
+class ScreenText:
+    """
+    The texts displayed on the screen (as reported by the Speculos screen
+    events), indexed once so that they can be queried many times: exact,
+    substring, regular expression and positional queries, or many expected
+    strings at once.
+    """
+
+    def __init__(self, events: Sequence[dict]):
+        """
+        :param events: The screen events (``{"text": ..., "x": ..., "y": ...}``)
+        :type events: Sequence[dict]
+        """
+        self._raw = list(events)
+        self._events = tuple(TextEvent.from_dict(event) for event in self._raw)
+        self._texts = frozenset(event.text for event in self._events)
+        self._joined = _SEPARATOR.join(event.text for event in self._events)
+        self._serialized: Optional[str] = None
+
+    @property
+    def events(self) -> Sequence[TextEvent]:
+        return self._events
+
+    @property
+    def texts(self) -> List[str]:
+        return [event.text for event in self._events]
+
+    @property
+    def serialized(self) -> str:
+        """
+        :return: The screen content, JSON serialized (once), as historically
+                 searched by :meth:`compare_screen_with_text`
+        :rtype: str
+        """
+        if self._serialized is None:
+            self._serialized = dumps(self.to_dict())
+        return self._serialized
+
+    def to_dict(self) -> dict:
+        return {"events": [dict(event) for event in self._raw]}
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ScreenText) and self._raw == other._raw
+
+    def __contains__(self, text: str) -> bool:
+        return self.contains(text)
+
+    def contains(self, text: str) -> bool:
+        """
+        :return: True if a displayed text contains `text`
+        :rtype: bool
+        """
+        return text in self._joined
+
+    def has(self, text: str) -> bool:
+        """
+        :return: True if `text` is exactly one of the displayed texts
+        :rtype: bool
+        """
+        return text in self._texts
+
+    def find(self, text: str, exact: bool = False) -> List[TextEvent]:
+        """
+        :param text: The text to look for
+        :type text: str
+        :param exact: Only return the events whose text is `text`, instead of
+                      the ones containing it
+        :type exact: bool
+
+        :return: The matching events, in display order
+        :rtype: List[TextEvent]
+        """
+        if exact:
+            return [event for event in self._events if event.text == text]
+        return [event for event in self._events if text in event.text]
+
+    def search(self, pattern: Union[str, Pattern[str]]) -> Optional[TextEvent]:
+        """
+        :param pattern: The regular expression to look for (in each text)
+        :type pattern: Union[str, Pattern[str]]
+
+        :return: The first event matching the expression, or None
+        :rtype: Optional[TextEvent]
+        """
+        regex = re.compile(pattern) if isinstance(pattern, str) else pattern
+        return next((event for event in self._events if regex.search(event.text)), None)
+
+    def in_region(self,
+                  left: int = 0,
+                  upper: int = 0,
+                  right: Optional[int] = None,
+                  lower: Optional[int] = None) -> "ScreenText":
+        """
+        :return: The texts whose position is inside the region (`right` and
+                 `lower` excluded, unbounded if None)
+        :rtype: ScreenText
+        """
+        return ScreenText([
+            raw for raw, event in zip(self._raw, self._events)
+            if left <= event.x and (right is None or event.x < right) and upper <= event.y and (
+                lower is None or event.y < lower)
+        ])
+
+    def missing(self, texts: Iterable[str]) -> List[str]:
+        """
+        Checks many expected strings at once.
+
+        :param texts: The strings expected on the screen (as substrings)
+        :type texts: Iterable[str]
+
+        :return: The strings which are not displayed
+        :rtype: List[str]
+        """
+        return [text for text in texts if text not in self._joined]
+
+    def contains_all(self, texts: Iterable[str]) -> bool:
+        return not self.missing(texts)
+
+    def contains_any(self, texts: Iterable[str]) -> bool:
+        return any(text in self._joined for text in texts)
@@ -0,0 +1,200 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from hashlib import sha256
+from io import BytesIO
+from os import stat
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Callable, Optional, Tuple, Union
+
+from PIL import Image
+
+from .snapshot_bundle import SNAPSHOT_BUNDLES, SnapshotBundleRegistry
+from .structs import Crop
+
+ImageSource = Union[str, Path, BinaryIO]
+
+
+@dataclass(frozen=True)
+class Frame:
+    """
+    A decoded (and possibly cropped) screenshot, stored as raw RGB pixels.
+
+    Two frames are equal if they have the same size and the same pixels, which
+    is a single buffer comparison.
+    """
+    size: Tuple[int, int]
+    pixels: bytes = field(repr=False)
+
+    @property
+    def digest(self) -> str:
+        """
+        :return: A hash of the frame content
+        :rtype: str
+        """
+        return sha256(self.size[0].to_bytes(4, "big") + self.size[1].to_bytes(4, "big") +
+                      self.pixels).hexdigest()
+
+
+def decode_frame(source: ImageSource, crop: Optional[Crop] = None) -> Frame:
+    """
+    Decodes an image (file path or file-like object) into a :class:`Frame`.
+
+    :param source: The image to decode
+    :type source: Union[str, Path, BinaryIO]
+    :param crop: Optional crop (in pixels from each border) applied on the image
+    :type crop: Crop
+
+    :return: The decoded frame
+    :rtype: Frame
+    """
+    if not isinstance(source, (str, Path)):
+        source.seek(0)
+    with Image.open(source) as opened:
+        img: Image.Image = opened
+        if crop is not None and any([crop.left, crop.upper, crop.right, crop.lower]):
+            width, height = img.size
+            img = img.crop((crop.left, crop.upper, width - crop.right, height - crop.lower))
+        img = img.convert("RGB")
+        return Frame(img.size, img.tobytes())
+
+
+class GoldenCache:
+    """
+    An in-process, size-bounded LRU cache of decoded golden snapshots.
+
+    Entries are keyed by path, crop and file metadata (modification time,
+    size), so a golden file rewritten on disk (golden runs for instance) is
+    decoded again.
+
+    Goldens contained in a registered snapshot bundle (see
+    :mod:`ragger.utils.snapshot_bundle`) are read from the bundle, without
+    accessing the file system.
+    """
+
+    def __init__(self,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 bundles: Optional[SnapshotBundleRegistry] = None):
+        """
+        :param max_bytes: Maximum total size of the cached pixel buffers. The
+                          least recently used entries are evicted beyond it.
+        :type max_bytes: int
+        :param bundles: The snapshot bundles to look goldens up into. Defaults
+                        to the process-wide registry.
+        :type bundles: SnapshotBundleRegistry
+        """
+        self._max_bytes = max_bytes
+        self._bundles = bundles if bundles is not None else SNAPSHOT_BUNDLES
+        self._entries: "OrderedDict[tuple, Frame]" = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """
+        :return: The total size in bytes of the cached pixel buffers
+        :rtype: int
+        """
+        return self._size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get(self, path: Union[str, Path], crop: Optional[Crop] = None) -> Frame:
+        """
+        Returns the decoded golden snapshot, decoding it only on cache miss.
+
+        :param path: Path of the golden snapshot
+        :type path: Union[str, Path]
+        :param crop: Optional crop applied on the golden snapshot
+        :type crop: Crop
+
+        :raises FileNotFoundError: If the golden snapshot does not exist
+
+        :return: The decoded golden snapshot
+        :rtype: Frame
+        """
+        found = self._bundles.lookup(path)
+        if found is not None:
+            bundle, name = found
+            key: tuple = (str(bundle.path), name, crop) + bundle.stamp
+        else:
+            st = stat(path)
+            key = (str(path), crop, st.st_mtime_ns, st.st_size, st.st_ino)
+        with self._lock:
+            frame = self._entries.get(key)
+            if frame is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return frame
+            self.misses += 1
+
+        source: ImageSource = path if found is None else BytesIO(found[0].read(found[1]))
+        frame = decode_frame(source, crop)
+        with self._lock:
+            if key not in self._entries and len(frame.pixels) <= self._max_bytes:
+                self._entries[key] = frame
+                self._size += len(frame.pixels)
+                while self._size > self._max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted.pixels)
+        return frame
+
+
+# Shared by every backend of the process, so that goldens are decoded once per session
+GOLDEN_CACHE = GoldenCache()
+
+# Compares a screenshot frame with a golden frame (see ragger.utils.image_diff)
+FrameComparator = Callable[[Frame, Frame], bool]
+
+
+def compare_with_golden(screenshot: ImageSource,
+                        golden_path: Union[str, Path],
+                        crop: Optional[Crop] = None,
+                        cache: Optional[GoldenCache] = None,
+                        comparator: Optional[FrameComparator] = None) -> bool:
+    """
+    Compares a screenshot with a golden snapshot, going through the golden
+    cache.
+
+    :param screenshot: The screenshot to check
+    :type screenshot: Union[str, Path, BinaryIO]
+    :param golden_path: Path of the golden snapshot
+    :type golden_path: Union[str, Path]
+    :param crop: Optional crop applied on both images before comparison
+    :type crop: Crop
+    :param cache: The golden cache to use. Defaults to the process-wide one.
+    :type cache: GoldenCache
+    :param comparator: Compares the screenshot and golden frames. Defaults to
+                       an exact comparison.
+    :type comparator: Callable[[Frame, Frame], bool]
+
+    :return: True if both images match, else False
+    :rtype: bool
+    """
+    cache = cache if cache is not None else GOLDEN_CACHE
+    if comparator is None:
+        return cache.get(golden_path, crop) == decode_frame(screenshot, crop)
+    return comparator(decode_frame(screenshot, crop), cache.get(golden_path, crop))
@@ -0,0 +1,202 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+from dataclasses import dataclass, field
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, List, Optional, TextIO, Tuple, Union
+
+# Session directory layout: the records, one JSON object per line, and the
+# screenshots they refer to, stored once per content
+RECORDS_NAME = "records.jsonl"
+FRAMES_DIR = "frames"
+SESSION_VERSION = 1
+
+# Record kinds
+COMMAND = "command"
+RESPONSE = "response"
+INPUT = "input"
+SCREEN = "screen"
+
+
+@dataclass(frozen=True)
+class SessionRecord:
+    """
+    A recorded step of a session:
+
+    - ``command``: an APDU sent to the device (``data``),
+    - ``response``: an APDU response (``data`` and ``status``),
+    - ``input``: a navigation input (``action`` and its ``args``),
+    - ``screen``: a new screen, its screenshot (``frame`` digest) and
+      content (``content``).
+    """
+    kind: str
+    data: bytes = b""
+    status: int = 0
+    action: str = ""
+    args: Tuple[int, ...] = ()
+    frame: str = ""
+    content: dict = field(default_factory=dict, compare=False)
+
+    def to_json(self) -> dict:
+        if self.kind == COMMAND:
+            return {"kind": self.kind, "data": self.data.hex()}
+        if self.kind == RESPONSE:
+            return {"kind": self.kind, "data": self.data.hex(), "status": self.status}
+        if self.kind == INPUT:
+            return {"kind": self.kind, "action": self.action, "args": list(self.args)}
+        return {"kind": self.kind, "frame": self.frame, "content": self.content}
+
+    @classmethod
+    def from_json(cls, record: dict) -> "SessionRecord":
+        return cls(kind=record["kind"],
+                   data=bytes.fromhex(record.get("data", "")),
+                   status=record.get("status", 0),
+                   action=record.get("action", ""),
+                   args=tuple(record.get("args", ())),
+                   frame=record.get("frame", ""),
+                   content=record.get("content", dict()))
+
+
+class SessionRecorder:
+    """
+    Records a device session (APDUs, navigation inputs and screens) into a
+    directory, to be replayed by :class:`ReplayBackend
+    <ragger.backend.replay.ReplayBackend>`.
+
+    Screens are only recorded when they differ from the previously recorded
+    one, and each screenshot is written once.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        """
+        :param directory: The session directory. Previous records are
+                          overwritten.
+        :type directory: Union[str, Path]
+        """
+        self._directory = Path(directory)
+        self._frames_dir = self._directory / FRAMES_DIR
+        self._frames_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._last_frame: Optional[str] = None
+        self._count = 0
+        self._file: TextIO = open(self._directory / RECORDS_NAME, "w")
+        self._file.write(json.dumps({"version": SESSION_VERSION}) + "\n")
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _append(self, record: SessionRecord) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record.to_json()) + "\n")
+            self._count += 1
+
+    def record_command(self, data: bytes) -> None:
+        self._append(SessionRecord(COMMAND, data=data))
+
+    def record_response(self, status: int, data: bytes) -> None:
+        self._append(SessionRecord(RESPONSE, data=data, status=status))
+
+    def record_input(self, action: str, *args: int) -> None:
+        self._append(SessionRecord(INPUT, action=action, args=tuple(args)))
+
+    def record_screen(self, screenshot: bytes, content: Callable[[], dict]) -> bool:
+        """
+        Records a screen, unless it is the same as the previously recorded one.
+
+        :param screenshot: The screenshot (PNG)
+        :type screenshot: bytes
+        :param content: Returns the screen content, only called if the screen
+                        is recorded
+        :type content: Callable[[], dict]
+
+        :return: True if the screen was recorded
+        :rtype: bool
+        """
+        digest = sha256(screenshot).hexdigest()
+        if digest == self._last_frame:
+            return False
+        frame_path = self._frames_dir / f"{digest}.png"
+        if not frame_path.exists():
+            frame_path.write_bytes(screenshot)
+        self._last_frame = digest
+        self._append(SessionRecord(SCREEN, frame=digest, content=content()))
+        return True
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def reopen(self) -> None:
+        """
+        Reopens the records file if it was closed, so that new records are
+        appended to the session.
+        """
+        with self._lock:
+            if self._file.closed:
+                self._file = open(self._directory / RECORDS_NAME, "a")
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self) -> "SessionRecorder":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class Session:
+    """
+    A recorded session, loaded in memory.
+    """
+
+    def __init__(self, records: List[SessionRecord], frames: Dict[str, bytes]):
+        self.records = records
+        self.frames = frames
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> "Session":
+        """
+        :param directory: The session directory
+        :type directory: Union[str, Path]
+
+        :raises ValueError: If the directory does not hold a supported
+                            session, or if a screenshot is missing
+
+        :return: The session
+        :rtype: Session
+        """
+        directory = Path(directory)
+        lines = (directory / RECORDS_NAME).read_text().splitlines()
+        if not lines or json.loads(lines[0]).get("version") != SESSION_VERSION:
+            raise ValueError(f"'{directory}' does not hold a supported recorded session")
+        records = [SessionRecord.from_json(json.loads(line)) for line in lines[1:] if line]
+        frames: Dict[str, bytes] = dict()
+        for record in records:
+            if record.kind == SCREEN and record.frame not in frames:
+                frame_path = directory / FRAMES_DIR / f"{record.frame}.png"
+                if not frame_path.is_file():
+                    raise ValueError(f"Missing recorded screenshot '{frame_path}'")
+                frames[record.frame] = frame_path.read_bytes()
+        return cls(records, frames)
@@ -0,0 +1,260 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+import mmap
+from hashlib import sha256
+from os import stat
+from pathlib import Path
+from struct import Struct
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+# File layout: the header (magic, index size), the JSON index, then the
+# (deduplicated) images, whose offsets in the index are relative to the end of
+# the index.
+BUNDLE_MAGIC = b"RAGSNP\x00\x01"
+_HEADER = Struct("<8sQ")
+
+BUNDLE_SUFFIX = ".bundle"
+
+
+class SnapshotBundle:
+    """
+    A read-only, memory-mapped, packed golden snapshots store.
+
+    A bundle stands for a snapshots directory (typically
+    ``snapshots/<device>/``, see :func:`pack_snapshots`): every image of the
+    directory is reachable with its path relative to this directory
+    (``<test name>/00000.png``). Identical images are only stored once.
+    """
+
+    def __init__(self, path: Union[str, Path], root: Optional[Union[str, Path]] = None):
+        """
+        :param path: Path of the bundle file
+        :type path: Union[str, Path]
+        :param root: Directory the bundle stands for. Defaults to the bundle
+                     path without its suffix (``snapshots/nanos.bundle`` stands
+                     for ``snapshots/nanos/``).
+        :type root: Union[str, Path]
+        """
+        self._path = Path(path).absolute()
+        self._root = Path(root).absolute() if root is not None else self._path.with_suffix("")
+        st = stat(self._path)
+        self._stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        with open(self._path, "rb") as bundle:
+            self._mmap = mmap.mmap(bundle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != BUNDLE_MAGIC:
+            self._mmap.close()
+            raise ValueError(f"'{path}' is not a snapshot bundle")
+        index = json.loads(self._mmap[_HEADER.size:_HEADER.size + index_size].decode())
+        self._data_offset = _HEADER.size + index_size
+        self._frames: List[Tuple[int, int, str]] = [(offset, length, digest)
+                                                    for offset, length, digest in index["frames"]]
+        self._entries: Dict[str, int] = index["entries"]
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    @property
+    def stamp(self) -> Tuple[int, int, int]:
+        """
+        :return: The bundle file metadata (modification time, size, inode)
+                 when it was opened
+        :rtype: Tuple[int, int, int]
+        """
+        return self._stamp
+
+    @property
+    def unique_frames(self) -> int:
+        return len(self._frames)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def names(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def read(self, name: str) -> bytes:
+        """
+        :param name: Path of the image, relative to the bundle root
+        :type name: str
+
+        :raises KeyError: If the bundle does not contain the image
+
+        :return: The image file content
+        :rtype: bytes
+        """
+        offset, length, _ = self._frames[self._entries[name]]
+        start = self._data_offset + offset
+        return self._mmap[start:start + length]
+
+    def digest(self, name: str) -> str:
+        """
+        :return: The SHA-256 (hex) of the image file content
+        :rtype: str
+        """
+        return self._frames[self._entries[name]][2]
+
+    def relative_name(self, path: Union[str, Path]) -> Optional[str]:
+        """
+        :return: The name of the given image path in this bundle, or None if
+                 the bundle does not contain it
+        :rtype: Optional[str]
+        """
+        try:
+            name = Path(path).absolute().relative_to(self._root).as_posix()
+        except ValueError:
+            return None
+        return name if name in self._entries else None
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "SnapshotBundle":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class SnapshotBundleRegistry:
+    """
+    The bundles golden snapshots are looked up into, before the file system.
+    """
+
+    def __init__(self):
+        self._bundles: Dict[Path, SnapshotBundle] = dict()
+        self._lock = Lock()
+
+    def open(self,
+             path: Union[str, Path],
+             root: Optional[Union[str, Path]] = None) -> SnapshotBundle:
+        """
+        Opens and registers a bundle. An already registered bundle is only
+        reopened if its file changed on disk.
+
+        :return: The registered bundle
+        :rtype: SnapshotBundle
+        """
+        path = Path(path).absolute()
+        st = stat(path)
+        with self._lock:
+            bundle = self._bundles.get(path)
+            if bundle is not None and bundle.stamp == (st.st_mtime_ns, st.st_size, st.st_ino):
+                return bundle
+            if bundle is not None:
+                bundle.close()
+            bundle = SnapshotBundle(path, root)
+            self._bundles[path] = bundle
+            return bundle
+
+    def lookup(self, path: Union[str, Path]) -> Optional[Tuple[SnapshotBundle, str]]:
+        """
+        :return: The registered bundle containing the given image path, with
+                 the image name in the bundle, or None
+        :rtype: Optional[Tuple[SnapshotBundle, str]]
+        """
+        if not self._bundles:
+            return None
+        with self._lock:
+            bundles = list(self._bundles.values())
+        for bundle in bundles:
+            name = bundle.relative_name(path)
+            if name is not None:
+                return bundle, name
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            for bundle in self._bundles.values():
+                bundle.close()
+            self._bundles.clear()
+
+
+# Shared by every golden cache of the process
+SNAPSHOT_BUNDLES = SnapshotBundleRegistry()
+
+
+def pack_snapshots(directory: Union[str, Path],
+                   bundle_path: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Packs every PNG image of a snapshots directory into a bundle.
+
+    :param directory: The snapshots directory (typically ``snapshots/<device>``)
+    :type directory: Union[str, Path]
+    :param bundle_path: Path of the bundle to write. Defaults to the directory
+                        path with a ``.bundle`` suffix.
+    :type bundle_path: Union[str, Path]
+
+    :return: The path of the written bundle
+    :rtype: Path
+    """
+    directory = Path(directory)
+    bundle_path = Path(bundle_path) if bundle_path is not None else \
+        directory.with_suffix(BUNDLE_SUFFIX)
+    frames: List[Tuple[int, int, str]] = list()
+    blobs: List[bytes] = list()
+    by_digest: Dict[str, int] = dict()
+    entries: Dict[str, int] = dict()
+    offset = 0
+    for image in sorted(directory.rglob("*.png")):
+        content = image.read_bytes()
+        digest = sha256(content).hexdigest()
+        if digest not in by_digest:
+            by_digest[digest] = len(frames)
+            frames.append((offset, len(content), digest))
+            blobs.append(content)
+            offset += len(content)
+        entries[image.relative_to(directory).as_posix()] = by_digest[digest]
+    index = json.dumps({"frames": frames, "entries": entries}).encode()
+    with open(bundle_path, "wb") as bundle:
+        bundle.write(_HEADER.pack(BUNDLE_MAGIC, len(index)))
+        bundle.write(index)
+        for blob in blobs:
+            bundle.write(blob)
+    return bundle_path
+
+
+def unpack_snapshots(bundle_path: Union[str, Path],
+                     directory: Optional[Union[str, Path]] = None) -> int:
+    """
+    Writes back every image of a bundle into a snapshots directory.
+
+    :param bundle_path: Path of the bundle
+    :type bundle_path: Union[str, Path]
+    :param directory: The snapshots directory to write. Defaults to the bundle
+                      root.
+    :type directory: Union[str, Path]
+
+    :return: The number of written images
+    :rtype: int
+    """
+    with SnapshotBundle(bundle_path) as bundle:
+        directory = Path(directory) if directory is not None else bundle.root
+        for name in bundle.names():
+            image = directory / name
+            image.parent.mkdir(parents=True, exist_ok=True)
+            image.write_bytes(bundle.read(name))
+        return len(bundle)
@@ -0,0 +1,282 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+from os import replace, stat
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Tuple, Union
+
+from .screenshot import FrameComparator, GoldenCache, ImageSource, compare_with_golden, decode_frame
+from .structs import Crop
+
+# Directory (in the snapshots directory of a device) holding the unique frames
+FRAMES_DIR = ".frames"
+# File (in each test directory) mapping the snapshot names to frame hashes
+MANIFEST_NAME = "manifest.json"
+
+
+def _read_bytes(source: ImageSource) -> bytes:
+    if isinstance(source, (str, Path)):
+        return Path(source).read_bytes()
+    source.seek(0)
+    return source.read()
+
+
+class SnapshotStore:
+    """
+    A content-addressed golden snapshots store.
+
+    Every unique frame of a device snapshots directory is stored once, in
+    ``<root>/.frames/<hash>.png``, ``<hash>`` being the hash of its pixels
+    (:attr:`Frame.digest <ragger.utils.screenshot.Frame.digest>`). Each test
+    directory holds a ``manifest.json`` mapping its snapshot names
+    (``00000.png``, ...) to frame hashes, instead of the images themselves.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        """
+        :param root: The snapshots directory of a device (``snapshots/<device>``)
+        :type root: Union[str, Path]
+        """
+        self._root = Path(root).absolute()
+        self._frames = self._root / FRAMES_DIR
+        self._lock = Lock()
+        self._manifests: Dict[Path, Tuple[Tuple[int, int], Dict[str, str]]] = dict()
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    @property
+    def frames_dir(self) -> Path:
+        return self._frames
+
+    def frame_path(self, digest: str) -> Path:
+        return self._frames / f"{digest}.png"
+
+    def manifest(self, test_dir: Union[str, Path]) -> Dict[str, str]:
+        """
+        :param test_dir: A test snapshots directory
+        :type test_dir: Union[str, Path]
+
+        :return: The snapshot names of the test, mapped to their frame hash.
+                 Empty if the test has no manifest.
+        :rtype: Dict[str, str]
+        """
+        manifest_path = Path(test_dir).absolute() / MANIFEST_NAME
+        try:
+            st = stat(manifest_path)
+        except FileNotFoundError:
+            return dict()
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._manifests.get(manifest_path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        with open(manifest_path) as manifest_file:
+            manifest: Dict[str, str] = json.load(manifest_file)
+        with self._lock:
+            self._manifests[manifest_path] = (stamp, manifest)
+        return manifest
+
+    def digest(self, path: Union[str, Path]) -> Optional[str]:
+        """
+        :param path: A golden snapshot path (``<root>/<test name>/00000.png``)
+        :type path: Union[str, Path]
+
+        :return: The hash of the golden snapshot frame, or None if the store
+                 does not reference it
+        :rtype: Optional[str]
+        """
+        path = Path(path)
+        return self.manifest(path.parent).get(path.name)
+
+    def add(self, path: Union[str, Path], image: ImageSource) -> str:
+        """
+        Records an image as a golden snapshot. The image file is only written
+        if no identical frame is already stored.
+
+        :param path: The golden snapshot path (``<root>/<test name>/00000.png``)
+        :type path: Union[str, Path]
+        :param image: The PNG image
+        :type image: Union[str, Path, BinaryIO]
+
+        :return: The hash of the image frame
+        :rtype: str
+        """
+        path = Path(path).absolute()
+        digest = decode_frame(image).digest
+        frame_path = self.frame_path(digest)
+        if not frame_path.exists():
+            self._frames.mkdir(parents=True, exist_ok=True)
+            tmp_path = frame_path.with_suffix(".tmp")
+            tmp_path.write_bytes(_read_bytes(image))
+            replace(tmp_path, frame_path)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        manifest = dict(self.manifest(path.parent))
+        if manifest.get(path.name) != digest:
+            manifest[path.name] = digest
+            manifest_path = path.parent / MANIFEST_NAME
+            tmp_path = manifest_path.with_suffix(".tmp")
+            with open(tmp_path, "w") as manifest_file:
+                json.dump(dict(sorted(manifest.items())), manifest_file, indent=2)
+            replace(tmp_path, manifest_path)
+        return digest
+
+    def compare(self,
+                screenshot: ImageSource,
+                path: Union[str, Path],
+                crop: Optional[Crop] = None,
+                cache: Optional[GoldenCache] = None,
+                comparator: Optional[FrameComparator] = None) -> bool:
+        """
+        Compares a screenshot with a golden snapshot of the store.
+
+        Uncropped exact comparisons only compare frame hashes: the golden image is
+        not read. Golden snapshots the store does not reference are compared
+        with the image file itself (see
+        :func:`compare_with_golden <ragger.utils.screenshot.compare_with_golden>`).
+
+        :param screenshot: The screenshot to check
+        :type screenshot: Union[str, Path, BinaryIO]
+        :param path: The golden snapshot path
+        :type path: Union[str, Path]
+        :param crop: Optional crop applied on both images before comparison
+        :type crop: Crop
+        :param cache: The golden cache to use. Defaults to the process-wide one.
+        :type cache: GoldenCache
+        :param comparator: Compares the screenshot and golden frames when their
+                           hashes differ. Defaults to an exact comparison.
+        :type comparator: Callable[[Frame, Frame], bool]
+
+        :return: True if both images are equal, else False
+        :rtype: bool
+        """
+        digest = self.digest(path)
+        if digest is None:
+            return compare_with_golden(screenshot, path, crop, cache, comparator)
+        if decode_frame(screenshot).digest == digest:
+            return True
+        if crop is None and comparator is None:
+            return False
+        # Identical goldens share the same frame file, hence the same cache entry
+        return compare_with_golden(screenshot, self.frame_path(digest), crop, cache, comparator)
+
+
+class SnapshotStoreRegistry:
+    """
+    The content-addressed stores golden snapshots are looked up into.
+    """
+
+    def __init__(self):
+        self._stores: Dict[Path, SnapshotStore] = dict()
+        self._lock = Lock()
+
+    def open(self, root: Union[str, Path]) -> SnapshotStore:
+        """
+        :return: The (registered) store of the given snapshots directory
+        :rtype: SnapshotStore
+        """
+        root = Path(root).absolute()
+        with self._lock:
+            return self._stores.setdefault(root, SnapshotStore(root))
+
+    def lookup(self, path: Union[str, Path]) -> Optional[SnapshotStore]:
+        """
+        :return: The registered store the given golden snapshot path belongs
+                 to, or None
+        :rtype: Optional[SnapshotStore]
+        """
+        if not self._stores:
+            return None
+        # Test names may be nested (``<root>/<group>/<test>/00000.png``)
+        for parent in Path(path).absolute().parents[1:]:
+            store = self._stores.get(parent)
+            if store is not None:
+                return store
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stores.clear()
+
+
+# Shared by every backend of the process
+SNAPSHOT_STORES = SnapshotStoreRegistry()
+
+
+def is_snapshot_store(directory: Union[str, Path]) -> bool:
+    """
+    :return: True if the given snapshots directory is a content-addressed store
+    :rtype: bool
+    """
+    return (Path(directory) / FRAMES_DIR).is_dir()
+
+
+def _in_test_dir(store: SnapshotStore, path: Path) -> bool:
+    # Test directories may be nested, but are neither the store root nor
+    # its frames directory
+    parts = path.relative_to(store.root).parts
+    return len(parts) > 1 and parts[0] != FRAMES_DIR
+
+
+def convert_to_store(directory: Union[str, Path]) -> Tuple[int, int]:
+    """
+    Converts a snapshots directory (``snapshots/<device>``) into a
+    content-addressed store: the test directories images are replaced with
+    manifests.
+
+    :param directory: The snapshots directory
+    :type directory: Union[str, Path]
+
+    :return: The number of converted snapshots, and of unique frames
+    :rtype: Tuple[int, int]
+    """
+    store = SnapshotStore(directory)
+    store.frames_dir.mkdir(parents=True, exist_ok=True)
+    images = sorted(image for image in store.root.rglob("*.png") if _in_test_dir(store, image))
+    digests = set()
+    for image in images:
+        digests.add(store.add(image, image))
+        image.unlink()
+    return len(images), len(digests)
+
+
+def convert_from_store(directory: Union[str, Path]) -> int:
+    """
+    Writes back the images of a content-addressed store into its test
+    directories, then removes the store frames and manifests.
+
+    :param directory: The snapshots directory
+    :type directory: Union[str, Path]
+
+    :return: The number of written snapshots
+    :rtype: int
+    """
+    store = SnapshotStore(directory)
+    count = 0
+    manifests = sorted(manifest_path for manifest_path in store.root.rglob(MANIFEST_NAME)
+                       if _in_test_dir(store, manifest_path))
+    for manifest_path in manifests:
+        for name, digest in store.manifest(manifest_path.parent).items():
+            (manifest_path.parent / name).write_bytes(store.frame_path(digest).read_bytes())
+            count += 1
+        manifest_path.unlink()
+    for frame in store.frames_dir.glob("*.png"):
+        frame.unlink()
+    store.frames_dir.rmdir()
+    return count
@@ -0,0 +1,164 @@
+"""
+   Copyright 2023 Ledger SAS
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+
+class TmpSnapshotWriter:
+    """
+    Writes the screenshots compared with golden snapshots into the temporary
+    snapshots directory (``snapshots-tmp``).
+
+    Screenshots are written as received (already PNG encoded), either
+    immediately or, in `lazy` mode, only when they do not match their golden
+    snapshot: matching screenshots are kept in memory until they are either
+    written (:meth:`flush`, typically when the test fails) or dropped
+    (:meth:`discard`). With `workers`, files are written by a thread pool
+    instead of the comparing thread.
+    """
+
+    def __init__(self, lazy: bool = False, workers: int = 0):
+        """
+        :param lazy: Only write the screenshots which do not match right away
+        :type lazy: bool
+        :param workers: Number of background writer threads (0 to write
+                        synchronously)
+        :type workers: int
+        """
+        self._lazy = lazy
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="tmp-snapshot-writer") \
+            if workers > 0 else None
+        self._lock = Lock()
+        self._deferred: Dict[Path, bytes] = dict()
+        # Background writes, by path
+        self._futures: List[Tuple[Path, Future]] = list()
+
+    @property
+    def lazy(self) -> bool:
+        return self._lazy
+
+    @property
+    def deferred(self) -> int:
+        """
+        :return: The number of screenshots kept in memory
+        :rtype: int
+        """
+        return len(self._deferred)
+
+    def write(self, path: Path, snap: bytes) -> None:
+        """
+        Writes a screenshot, on the calling thread or in the background.
+        """
+        with self._lock:
+            # A later write supersedes a deferred one
+            self._deferred.pop(path, None)
+        if self._executor is None:
+            Path(path).write_bytes(snap)
+            return
+        future = self._executor.submit(Path(path).write_bytes, snap)
+        with self._lock:
+            self._futures = [(p, f) for p, f in self._futures if not f.done()]
+            self._futures.append((Path(path), future))
+
+    def save(self, path: Path, snap: bytes, matches: Optional[bool] = None) -> None:
+        """
+        Saves a compared screenshot.
+
+        :param path: Path of the temporary snapshot
+        :type path: Path
+        :param snap: The PNG screenshot
+        :type snap: bytes
+        :param matches: Comparison result (None if unknown yet or failed). In
+                        lazy mode, only matching screenshots are deferred.
+        :type matches: Optional[bool]
+        """
+        if self._lazy and matches:
+            with self._lock:
+                self._deferred[path] = snap
+        else:
+            self.write(path, snap)
+
+    def flush(self) -> int:
+        """
+        Writes the deferred screenshots, then waits for every pending write.
+
+        :return: The number of written deferred screenshots
+        :rtype: int
+        """
+        with self._lock:
+            deferred, self._deferred = self._deferred, dict()
+        for path, snap in deferred.items():
+            self.write(path, snap)
+        self.wait()
+        return len(deferred)
+
+    def discard(self) -> int:
+        """
+        Drops the deferred screenshots, then waits for every pending write.
+
+        :return: The number of dropped screenshots
+        :rtype: int
+        """
+        with self._lock:
+            count = len(self._deferred)
+            self._deferred.clear()
+        self.wait()
+        return count
+
+    def invalidate(self, directory: Path, start_idx: int = 0) -> int:
+        """
+        Drops the deferred screenshots of a temporary snapshots directory whose
+        index is greater or equal to `start_idx`, then waits for the pending
+        writes into that directory, so that the snapshots it is cleaned from
+        are not written back afterwards.
+
+        :param directory: The temporary snapshots directory
+        :type directory: Path
+        :param start_idx: Index of the first dropped snapshot
+        :type start_idx: int
+
+        :return: The number of dropped screenshots
+        :rtype: int
+        """
+        directory = Path(directory)
+        with self._lock:
+            dropped = [
+                path for path in self._deferred if Path(path).parent == directory
+                and Path(path).stem.isnumeric() and int(Path(path).stem) >= start_idx
+            ]
+            for path in dropped:
+                del self._deferred[path]
+            futures = [future for path, future in self._futures if path.parent == directory]
+        wait(futures)
+        return len(dropped)
+
+    def wait(self) -> None:
+        """
+        Waits for the background writes, raising the first write error if any.
+        """
+        with self._lock:
+            futures, self._futures = self._futures, list()
+        wait([future for _, future in futures])
+        for _, future in futures:
+            future.result()
+
+    def close(self) -> None:
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
@@ -1,14 +1,13 @@
 from pathlib import Path
 from typing import Optional
 from unittest import TestCase
-from unittest.mock import patch
 
 from ragger.backend import SpeculosBackend, RaisePolicy
 from ragger.error import ExceptionRAPDU
 from ragger.firmware import Firmware
 from ragger.utils import RAPDU
 
-from tests.stubs import SpeculosServerStub, EndPoint, APDUStatus
+from tests.stubs import patch_speculos_process, SpeculosServerStub, EndPoint, APDUStatus
 
 ROOT_SCREENSHOT_PATH = Path(__file__).parent.parent.resolve()
 
@@ -19,8 +18,8 @@ class TestbackendSpeculos(TestCase):
 
     ```
     def test_something(self):
-        # patches 'subprocess' so that Speculos Client won't actually launch an app inside Speculos
-        with patch("speculos.client.subprocess"):
+        # patches the process start so that the backend won't actually launch an app inside Speculos
+        with patch_speculos_process():
             # starts the Speculos server stub, which will answer the SpeculosClient requests
             with SpeculosServerStub():
                 # starts the backend: starts the underlying SpeculosClient so that exchanges can be
@@ -45,14 +44,14 @@ class TestbackendSpeculos(TestCase):
         self.backend = SpeculosBackend("some app", self.firmware)
 
     def test_exchange_raw(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     rapdu = self.backend.exchange_raw(bytes.fromhex("00000000"))
                     self.check_rapdu(rapdu, expected=bytes.fromhex(EndPoint.APDU))
 
     def test_exchange_raw_error(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     self.backend.raise_policy = RaisePolicy.RAISE_NOTHING
@@ -62,7 +61,7 @@ class TestbackendSpeculos(TestCase):
                                      status=APDUStatus.ERROR)
 
     def test_exchange_raw_raises(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     with self.assertRaises(ExceptionRAPDU) as error:
@@ -70,7 +69,7 @@ class TestbackendSpeculos(TestCase):
                     self.assertEqual(error.exception.status, APDUStatus.ERROR)
 
     def test_exchange_raw_raise_valid(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     self.backend.raise_policy = RaisePolicy.RAISE_ALL
@@ -79,7 +78,7 @@ class TestbackendSpeculos(TestCase):
                     self.assertEqual(error.exception.status, APDUStatus.SUCCESS)
 
     def test_send_raw(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     self.assertIsNone(self.backend._pending)
@@ -91,7 +90,7 @@ class TestbackendSpeculos(TestCase):
             self.backend.receive()
 
     def test_receive_ok(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     self.backend.send_raw(bytes.fromhex("00000000"))
@@ -99,7 +98,7 @@ class TestbackendSpeculos(TestCase):
                     self.check_rapdu(rapdu, expected=bytes.fromhex(EndPoint.APDU))
 
     def test_exchange_async_raw_ok(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     with self.backend.exchange_async_raw(bytes.fromhex("00000000")):
@@ -109,7 +108,7 @@ class TestbackendSpeculos(TestCase):
                     self.check_rapdu(rapdu, expected=bytes.fromhex(EndPoint.APDU))
 
     def test_exchange_async_raw_error(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     self.backend.raise_policy = RaisePolicy.RAISE_NOTHING
@@ -122,7 +121,7 @@ class TestbackendSpeculos(TestCase):
                                      status=APDUStatus.ERROR)
 
     def test_exchange_async_raw_raises(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     with self.assertRaises(ExceptionRAPDU) as error:
@@ -131,7 +130,7 @@ class TestbackendSpeculos(TestCase):
                     self.assertEqual(error.exception.status, APDUStatus.ERROR)
 
     def test_exchange_async_raw_raise_valid(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     self.backend.raise_policy = RaisePolicy.RAISE_ALL
@@ -141,9 +140,24 @@ class TestbackendSpeculos(TestCase):
                     self.assertEqual(error.exception.status, APDUStatus.SUCCESS)
 
     def test_clicks(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     self.backend.right_click()
                     self.backend.left_click()
                     self.backend.both_click()
+
+    def test_http_connections_reused(self):
+        with patch_speculos_process():
+            with SpeculosServerStub():
+                with self.backend:
+                    self.backend.reset_http_latencies()
+                    for _ in range(20):
+                        self.backend.right_click()
+                        self.backend.compare_screen_with_text("Boilerplate")
+                    latencies = self.backend.http_latencies
+                    self.assertEqual(latencies["POST /button/right"].count, 20)
+                    self.assertEqual(latencies["GET /events"].count, 20)
+                    self.assertLessEqual(latencies["GET /events"].minimum,
+                                         latencies["GET /events"].mean)
+                    self.assertLessEqual(self.backend.http_connections_opened, 4)
@@ -1,12 +1,11 @@
 from unittest import TestCase
-from unittest.mock import patch
 from pathlib import Path
 
 from ragger.firmware import Firmware
 from ragger.backend import SpeculosBackend
 from ragger.navigator import NavInsID, NavIns, NanoNavigator
 
-from tests.stubs import SpeculosServerStub
+from tests.stubs import patch_speculos_process, SpeculosServerStub
 
 ROOT_SCREENSHOT_PATH = Path(__file__).parent.parent.parent.resolve()
 
@@ -17,8 +16,8 @@ class TestNavigator(TestCase):
 
     ```
     def test_something(self):
-        # patches 'subprocess' so that Speculos Client won't actually launch an app inside Speculos
-        with patch("speculos.client.subprocess"):
+        # patches the process start so that the backend won't actually launch an app inside Speculos
+        with patch_speculos_process():
             # starts the Speculos server stub, which will answer the SpeculosClient requests
             with SpeculosServerStub():
                 # starts the backend: starts the underlying SpeculosClient so that exchanges can be
@@ -38,7 +37,7 @@ class TestNavigator(TestCase):
         self.navigator = NanoNavigator(self.backend, self.firmware)
 
     def test_navigate_and_compare(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     instructions = [
@@ -59,7 +58,7 @@ class TestNavigator(TestCase):
                         screen_change_after_last_instruction=False)
 
     def test_navigate_and_compare_no_golden(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     instructions = [NavIns(NavInsID.RIGHT_CLICK)]
@@ -74,7 +73,7 @@ class TestNavigator(TestCase):
                                   str(error.exception))
 
     def test_navigate_and_compare_wrong_golden(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     instructions = [NavIns(NavInsID.RIGHT_CLICK)]
@@ -88,7 +87,7 @@ class TestNavigator(TestCase):
                     self.assertIn("00001.png", str(error.exception))
 
     def test_navigate_until_snap(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     ret = self.navigator.navigate_until_snap(NavIns(NavInsID.RIGHT_CLICK),
@@ -98,7 +97,7 @@ class TestNavigator(TestCase):
                 self.assertEqual(ret, 2)
 
     def test_navigate_fail_cannot_find_first_snap(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     with self.assertRaises(ValueError) as error:
@@ -109,7 +108,7 @@ class TestNavigator(TestCase):
                     self.assertIn("Could not find first snapshot", str(error.exception))
 
     def test_navigate_fail_cannot_find_last_snap(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     with self.assertRaises(TimeoutError) as error:
@@ -123,7 +122,7 @@ class TestNavigator(TestCase):
                     self.assertIn("Timeout waiting for snap", str(error.exception))
 
     def test_navigate_until_text(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     self.navigator.navigate_until_text(NavIns(NavInsID.RIGHT_CLICK),
@@ -132,7 +131,7 @@ class TestNavigator(TestCase):
                                                        screen_change_before_first_instruction=False)
 
     def test_navigate_until_text_screen_change_timeout(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     with self.assertRaises(TimeoutError) as error:
@@ -144,7 +143,7 @@ class TestNavigator(TestCase):
                     self.assertIn("Timeout waiting for screen change", str(error.exception))
 
     def test_navigate_until_text_and_compare(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     self.navigator.navigate_until_text_and_compare(
@@ -155,7 +154,7 @@ class TestNavigator(TestCase):
                         screen_change_before_first_instruction=False)
 
     def test_navigate_until_text_and_compare_no_golden(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     with self.assertRaises(FileNotFoundError) as error:
@@ -170,7 +169,7 @@ class TestNavigator(TestCase):
                                   str(error.exception))
 
     def test_navigate_until_text_and_compare_wrong_golden(self):
-        with patch("speculos.client.subprocess"):
+        with patch_speculos_process():
             with SpeculosServerStub():
                 with self.backend:
                     with self.assertRaises(AssertionError) as error:
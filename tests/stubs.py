@@ -2,6 +2,7 @@ from enum import IntEnum
 from io import BytesIO
 from multiprocessing import Process
 from pathlib import Path
+from unittest.mock import patch
 
 from flask import Flask, request
 from PIL import Image
@@ -92,6 +93,13 @@ class Actions:
         return iobytes.getvalue(), 200
 
 
+def patch_speculos_process():
+    # The backend starts the Speculos process itself: it is replaced by a process which never
+    # exits, so that no app is actually launched inside Speculos
+    return patch("ragger.backend.speculos.subprocess.Popen",
+                 **{"return_value.poll.return_value": None})
+
+
 class SpeculosServerStub:
 
     def __init__(self):
@@ -0,0 +1,339 @@
+import asyncio
+import threading
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+import httpx
+from PIL import Image
+
+from ragger.backend import AsyncSpeculosBackend, RaisePolicy
+from ragger.error import ExceptionRAPDU
+from ragger.firmware import Firmware
+from ragger.navigator import AsyncNanoNavigator, NavInsID
+from ragger.utils.screenshot import decode_frame
+
+
+def png(color) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeSpeculos:
+    """
+    Minimal Speculos REST API: each right click displays the next screen.
+    """
+
+    def __init__(self, screens):
+        self.screens = screens
+        self.index = 0
+        self.apdus = list()
+        self.reply = "9000"
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/events":
+            text = self.screens[self.index][0]
+            return httpx.Response(
+                200,
+                json={"events": [{
+                    "text": text,
+                    "x": 0,
+                    "y": 0
+                }, {
+                    "text": " ",
+                    "x": 0,
+                    "y": 0
+                }]})
+        if path == "/screenshot":
+            return httpx.Response(200, content=png(self.screens[self.index][1]))
+        if path == "/apdu":
+            self.apdus.append(request.read())
+            return httpx.Response(200, json={"data": "abcd" + self.reply})
+        if path == "/button/right":
+            self.index = min(self.index + 1, len(self.screens) - 1)
+            return httpx.Response(200, json={})
+        if path in ("/button/left", "/button/both", "/finger"):
+            return httpx.Response(200, json={})
+        return httpx.Response(404)
+
+
+class StreamingFakeSpeculos(FakeSpeculos):
+    """
+    Also serves the events stream, one event per displayed screen.
+    """
+
+    def __init__(self, screens):
+        super().__init__(screens)
+        self.events: "asyncio.Queue[str]" = asyncio.Queue()
+
+    async def stream(self):
+        while True:
+            text = await self.events.get()
+            yield f"data: {{\"text\": \"{text}\"}}\n\n".encode()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/events" and request.url.params.get("stream") == "true":
+            return httpx.Response(200,
+                                  headers={"content-type": "text/event-stream"},
+                                  content=self.stream())
+        response = super().handler(request)
+        if request.url.path == "/button/right":
+            self.events.put_nowait(self.screens[self.index][0])
+        return response
+
+
+class NoProcessBackend(AsyncSpeculosBackend):
+
+    async def _start_process(self, deadline):
+        pass
+
+
+class TestAsyncSpeculosBackend(TestCase):
+
+    def setUp(self):
+        self.firmware = Firmware("nanos", "2.1")
+        self.speculos = FakeSpeculos([("Home", "black"), ("Review", "white"), ("Approve", "red")])
+
+    def backend(self, **kwargs):
+        return NoProcessBackend("some app",
+                                firmware=self.firmware,
+                                transport=httpx.MockTransport(self.speculos.handler),
+                                **kwargs)
+
+    def run_with_backend(self, coroutine, **kwargs):
+
+        async def main():
+            async with self.backend(**kwargs) as backend:
+                return await coroutine(backend)
+
+        return asyncio.run(main())
+
+    def test___init__args(self):
+        backend = AsyncSpeculosBackend("some app",
+                                       firmware=self.firmware,
+                                       port=1234,
+                                       args=["--apdu-port", "4321"])
+        self.assertEqual(backend.port, 1234)
+        self.assertEqual(backend.url, "http://127.0.0.1:1234")
+        self.assertIn("1234", backend._args)
+        self.assertNotIn("9999", backend._args)
+
+    def test_events_stream_unavailable_fallback(self):
+
+        async def check(backend):
+            await asyncio.sleep(0.05)
+            return backend.events_stream_available
+
+        self.assertFalse(self.run_with_backend(check))
+
+    def test_events_stream(self):
+
+        async def main():
+            speculos = StreamingFakeSpeculos([("Home", "black"), ("Review", "white")])
+            backend = NoProcessBackend("some app",
+                                       firmware=self.firmware,
+                                       transport=httpx.MockTransport(speculos.handler),
+                                       events_settle_window=0.01)
+            async with backend:
+                await asyncio.sleep(0.05)
+                self.assertTrue(backend.events_stream_available)
+                await backend.right_click()
+                await backend.wait_for_screen_change(1)
+                self.assertEqual(backend.events_sequence, 1)
+                self.assertTrue(await backend.compare_screen_with_text("Review"))
+                with self.assertRaises(TimeoutError):
+                    await backend.wait_for_screen_change(0.05)
+
+        asyncio.run(main())
+
+    def test_exchange(self):
+
+        async def exchange(backend):
+            return await backend.exchange(0x01, 0x02, data=b"\x03")
+
+        rapdu = self.run_with_backend(exchange)
+        self.assertEqual(rapdu.status, 0x9000)
+        self.assertEqual(rapdu.data, bytes.fromhex("abcd"))
+        self.assertIn(b"0102000001" + b"03", self.speculos.apdus[0])
+
+    def test_exchange_raises(self):
+        self.speculos.reply = "6985"
+
+        async def exchange(backend):
+            await backend.exchange(0x01, 0x02)
+
+        with self.assertRaises(ExceptionRAPDU) as error:
+            self.run_with_backend(exchange)
+        self.assertEqual(error.exception.status, 0x6985)
+
+    def test_send_receive_no_raise(self):
+        self.speculos.reply = "6985"
+
+        async def exchange(backend):
+            backend.raise_policy = RaisePolicy.RAISE_NOTHING
+            await backend.send(0x01, 0x02)
+            return await backend.receive()
+
+        self.assertEqual(self.run_with_backend(exchange).status, 0x6985)
+
+    def test_exchange_async(self):
+
+        async def exchange(backend):
+            async with backend.exchange_async(0x01, 0x02):
+                await backend.right_click()
+            return backend.last_async_response
+
+        self.assertEqual(self.run_with_backend(exchange).data, bytes.fromhex("abcd"))
+
+    def test_wait_for_screen_change(self):
+
+        async def navigate(backend):
+            await backend.right_click()
+            await backend.wait_for_screen_change(1)
+            return await backend.compare_screen_with_text("Review")
+
+        self.assertTrue(self.run_with_backend(navigate))
+
+    def test_wait_for_screen_change_timeout(self):
+
+        async def wait(backend):
+            await backend.wait_for_screen_change(0.05)
+
+        with self.assertRaises(TimeoutError):
+            self.run_with_backend(wait)
+
+    def test_screenshot_decoded_off_loop(self):
+        threads = list()
+
+        def decode(*args):
+            threads.append(threading.get_ident())
+            return decode_frame(*args)
+
+        async def wait(backend):
+            await backend.right_click()
+            await backend.wait_for_screen_change(1)
+
+        with patch("ragger.backend.async_speculos.decode_frame", side_effect=decode):
+            self.run_with_backend(wait)
+        self.assertGreater(len(threads), 1)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_startup_timings(self):
+
+        async def timings(backend):
+            return backend.startup_timings
+
+        timings = self.run_with_backend(timings)
+        self.assertIsNotNone(timings)
+        self.assertAlmostEqual(timings.total,
+                               timings.spawn + timings.api + timings.text + timings.frame)
+        self.assertGreater(timings.frame, 0)
+
+    def test_startup_timeout(self):
+        self.speculos.screens = [("", "black")]
+
+        async def start(backend):
+            pass
+
+        with self.assertRaises(TimeoutError):
+            self.run_with_backend(start, startup_timeout=0.05)
+
+    def test_wait_for_screen_change_settles(self):
+
+        async def navigate(backend):
+            await backend.right_click()
+            await backend.wait_for_screen_change(1)
+            return backend.settle_stats
+
+        stats = self.run_with_backend(navigate, settle_frames=4, settle_interval=0.001)
+        self.assertEqual(stats.count, 1)
+        self.assertEqual(stats.timeouts, 0)
+
+    def test_get_current_screen_content_filters_blank_text(self):
+
+        async def content(backend):
+            return await backend.get_current_screen_content()
+
+        self.assertEqual(self.run_with_backend(content),
+                         {"events": [{
+                             "text": "Home",
+                             "x": 0,
+                             "y": 0
+                         }]})
+
+    def test_compare_screen_with_snapshot(self):
+        with TemporaryDirectory() as tmp_dir:
+            golden = Path(tmp_dir) / "golden.png"
+            golden.write_bytes(png("black"))
+            tmp = Path(tmp_dir) / "tmp.png"
+
+            async def compare(backend):
+                return await backend.compare_screen_with_snapshot(golden, tmp_snap_path=tmp)
+
+            self.assertTrue(self.run_with_backend(compare))
+            self.assertTrue(tmp.exists())
+
+    def test_several_backends_one_loop(self):
+        others = [
+            FakeSpeculos([("Home", "black"), ("Review", "white")]),
+            FakeSpeculos([("Home", "black"), ("Review", "white")])
+        ]
+
+        async def drive(speculos):
+            backend = NoProcessBackend("some app",
+                                       firmware=self.firmware,
+                                       transport=httpx.MockTransport(speculos.handler))
+            async with backend:
+                await backend.right_click()
+                await backend.wait_for_screen_change(1)
+                return await backend.exchange(0xE0, 0x01)
+
+        async def main():
+            return await asyncio.gather(*(drive(speculos) for speculos in others))
+
+        self.assertEqual([rapdu.status for rapdu in asyncio.run(main())], [0x9000, 0x9000])
+        self.assertEqual([speculos.index for speculos in others], [1, 1])
+
+
+class TestAsyncNanoNavigator(TestCase):
+
+    def test_navigate_until_text(self):
+        speculos = FakeSpeculos([("Home", "black"), ("Review", "white"), ("Amount", "blue"),
+                                 ("Approve", "red")])
+
+        async def main():
+            backend = NoProcessBackend("some app",
+                                       firmware=Firmware("nanos", "2.1"),
+                                       transport=httpx.MockTransport(speculos.handler))
+            async with backend:
+                navigator = AsyncNanoNavigator(backend, backend.firmware)
+                await navigator.navigate([NavInsID.RIGHT_CLICK],
+                                         timeout=1,
+                                         screen_change_before_first_instruction=False)
+                await navigator.navigate_until_text(NavInsID.RIGHT_CLICK, [NavInsID.BOTH_CLICK],
+                                                    "Approve",
+                                                    timeout=2,
+                                                    screen_change_before_first_instruction=False,
+                                                    screen_change_after_last_instruction=False)
+
+        asyncio.run(main())
+        self.assertEqual(speculos.index, 3)
+
+    def test_navigate_unknown_instruction(self):
+        speculos = FakeSpeculos([("Home", "black")])
+
+        async def main():
+            backend = NoProcessBackend("some app",
+                                       firmware=Firmware("nanos", "2.1"),
+                                       transport=httpx.MockTransport(speculos.handler))
+            async with backend:
+                navigator = AsyncNanoNavigator(backend, backend.firmware)
+                await navigator.navigate([NavInsID.TOUCH],
+                                         screen_change_before_first_instruction=False)
+
+        with self.assertRaises(NotImplementedError):
+            asyncio.run(main())
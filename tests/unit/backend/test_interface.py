@@ -2,12 +2,14 @@ import struct
 import tempfile
 from pathlib import Path
 from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from ragger.error import ExceptionRAPDU
 from ragger.backend import BackendInterface
 from ragger.backend import RaisePolicy
 from ragger.firmware.structs import _Firmware
+from ragger.utils import RAPDU
+from ragger.utils.apdu_trace import ApduTraceRecorder, read_trace
 
 
 class DummyBackend(BackendInterface):
@@ -103,6 +105,66 @@ class TestBackendInterface(TestCase):
         self.assertTrue(self.backend.mock.exchange_async_raw.called)
         self.assertEqual(self.backend.mock.exchange_async_raw.call_args, ((expected, ), ))
 
+    def test_exchange_many(self):
+        apdus = [bytes.fromhex("0102030400"), bytes.fromhex("0102030401ff")]
+        self.backend.mock.exchange_raw.return_value = RAPDU(0x9000, b"")
+        result = self.backend.exchange_many(apdus)
+        self.assertEqual(result, [RAPDU(0x9000, b"")] * 2)
+        self.assertEqual(self.backend.mock.exchange_raw.call_args_list,
+                         [((apdu, ), ) for apdu in apdus])
+
+    def test_exchange_many_stop_on_error(self):
+        apdus = [bytes.fromhex("0102030400")] * 3
+        self.backend.mock.exchange_raw.return_value = RAPDU(0x6a80, b"")
+        self.backend.mock.exchange_raw.side_effect = [RAPDU(0x9000, b""), RAPDU(0x6a80, b"")]
+        result = self.backend.exchange_many(apdus)
+        self.assertEqual(result, [RAPDU(0x9000, b""), RAPDU(0x6a80, b"")])
+        self.assertEqual(self.backend.mock.exchange_raw.call_count, 2)
+
+        self.backend.mock.exchange_raw.side_effect = None
+        result = self.backend.exchange_many(apdus, stop_on_error=False)
+        self.assertEqual(len(result), 3)
+
+    def test_exchange_chunked(self):
+        cla, ins = 1, 2
+        self.backend.mock.exchange_raw.return_value = RAPDU(0x9000, b"")
+        result = self.backend.exchange_chunked(cla, ins, bytes(5), chunk_size=2, p1=0, p1_next=0x80)
+        self.assertEqual(len(result), 3)
+        self.assertEqual(self.backend.mock.exchange_raw.call_args_list, [
+            ((struct.pack(">BBBBB", cla, ins, 0, 0, 2) + bytes(2), ), ),
+            ((struct.pack(">BBBBB", cla, ins, 0x80, 0, 2) + bytes(2), ), ),
+            ((struct.pack(">BBBBB", cla, ins, 0x80, 0, 1) + bytes(1), ), ),
+        ])
+
+    def test_exchange_chunked_empty(self):
+        self.backend.mock.exchange_raw.return_value = RAPDU(0x9000, b"")
+        self.assertEqual(len(self.backend.exchange_chunked(1, 2, b"")), 1)
+
+    def test_press_sequence(self):
+        self.backend.press_sequence(["right", "right", "both", "left"])
+        self.assertEqual([name for name, _, _ in self.backend.mock.method_calls],
+                         ["right_click", "right_click", "both_click", "left_click"])
+
+    def test_press_sequence_invalid_button(self):
+        with self.assertRaises(ValueError):
+            self.backend.press_sequence(["right", "up"])
+        self.assertEqual(self.backend.mock.method_calls, [])
+
+    def test_touch_sequence(self):
+        self.backend.touch_sequence([(1, 2), (3, 4)], delay=0.1)
+        self.assertEqual(self.backend.mock.finger_touch.call_args_list, [((1, 2, 0.1), ),
+                                                                         ((3, 4, 0.1), )])
+
+    def test_sequences_interval(self):
+        with patch("ragger.backend.interface.sleep") as sleep:
+            self.backend.press_sequence(["right", "left", "right"], interval=0.2)
+            self.assertEqual(sleep.call_count, 2)
+            for call in sleep.call_args_list:
+                self.assertLessEqual(call.args[0], 0.2)
+            sleep.reset_mock()
+            self.backend.touch_sequence([(1, 2), (3, 4)])
+            sleep.assert_not_called()
+
 
 class TestBackendInterfaceLogging(TestCase):
 
@@ -117,3 +179,36 @@ class TestBackendInterfaceLogging(TestCase):
             with open(test_file, mode='r') as fp:
                 read_lines = [l.strip() for l in fp.readlines()]
                 self.assertEqual(read_lines, ref_lines)
+
+    def test_log_apdu_disabled_no_formatting(self):
+        backend = DummyBackend(firmware=_Firmware("nanos", "2.0.1", "other"))
+        data = MagicMock()
+        backend.apdu_logger.disabled = True
+        try:
+            backend._log_apdu_command(data)
+        finally:
+            backend.apdu_logger.disabled = False
+        data.hex.assert_not_called()
+
+    def test_apdu_text_log_off(self):
+        backend = DummyBackend(firmware=_Firmware("nanos", "2.0.1", "other"))
+        data = MagicMock()
+        rapdu = RAPDU(0x9000, MagicMock())
+        backend.apdu_text_log = False
+        with patch.object(backend.apdu_logger, "log") as log:
+            backend._log_apdu_command(data)
+            backend._log_apdu_response(rapdu)
+        log.assert_not_called()
+        data.hex.assert_not_called()
+        rapdu.data.hex.assert_not_called()
+
+    def test_apdu_trace(self):
+        backend = DummyBackend(firmware=_Firmware("nanos", "2.0.1", "other"))
+        with tempfile.TemporaryDirectory() as td:
+            trace_file = Path(td) / "apdu.trace"
+            with ApduTraceRecorder(trace_file) as recorder:
+                backend.apdu_trace = recorder
+                backend._log_apdu_command(bytes.fromhex("e0010000"))
+                backend._log_apdu_response(RAPDU(0x6985, b"\x01"))
+            records = list(read_trace(trace_file))
+        self.assertEqual([r.to_text() for r in records], ["=> e0010000", "<= 016985"])
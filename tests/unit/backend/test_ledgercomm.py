@@ -101,6 +101,15 @@ class TestLedgerCommbackend(TestCase):
         self.assertTrue(self.hid().exchange.called)
         self.check_rapdu(rapdu, payload=payload)
 
+    def test_apdus_logged_at_debug_level(self):
+        with patch("ledgercomm.transport.HID") as mock:
+            self.hid = mock
+            self.hid().exchange.return_value = (0x9000, b"\x01")
+            with self.backend:
+                with self.assertLogs(self.backend.apdu_logger, level="DEBUG") as logs:
+                    self.backend.exchange_raw(b"\x02")
+        self.assertEqual([record.levelname for record in logs.records], ["DEBUG", "DEBUG"])
+
     def test_exchange_raw_raises(self):
         failure, payload = 0x8000, b"something"
         with patch("ledgercomm.transport.HID") as mock:
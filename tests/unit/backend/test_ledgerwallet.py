@@ -44,6 +44,15 @@ class TestLedgerWalletBackend(TestCase):
                 rapdu = self.backend.receive()
         self.check_rapdu(rapdu, payload=payload)
 
+    def test_apdus_logged_at_debug_level(self):
+        self.device.exchange.return_value = bytes.fromhex("019000")
+        with patch("ledgerwallet.client.enumerate_devices") as devices:
+            devices.return_value = [self.device]
+            with self.backend:
+                with self.assertLogs(self.backend.apdu_logger, level="DEBUG") as logs:
+                    self.backend.exchange_raw(b"\x02")
+        self.assertEqual([record.levelname for record in logs.records], ["DEBUG", "DEBUG"])
+
     def test_receive_ok_raises(self):
         status, payload = 0x9000, b"something"
         self.device.read.return_value = payload + bytes.fromhex(f"{status:x}")
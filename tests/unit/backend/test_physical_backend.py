@@ -1,4 +1,5 @@
 from contextlib import contextmanager
+from pathlib import Path
 from typing import Generator
 from unittest import TestCase
 from unittest.mock import MagicMock
@@ -137,6 +138,29 @@ class TestPhysicalBackend(TestCase):
         self.assertTrue(oracle.called)
         self.assertEqual(oracle.call_args, ((text, ), ))
 
+    def test_compare_screen_with_text_with_gui_ocr_cache(self):
+        cache = MagicMock()
+        cache.contains.return_value = True
+        backend = StubPhysicalBackend(self.firmware, with_gui=True, ocr_cache=cache)
+        backend._ui.start = MagicMock()
+        backend._last_valid_snap_path = "some/path"
+        self.assertTrue(backend.compare_screen_with_text("text"))
+        # Nano snapshots are inverted before recognition
+        self.assertEqual(cache.contains.call_args, (("some/path", "text", True), ))
+
+    def test_prepare_golden_snapshots(self):
+        cache = MagicMock()
+        backend = StubPhysicalBackend(self.firmware, with_gui=True, ocr_cache=cache)
+        directory = Path("tests/snapshots/nanos/generic")
+        backend.prepare_golden_snapshots(directory)
+        paths, invert = cache.prewarm.call_args[0]
+        self.assertEqual(paths, sorted(directory.glob("*.png")))
+        self.assertTrue(invert)
+        # Without the GUI, texts are never recognized
+        cache.reset_mock()
+        StubPhysicalBackend(self.firmware, ocr_cache=cache).prepare_golden_snapshots(directory)
+        cache.prewarm.assert_not_called()
+
     def test_wait_for_screen_change(self):
         self.assertIsNone(self.backend.wait_for_screen_change())
 
@@ -0,0 +1,125 @@
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from PIL import Image
+
+from ragger.backend import RaisePolicy, ReplayBackend
+from ragger.backend.replay import ReplayError
+from ragger.error import ExceptionRAPDU
+from ragger.firmware import Firmware
+from ragger.utils.golden_set import GoldenSet
+from ragger.utils.screenshot import GoldenCache
+from ragger.utils.session_trace import Session, SessionRecorder
+
+
+def png(color) -> bytes:
+    screenshot = BytesIO()
+    Image.new("RGB", (4, 4), color).save(screenshot, format="PNG")
+    return screenshot.getvalue()
+
+
+def content(*texts):
+    return lambda: {
+        "events": [{
+            "text": text,
+            "x": 0,
+            "y": 10 * idx
+        } for idx, text in enumerate(texts)]
+    }
+
+
+class TestReplayBackend(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        with SessionRecorder(self.path / "session") as recorder:
+            recorder.record_screen(png("black"), content("Home"))
+            recorder.record_command(bytes.fromhex("e0020000"))
+            recorder.record_input("right_click")
+            recorder.record_screen(png("white"), content("Review", "transaction"))
+            recorder.record_screen(png("red"), content("Amount"))
+            recorder.record_input("both_click")
+            recorder.record_screen(png("blue"), content("Signed"))
+            recorder.record_response(0x9000, b"\x30\x45")
+            recorder.record_command(bytes.fromhex("e0030000"))
+            recorder.record_response(0x6985, b"")
+        self.backend = ReplayBackend(Firmware("nanos", "2.1"),
+                                     self.path / "session",
+                                     golden_cache=GoldenCache())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def golden(self, name, color) -> Path:
+        path = self.path / name
+        path.write_bytes(png(color))
+        return path
+
+    def test_replay(self):
+        black, white, red = self.golden("black.png", "black"), self.golden("white.png",
+                                                                           "white"), self.golden(
+                                                                               "red.png", "red")
+        self.assertTrue(self.backend.compare_screen_with_text("Home"))
+        with self.backend.exchange_async_raw(bytes.fromhex("e0020000")):
+            self.backend.right_click()
+            self.assertTrue(self.backend.compare_screen_with_snapshot(black))
+            self.backend.wait_for_screen_change()
+            self.assertTrue(self.backend.compare_screen_with_snapshot(white))
+            self.assertTrue(self.backend.get_screen_text().has("transaction"))
+            self.backend.wait_for_screen_change()
+            self.assertTrue(self.backend.compare_screen_with_snapshot(red))
+            with self.assertRaises(TimeoutError):
+                self.backend.wait_for_screen_change()
+            self.backend.both_click()
+        self.assertEqual(self.backend.last_async_response.data, b"\x30\x45")
+        self.assertTrue(self.backend.compare_screen_with_text("Signed"))
+        with self.assertRaises(ExceptionRAPDU):
+            self.backend.exchange_raw(bytes.fromhex("e0030000"))
+        self.assertEqual(self.backend.remaining, 0)
+
+    def test_compare_moves_to_matching_screen(self):
+        red = self.golden("red.png", "red")
+        self.backend.send_raw(bytes.fromhex("e0020000"))
+        self.backend.right_click()
+        # Not waited for, but displayed before the next action
+        self.assertTrue(
+            self.backend.compare_screen_with_snapshot(red, tmp_snap_path=self.path / "tmp.png"))
+        self.assertEqual((self.path / "tmp.png").read_bytes(), png("red"))
+        self.assertFalse(
+            self.backend.compare_screen_with_snapshot(self.golden("white.png", "white")))
+        self.backend.both_click()
+        self.assertEqual(self.backend.receive().data, b"\x30\x45")
+
+    def test_match_screen_with_snapshots(self):
+        goldens = GoldenSet({"home": self.golden("black.png", "black")}, cache=GoldenCache())
+        self.assertEqual(self.backend.match_screen_with_snapshots(goldens), "home")
+
+    def test_divergence_raises(self):
+        with self.assertRaises(ReplayError):
+            self.backend.exchange_raw(bytes.fromhex("e0ff0000"))
+        self.backend.rewind()
+        self.backend.send_raw(bytes.fromhex("e0020000"))
+        with self.assertRaises(ReplayError):
+            self.backend.left_click()
+
+    def test_raise_policy(self):
+        self.backend.raise_policy = RaisePolicy.RAISE_NOTHING
+        self.backend.send_raw(bytes.fromhex("e0020000"))
+        self.backend.right_click()
+        self.backend.both_click()
+        self.backend.receive()
+        self.assertEqual(self.backend.exchange_raw(bytes.fromhex("e0030000")).status, 0x6985)
+        with self.assertRaises(ReplayError):
+            self.backend.receive()
+
+    def test_session_object(self):
+        backend = ReplayBackend(Firmware("nanos", "2.1"), Session.load(self.path / "session"))
+        self.assertEqual(backend.get_current_screen_content(),
+                         {"events": [{
+                             "text": "Home",
+                             "x": 0,
+                             "y": 0
+                         }]})
@@ -1,7 +1,22 @@
+from io import BytesIO
+from pathlib import Path
+from queue import Queue
+from tempfile import TemporaryDirectory
+from time import monotonic
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
 
-from ragger.backend import SpeculosBackend
+from PIL import Image
+from speculos.client import ClientException
+
+from ragger.backend import RaisePolicy, ReplayBackend, SpeculosBackend
+from ragger.backend.speculos import EndpointLatency, _ScreenEventsWatcher
 from ragger.firmware import Firmware
+from ragger.utils.golden_set import GoldenSet
+from ragger.utils.image_diff import ImageComparator
+from ragger.utils.screenshot import GoldenCache
+from ragger.utils.session_trace import INPUT, SCREEN, Session, SessionRecorder
+from ragger.utils.snapshot_store import SNAPSHOT_STORES
 
 
 class TestSpeculosBackend(TestCase):
@@ -18,3 +33,573 @@ class TestSpeculosBackend(TestCase):
     def test___init__args_nok(self):
         with self.assertRaises(AssertionError):
             SpeculosBackend("some app", firmware=self.firmware, args="not a list")
+
+
+class FakeStreamClient:
+
+    def __init__(self, events):
+        self.stream = object()
+        self._events = Queue()
+        for event in events:
+            self._events.put(event)
+
+    def push(self, event):
+        self._events.put(event)
+
+    def get_next_event(self):
+        event = self._events.get(timeout=2)
+        if event is None:
+            raise ClientException("stream closed")
+        return event
+
+
+class TestScreenEventsWatcher(TestCase):
+
+    def test_no_stream_unavailable(self):
+        client = FakeStreamClient([])
+        client.stream = None
+        watcher = _ScreenEventsWatcher(client)
+        watcher.start()
+        self.assertFalse(watcher.available)
+
+    def test_events_increment_sequence(self):
+        client = FakeStreamClient([{"text": "a"}, {"text": "b"}])
+        watcher = _ScreenEventsWatcher(client)
+        watcher.start()
+        self.assertTrue(watcher.available)
+        self.assertTrue(watcher.wait_for_event(1, 1.0))
+        self.assertEqual(watcher.sequence, 2)
+        self.assertFalse(watcher.wait_for_event(2, 0.05))
+        client.push(None)
+        watcher.stop()
+        self.assertFalse(watcher.available)
+
+    def test_wait_for_quiet(self):
+        client = FakeStreamClient([{"text": "a"}])
+        watcher = _ScreenEventsWatcher(client)
+        watcher.start()
+        self.assertTrue(watcher.wait_for_event(0, 1.0))
+        start = monotonic()
+        watcher.wait_for_quiet(0.05, 1.0)
+        self.assertLess(monotonic() - start, 0.5)
+        client.push(None)
+        watcher.stop()
+
+
+class TestSpeculosBackendScreenEvents(TestCase):
+
+    def setUp(self):
+        self.backend = SpeculosBackend("some app",
+                                       firmware=Firmware('nanos', '2.1'),
+                                       events_settle_window=0.01)
+        self.client = FakeStreamClient([{"text": "a"}])
+        self.backend._events_watcher = _ScreenEventsWatcher(self.client)
+        self.backend._events_watcher.start()
+
+    def tearDown(self):
+        self.client.push(None)
+        self.backend._events_watcher.stop()
+
+    def test_wait_for_screen_events(self):
+        self.assertTrue(self.backend.wait_for_screen_events(0, 1.0))
+        self.assertEqual(self.backend.screen_events_sequence, 1)
+        self.assertFalse(self.backend.wait_for_screen_events(1, 0.05))
+        self.client.push({"text": "b"})
+        self.assertTrue(self.backend.wait_for_screen_events(1, 1.0))
+        self.assertEqual(self.backend.screen_events_sequence, 2)
+
+
+class TestSpeculosBackendWarmReset(TestCase):
+
+    def setUp(self):
+        self.backend = SpeculosBackend("some app", firmware=Firmware('nanos', '2.1'))
+        self.backend._client = MagicMock()
+        self.backend._client.get_screenshot.return_value = b"screenshot"
+        self.backend.raise_policy = RaisePolicy.RAISE_NOTHING
+        self.backend._pending = MagicMock()
+
+    def test_warm_reset_home_screen(self):
+        self.backend.wait_for_home_screen = MagicMock()
+        self.backend.__exit__ = MagicMock()
+        self.assertTrue(self.backend.warm_reset())
+        self.assertEqual(self.backend.raise_policy, RaisePolicy.RAISE_ALL_BUT_0x9000)
+        self.assertIsNone(self.backend._pending)
+        self.assertFalse(self.backend.__exit__.called)
+
+    def test_warm_reset_restarts(self):
+        self.backend.wait_for_home_screen = MagicMock(side_effect=TimeoutError)
+        self.backend.__exit__ = MagicMock()
+        self.backend.__enter__ = MagicMock()
+        self.assertFalse(self.backend.warm_reset(0.1))
+        self.assertEqual(self.backend.__exit__.call_count, 1)
+        self.assertEqual(self.backend.__enter__.call_count, 1)
+
+
+class TestSpeculosBackendStartup(TestCase):
+
+    def setUp(self):
+        self.backend = SpeculosBackend("some app",
+                                       firmware=Firmware('nanos', '2.1'),
+                                       use_events_stream=False,
+                                       startup_timeout=1.0,
+                                       startup_backoff_initial=0.001)
+        self.backend._client = MagicMock()
+        screenshot = BytesIO()
+        Image.new("RGB", (4, 4)).save(screenshot, format="PNG")
+        self.backend._client.get_screenshot.return_value = screenshot.getvalue()
+        self.backend._client.app, self.backend._client.args = "some app", ["--model", "nanos"]
+        self.popen = patch("ragger.backend.speculos.subprocess.Popen").start()
+        self.process = self.popen.return_value
+        self.process.poll.return_value = None
+        self.connect = patch("ragger.backend.speculos.socket.create_connection").start()
+        self.addCleanup(patch.stopall)
+
+    def stream_response(self, status_code=200):
+        lines = Queue()
+        for line in (b'data: {"text": "a"}\n', b"\n"):
+            lines.put(line)
+        response = MagicMock(status_code=status_code)
+        response.raw.readline.side_effect = lambda: lines.get(timeout=2)
+        # Closing the stream ends the watcher thread
+        response.close.side_effect = lambda: lines.put(b"closed\n")
+        return response
+
+    def test___enter__opens_events_stream(self):
+        backend = SpeculosBackend("some app",
+                                  firmware=Firmware('nanos', '2.1'),
+                                  startup_timeout=1.0,
+                                  startup_backoff_initial=0.001)
+        client = backend._client
+        self.assertIsNone(client.stream)
+        failed, stream = self.stream_response(500), self.stream_response()
+        with patch.object(client.session, "get", side_effect=[failed, stream]) as get, \
+                patch.object(client, "get_current_screen_content",
+                             return_value={"events": [{"text": "a"}]}), \
+                patch.object(client, "get_screenshot",
+                             return_value=self.backend._client.get_screenshot.return_value):
+            with backend:
+                self.assertIs(client.stream, stream)
+                self.assertTrue(backend.events_stream_available)
+                self.assertTrue(backend._events_watcher.wait_for_event(0, 1))
+            self.assertIsNone(client.stream)
+        self.assertEqual(get.call_count, 2)
+        self.assertTrue(get.call_args[0][0].endswith("/events?stream=true"))
+        self.assertTrue(failed.close.called)
+        self.assertFalse(backend.events_stream_available)
+
+    def test___enter__failure_stops(self):
+        self.backend._client.get_current_screen_content.return_value = {"events": []}
+        self.backend._client.get_next_event.side_effect = ClientException("stream closed")
+        self.backend._use_events_stream = True
+        with self.assertRaises(TimeoutError):
+            self.backend.__enter__()
+        self.assertEqual(self.backend._client.stop.call_count, 1)
+        self.assertIsNone(self.backend._events_watcher)
+
+    def test___enter__spawn(self):
+        self.backend._client.get_current_screen_content.return_value = {"events": [{"text": "a"}]}
+        self.connect.side_effect = [ConnectionRefusedError, ConnectionRefusedError, MagicMock()]
+        self.backend.__enter__()
+        self.assertIs(self.backend._client.process, self.process)
+        self.assertEqual(self.popen.call_args[0][0][-4:],
+                         ["speculos", "--model", "nanos", "some app"])
+        self.assertEqual(self.connect.call_count, 3)
+        self.assertEqual(self.connect.call_args[0][0], ("127.0.0.1", 5000))
+
+    def test___enter__spawn_timeout(self):
+        self.connect.side_effect = ConnectionRefusedError
+        with self.assertRaises(TimeoutError):
+            self.backend.__enter__()
+        self.assertEqual(self.backend._client.stop.call_count, 1)
+        self.assertFalse(self.backend._client.get_current_screen_content.called)
+
+    def test___enter__spawn_exited(self):
+        self.connect.side_effect = ConnectionRefusedError
+        self.process.poll.return_value = 1
+        with self.assertRaises(RuntimeError):
+            self.backend.__enter__()
+        self.assertEqual(self.connect.call_count, 0)
+        self.assertEqual(self.backend._client.stop.call_count, 1)
+
+    def test___enter__timings(self):
+        self.backend._client.get_current_screen_content.side_effect = [
+            ClientException("not up yet"), {
+                "events": []
+            }, {
+                "events": [{
+                    "text": "ready"
+                }]
+            }
+        ]
+        self.assertIsNone(self.backend.startup_timings)
+        self.backend.__enter__()
+        timings = self.backend.startup_timings
+        self.assertIsNotNone(timings)
+        self.assertEqual(self.backend._client.get_current_screen_content.call_count, 3)
+        self.assertAlmostEqual(timings.total,
+                               timings.spawn + timings.api + timings.text + timings.frame)
+        self.assertLess(timings.total, 1.0)
+
+    def test___exit__closes_session_recorder(self):
+        self.backend._client.get_current_screen_content.return_value = {"events": [{"text": "a"}]}
+        with TemporaryDirectory() as directory:
+            recorder = SessionRecorder(directory)
+            self.backend.session_recorder = recorder
+            self.backend.__enter__()
+            self.backend.__exit__(None, None, None)
+            self.assertTrue(recorder._file.closed)
+            # Restarted backends (warm reset) keep on recording the same session
+            self.backend.__enter__()
+            self.backend.right_click()
+            self.backend.__exit__(None, None, None)
+            self.assertTrue(recorder._file.closed)
+            records = Session.load(directory).records
+        self.assertEqual([record.kind for record in records], [SCREEN, INPUT])
+
+    def test___enter__timeout(self):
+        self.backend._client.get_current_screen_content.return_value = {"events": []}
+        with self.assertRaises(TimeoutError):
+            self.backend.__enter__()
+
+
+def png(color) -> bytes:
+    screenshot = BytesIO()
+    Image.new("RGB", (4, 4), color).save(screenshot, format="PNG")
+    return screenshot.getvalue()
+
+
+class TestSpeculosBackendSettle(TestCase):
+
+    def setUp(self):
+        self.backend = SpeculosBackend("some app",
+                                       firmware=Firmware('nanos', '2.1'),
+                                       use_events_stream=False,
+                                       settle_frames=3,
+                                       settle_interval=0.001,
+                                       settle_timeout=0.5)
+        self.backend._client = MagicMock()
+        self.backend._last_screenshot = BytesIO(png("black"))
+
+    def test_wait_for_screen_change_stable(self):
+        # Change detected on the 2nd screenshot, then the screen is still being
+        # drawn for one more frame
+        frames = [png("black"), png("white"), png("red"), png("red"), png("red")]
+        self.backend._client.get_screenshot.side_effect = frames
+        start = monotonic()
+        self.backend.wait_for_screen_change(1.0)
+        self.assertLess(monotonic() - start, 0.2)
+        self.assertEqual(self.backend._last_screenshot.getvalue(), png("red"))
+        self.assertEqual(self.backend._client.get_screenshot.call_count, 5)
+        stats = self.backend.settle_stats
+        self.assertEqual(stats.count, 1)
+        self.assertEqual(stats.timeouts, 0)
+        self.assertLessEqual(stats.maximum, stats.total)
+
+    def test_wait_for_screen_change_never_stable(self):
+        self.backend._settle_timeout = 0.05
+        colors = iter(range(1, 100000))
+        self.backend._client.get_screenshot.side_effect = lambda: png((next(colors) % 256, 0, 0))
+        self.backend.wait_for_screen_change(1.0)
+        stats = self.backend.settle_stats
+        self.assertEqual(stats.timeouts, 1)
+        self.assertGreaterEqual(stats.total, 0.05)
+        self.backend.reset_settle_stats()
+        self.assertEqual(self.backend.settle_stats.count, 0)
+
+    def test_wait_for_screen_change_timeout(self):
+        self.backend._client.get_screenshot.return_value = png("black")
+        with self.assertRaises(TimeoutError):
+            self.backend.wait_for_screen_change(0.05)
+        self.assertEqual(self.backend.settle_stats.count, 0)
+
+    def test_sync_screen(self):
+        self.backend._client.get_screenshot.return_value = png("white")
+        self.backend.sync_screen()
+        self.assertEqual(self.backend._last_screenshot.getvalue(), png("white"))
+
+    def test_screen_events_not_available(self):
+        self.assertIsNone(self.backend.screen_events_sequence)
+        self.assertFalse(self.backend.wait_for_screen_events(0, 0.01))
+
+    def test_settle_frames_nok(self):
+        with self.assertRaises(AssertionError):
+            SpeculosBackend("some app", firmware=Firmware('nanos', '2.1'), settle_frames=1)
+
+
+class TestSpeculosBackendScreenText(TestCase):
+
+    def setUp(self):
+        self.backend = SpeculosBackend("some app", firmware=Firmware('nanos', '2.1'))
+        self.backend._client = MagicMock()
+        self.backend._client.get_current_screen_content.return_value = {
+            "events": [{
+                "text": "Review",
+                "x": 10,
+                "y": 3
+            }, {
+                "text": " ",
+                "x": 0,
+                "y": 464
+            }, {
+                "text": "transaction",
+                "x": 10,
+                "y": 17
+            }]
+        }
+
+    def test_compare_screen_with_text(self):
+        self.assertTrue(self.backend.compare_screen_with_text("Review"))
+        self.assertTrue(self.backend.compare_screen_with_text('"x": 10'))
+        self.assertFalse(self.backend.compare_screen_with_text("Approve"))
+        self.assertEqual(self.backend.get_current_screen_content(), {
+            "events": [{
+                "text": "Review",
+                "x": 10,
+                "y": 3
+            }, {
+                "text": "transaction",
+                "x": 10,
+                "y": 17
+            }]
+        })
+
+    def test_get_screen_text_no_events_stream(self):
+        screen_text = self.backend.get_screen_text()
+        self.assertEqual(screen_text.texts, ["Review", "transaction"])
+        # Content fetched again, but not indexed again if unchanged
+        self.assertIs(self.backend.get_screen_text(), screen_text)
+        self.assertEqual(self.backend._client.get_current_screen_content.call_count, 2)
+
+    def test_get_screen_text_cached_until_event(self):
+        self.backend._events_watcher = MagicMock(available=True, sequence=1)
+        self.backend.get_screen_text()
+        self.assertFalse(self.backend.compare_screen_with_text("Approve"))
+        self.assertEqual(self.backend._client.get_current_screen_content.call_count, 1)
+        self.backend._events_watcher.sequence = 2
+        self.backend.get_screen_text()
+        self.assertEqual(self.backend._client.get_current_screen_content.call_count, 2)
+        # Inputs may clear the screen texts without any event
+        self.backend.right_click()
+        self.backend.get_screen_text()
+        self.assertEqual(self.backend._client.get_current_screen_content.call_count, 3)
+
+
+class TestSpeculosBackendInputSequences(TestCase):
+
+    def setUp(self):
+        self.backend = SpeculosBackend("some app", firmware=Firmware('nanos', '2.1'))
+        self.backend._client = MagicMock(api_url="http://api")
+        self.post = self.backend._client.session.post
+        self.post.return_value.__enter__.return_value.status_code = 200
+
+    def test_press_sequence(self):
+        self.backend.press_sequence(["right", "right", "both"], delay=0.05)
+        self.assertEqual(
+            [c[0][0] for c in self.post.call_args_list],
+            ["http://api/button/right", "http://api/button/right", "http://api/button/both"])
+        self.assertEqual(self.post.call_args[1]["json"], {
+            "action": "press-and-release",
+            "delay": 0.05
+        })
+        self.backend._client.press_and_release.assert_not_called()
+
+    def test_press_sequence_invalid_button(self):
+        with self.assertRaises(ValueError):
+            self.backend.press_sequence(["right", "up"])
+        self.post.assert_not_called()
+
+    def test_touch_sequence_interval(self):
+        with patch("ragger.backend.interface.sleep") as sleep:
+            self.backend.touch_sequence([(1, 2), (3, 4), (5, 6)], delay=0.1, interval=0.05)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(self.post.call_count, 3)
+        self.assertEqual(self.post.call_args[1]["json"]["delay"], 0.1)
+
+    def test_touch_sequence(self):
+        payloads = []
+        self.post.side_effect = lambda url, json: payloads.append(dict(json)
+                                                                  ) or self.post.return_value
+        self.backend.touch_sequence([(1, 2), (3, 4)])
+        self.assertEqual(payloads, [{
+            "action": "press-and-release",
+            "delay": 0.5,
+            "x": 1,
+            "y": 2
+        }, {
+            "action": "press-and-release",
+            "delay": 0.5,
+            "x": 3,
+            "y": 4
+        }])
+
+    def test_touch_sequence_error(self):
+        self.post.return_value.__enter__.return_value.status_code = 500
+        with self.assertRaises(ClientException):
+            self.backend.touch_sequence([(1, 2)])
+
+    def test_sequences_recorded(self):
+        with TemporaryDirectory() as directory:
+            backend = SpeculosBackend("some app",
+                                      firmware=Firmware('nanos', '2.1'),
+                                      record_session=Path(directory))
+            backend._client = self.backend._client
+            backend.press_sequence(["left", "right"])
+            backend.touch_sequence([(1, 2)])
+            backend.session_recorder.close()
+            records = Session.load(directory).records
+        self.assertEqual([(record.action, record.args) for record in records],
+                         [("left_click", ()), ("right_click", ()), ("finger_touch", (1, 2))])
+
+
+class TestEndpointLatency(TestCase):
+
+    def test_add(self):
+        latency = EndpointLatency()
+        self.assertEqual(latency.mean, 0.0)
+        latency.add(0.3)
+        latency.add(0.1)
+        self.assertEqual(latency.count, 2)
+        self.assertAlmostEqual(latency.mean, 0.2)
+        self.assertEqual(latency.minimum, 0.1)
+        self.assertEqual(latency.maximum, 0.3)
+
+
+class TestSpeculosBackendSnapshotStore(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.root = Path(self.directory.name) / "nanos"
+        self.store = SNAPSHOT_STORES.open(self.root)
+        self.backend = SpeculosBackend("some app", firmware=Firmware('nanos', '2.1'))
+        self.backend._client = MagicMock()
+
+    def tearDown(self):
+        SNAPSHOT_STORES.clear()
+        self.directory.cleanup()
+
+    def test_compare_screen_with_snapshot_golden_run(self):
+        golden = self.root / "test" / "00000.png"
+        self.backend._client.get_screenshot.return_value = png("red")
+        self.assertTrue(self.backend.compare_screen_with_snapshot(golden, golden_run=True))
+        self.assertFalse(golden.exists())
+        self.assertIsNotNone(self.store.digest(golden))
+        self.assertTrue(self.backend.compare_screen_with_snapshot(golden))
+        self.backend._client.get_screenshot.return_value = png("black")
+        self.assertFalse(self.backend.compare_screen_with_snapshot(golden))
+
+
+class TestSpeculosBackendLazyTmpSnapshots(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.golden = self.path / "golden.png"
+        self.golden.write_bytes(png("red"))
+        self.backend = SpeculosBackend("some app",
+                                       firmware=Firmware('nanos', '2.1'),
+                                       lazy_tmp_snapshots=True)
+        self.backend._client = MagicMock()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_compare_screen_with_snapshot_lazy(self):
+        tmp = self.path / "tmp.png"
+        self.backend._client.get_screenshot.return_value = png("red")
+        self.assertTrue(self.backend.compare_screen_with_snapshot(self.golden, tmp_snap_path=tmp))
+        self.assertFalse(tmp.exists())
+        self.assertEqual(self.backend.discard_tmp_snapshots(), 1)
+
+        self.assertTrue(self.backend.compare_screen_with_snapshot(self.golden, tmp_snap_path=tmp))
+        self.assertEqual(self.backend.flush_tmp_snapshots(), 1)
+        self.assertEqual(tmp.read_bytes(), png("red"))
+        tmp.unlink()
+
+        self.backend._client.get_screenshot.return_value = png("black")
+        self.assertFalse(self.backend.compare_screen_with_snapshot(self.golden, tmp_snap_path=tmp))
+        self.assertEqual(tmp.read_bytes(), png("black"))
+
+    def test_compare_screen_with_snapshot_lazy_missing_golden(self):
+        tmp = self.path / "tmp.png"
+        self.backend._client.get_screenshot.return_value = png("red")
+        with self.assertRaises(FileNotFoundError):
+            self.backend.compare_screen_with_snapshot(self.path / "missing.png", tmp_snap_path=tmp)
+        self.assertEqual(tmp.read_bytes(), png("red"))
+
+
+class TestSpeculosBackendImageComparator(TestCase):
+
+    def test_compare_screen_with_snapshot_comparator(self):
+        with TemporaryDirectory() as directory:
+            golden = Path(directory) / "golden.png"
+            golden.write_bytes(png((100, 100, 100)))
+            backend = SpeculosBackend("some app", firmware=Firmware('nanos', '2.1'))
+            backend._client = MagicMock()
+            backend._client.get_screenshot.return_value = png((102, 100, 100))
+            self.assertFalse(backend.compare_screen_with_snapshot(golden))
+            backend.image_comparator = ImageComparator(tolerance=2)
+            self.assertTrue(backend.compare_screen_with_snapshot(golden))
+
+    def test_match_screen_with_snapshots(self):
+        with TemporaryDirectory() as directory:
+            paths = dict()
+            for key, color in (("first", (1, 2, 3)), ("second", (100, 100, 100))):
+                paths[key] = Path(directory) / f"{key}.png"
+                paths[key].write_bytes(png(color))
+            goldens = GoldenSet(paths, cache=GoldenCache())
+            backend = SpeculosBackend("some app", firmware=Firmware('nanos', '2.1'))
+            backend._client = MagicMock()
+            backend._client.get_screenshot.return_value = png((101, 100, 100))
+            self.assertIsNone(backend.match_screen_with_snapshots(goldens))
+            backend.image_comparator = ImageComparator(tolerance=1)
+            self.assertEqual(backend.match_screen_with_snapshots(goldens), "second")
+            backend._client.get_screenshot.return_value = png((1, 2, 3))
+            self.assertEqual(backend.match_screen_with_snapshots(goldens), "first")
+            self.assertEqual(backend._client.get_screenshot.call_count, 3)
+
+    def test_capture_screenshot(self):
+        with TemporaryDirectory() as directory:
+            backend = SpeculosBackend("some app",
+                                      firmware=Firmware('nanos', '2.1'),
+                                      record_session=Path(directory))
+            backend._client = MagicMock()
+            backend._client.get_screenshot.return_value = png((1, 2, 3))
+            backend._client.get_current_screen_content.return_value = {"events": []}
+            self.assertEqual(backend.capture_screenshot(), png((1, 2, 3)))
+            backend.session_recorder.close()
+            self.assertEqual(len(Session.load(directory).records), 1)
+
+
+class TestSpeculosBackendRecordSession(TestCase):
+
+    def test_record_then_replay(self):
+        with TemporaryDirectory() as directory:
+            session = Path(directory) / "session"
+            golden = Path(directory) / "golden.png"
+            golden.write_bytes(png("white"))
+            backend = SpeculosBackend("some app",
+                                      firmware=Firmware('nanos', '2.1'),
+                                      record_session=session)
+            backend._client = MagicMock()
+            backend._client._apdu_exchange.return_value = b"\x01"
+            backend._client.get_current_screen_content.return_value = {
+                "events": [{
+                    "text": "Review",
+                    "x": 0,
+                    "y": 0
+                }]
+            }
+            backend._client.get_screenshot.side_effect = [png("black"), png("white")]
+            self.assertFalse(backend.compare_screen_with_snapshot(golden))
+            self.assertEqual(backend.exchange_raw(bytes.fromhex("e0010000")).data, b"\x01")
+            backend.right_click()
+            self.assertTrue(backend.compare_screen_with_snapshot(golden))
+            backend.session_recorder.close()
+
+            replay = ReplayBackend(Firmware('nanos', '2.1'), session, golden_cache=GoldenCache())
+            self.assertFalse(replay.compare_screen_with_snapshot(golden))
+            self.assertEqual(replay.exchange_raw(bytes.fromhex("e0010000")).data, b"\x01")
+            replay.right_click()
+            self.assertTrue(replay.compare_screen_with_snapshot(golden))
+            self.assertTrue(replay.compare_screen_with_text("Review"))
+            self.assertEqual(replay.remaining, 0)
@@ -9,3 +9,6 @@ class TestStubBackend(TestCase):
     def test_can_instantiate(self):
         stub = StubBackend(None)
         self.assertIsInstance(stub, BackendInterface)
+
+    def test_warm_reset(self):
+        self.assertTrue(StubBackend(None).warm_reset())
@@ -66,17 +66,26 @@ class TestFullScreen(TestCase):
         self.assertEqual(self.backend.finger_touch.call_count, 0)
         for (layout, word, positions) in layouts_word_positions:
 
+            # the whole word is written with a single touch sequence
             layout.write(word)
-            argument_list = [((*positions[letter], ), ) for letter in word]
-            call_number = len(word)
-            self.assertEqual(self.backend.finger_touch.call_count, call_number)
-            self.assertEqual(self.backend.finger_touch.call_args_list, argument_list)
+            self.assertEqual(self.backend.touch_sequence.call_count, 1)
+            self.assertEqual(self.backend.touch_sequence.call_args,
+                             (([(*positions[letter], ) for letter in word], ), {
+                                 "delay": 0.5
+                             }))
+            self.assertEqual(self.backend.finger_touch.call_count, 0)
 
             layout.back()
-            self.assertEqual(self.backend.finger_touch.call_count, call_number + 1)
+            self.assertEqual(self.backend.finger_touch.call_count, 1)
             self.assertEqual(self.backend.finger_touch.call_args, ((*positions["back"], ), ))
 
             self.backend.finger_touch.reset_mock()
+            self.backend.touch_sequence.reset_mock()
+
+            # keys can be held shorter
+            layout.write(word, delay=0.1)
+            self.assertEqual(self.backend.touch_sequence.call_args[1], {"delay": 0.1})
+            self.backend.touch_sequence.reset_mock()
 
     def test_keyboards_change_layout(self):
         layouts_positions = [
@@ -1,11 +1,23 @@
+from io import BytesIO
 from pathlib import Path
+from shutil import rmtree
 from tempfile import TemporaryDirectory
+from time import time
 from unittest import TestCase
 from unittest.mock import MagicMock
 
+from PIL import Image
+
 from ragger.backend import SpeculosBackend
 from ragger.firmware import Firmware
-from ragger.navigator import Navigator, NavIns, NavInsID
+from ragger.navigator import Navigator, NanoNavigator, NavIns, NavInsID, StaxNavigator
+from ragger.navigator.plan import NO_WAIT, PROGRESS, SCREEN_CHANGE, NavigationPlan, PlanAction, \
+    PlanCache, PlanStep
+from ragger.navigator.snapshot_dirs import SnapshotDirManager
+from ragger.utils.compare_pool import ComparePool, SnapshotMismatchError
+from ragger.utils.profiler import NavigationProfiler
+from ragger.utils.screen_text import ScreenText
+from ragger.utils.snapshot_bundle import SNAPSHOT_BUNDLES, pack_snapshots
 
 
 class TestNavigator(TestCase):
@@ -61,6 +73,23 @@ class TestNavigator(TestCase):
             self.navigator._check_snaps_dir_path(self.pathdir, name, True)
         self.assertFalse(expected.exists())
 
+    def test__checks_snaps_dir_path_ok_bundle(self):
+        name = "some_name"
+        golden = self.pathdir / "snapshots" / self.firmware.device / name
+        golden.mkdir(parents=True)
+        (golden / "00000.png").write_bytes(b"not important")
+        pack_snapshots(golden.parent)
+        rmtree(golden.parent)
+        try:
+            result = self.navigator._check_snaps_dir_path(self.pathdir, name, True)
+            self.assertEqual(result, golden)
+            self.assertFalse(golden.exists())
+            bundle, image = SNAPSHOT_BUNDLES.lookup(golden / "00000.png")
+            self.assertEqual(image, f"{name}/00000.png")
+            self.assertEqual(bundle.read(image), b"not important")
+        finally:
+            SNAPSHOT_BUNDLES.clear()
+
     def test___init_snaps_temp_dir_ok_creates_dir(self):
         name = "some_name"
         expected = self.pathdir / "snapshots-tmp" / self.firmware.device / name
@@ -87,6 +116,41 @@ class TestNavigator(TestCase):
             for filename in existing_files[start_idx:]:
                 self.assertFalse((expected / filename).exists())
 
+    def test___init_snaps_temp_dir_invalidates_backend_tmp_snapshots(self):
+        name = "some_name"
+        expected = self.pathdir / "snapshots-tmp" / self.firmware.device / name
+        self.navigator._init_snaps_temp_dir(self.pathdir, name, 2)
+        self.backend.invalidate_tmp_snapshots.assert_called_once_with(expected, 2)
+
+    def test___init_snaps_temp_dir_with_manager(self):
+        name = "some_name"
+        self.navigator.snapshot_dirs = SnapshotDirManager()
+        expected = self.pathdir / "snapshots-tmp" / self.firmware.device / name
+        expected.mkdir(parents=True)
+        for filename in ["00000.png", "00001.png", "00002.png"]:
+            (expected / filename).touch()
+        self.assertEqual(self.navigator._init_snaps_temp_dir(self.pathdir, name, 1), expected)
+        self.assertEqual(sorted(f.name for f in expected.iterdir()), ["00000.png"])
+
+        # Written snapshots are tracked, the directory is not scanned again
+        tmp = self.navigator._get_tmp_snap_path(expected, 3)
+        tmp.touch()
+        self.navigator._init_snaps_temp_dir(self.pathdir, name, 0)
+        self.assertEqual(list(expected.iterdir()), [])
+        self.assertEqual(self.navigator.snapshot_dirs.scans, 1)
+
+    def test__checks_snaps_dir_path_with_manager(self):
+        name = "some_name"
+        self.navigator.snapshot_dirs = SnapshotDirManager()
+        expected = self.pathdir / "snapshots" / self.firmware.device / name
+        expected.mkdir(parents=True)
+        self.assertEqual(self.navigator._check_snaps_dir_path(self.pathdir, name, True), expected)
+        # Already checked
+        expected.rmdir()
+        self.assertEqual(self.navigator._check_snaps_dir_path(self.pathdir, name, True), expected)
+        with self.assertRaises(ValueError):
+            self.navigator._check_snaps_dir_path(self.pathdir, "other_name", True)
+
     def test__get_snap_path(self):
         path = Path("not important")
         testset = {1: "00001", 11: "00011", 111: "00111", 1111: "01111", 11111: "11111"}
@@ -109,6 +173,33 @@ class TestNavigator(TestCase):
         self.assertFalse(self.navigator._compare_snap_with_timeout("not important", 0))
         self.assertEqual(self.navigator._backend.compare_screen_with_snapshot.call_count, 1)
 
+    def test__compare_snap_with_timeout_waits_for_screen_change(self):
+        self.backend.compare_screen_with_snapshot.side_effect = [False, False, True]
+        self.assertTrue(self.navigator._compare_snap_with_timeout("not important", 10))
+        # The screen is compared again after each screen change only
+        self.assertEqual(self.backend.wait_for_screen_change.call_count, 2)
+        stats = self.navigator.snap_wait_stats
+        self.assertEqual((stats.count, stats.comparisons, stats.last, stats.timeouts), (1, 3, 3, 0))
+
+    def test__compare_snap_with_timeout_nok_screen_does_not_change(self):
+        self.backend.compare_screen_with_snapshot.return_value = False
+        self.backend.wait_for_screen_change.side_effect = TimeoutError
+        self.assertFalse(self.navigator._compare_snap_with_timeout("not important", 10))
+        self.assertEqual(self.backend.compare_screen_with_snapshot.call_count, 1)
+        self.backend.wait_for_screen_change.assert_called_once()
+        stats = self.navigator.snap_wait_stats
+        self.assertEqual((stats.count, stats.comparisons, stats.timeouts), (1, 1, 1))
+
+    def test_snap_wait_stats(self):
+        self.backend.compare_screen_with_snapshot.side_effect = [True, False, True]
+        self.navigator._compare_snap_with_timeout("not important", 10)
+        self.navigator._compare_snap_with_timeout("not important", 10)
+        stats = self.navigator.snap_wait_stats
+        self.assertEqual((stats.count, stats.comparisons, stats.maximum, stats.last), (2, 3, 2, 2))
+        self.assertEqual(stats.mean, 1.5)
+        self.navigator.reset_snap_wait_stats()
+        self.assertEqual(self.navigator.snap_wait_stats.count, 0)
+
     def test_compare_snap_ok(self):
         self.navigator._backend.compare_screen_with_snapshot.return_value = True
         self.assertIsNone(self.navigator._compare_snap(self.pathdir, self.pathdir, 1))
@@ -133,6 +224,19 @@ class TestNavigator(TestCase):
             self.assertEqual(cb.call_count, 1)
             self.assertEqual(cb.call_args, (ni.args, ni.kwargs))
 
+    def test_navigate_profiled(self):
+        profiler = NavigationProfiler()
+        self.navigator.profiler = profiler
+        self.assertIs(self.backend.profiler, profiler)
+        self.navigator._callbacks = {NavInsID.WAIT: MagicMock(), NavInsID.RIGHT_CLICK: MagicMock()}
+        with profiler.test("some_test"):
+            self.navigator.navigate([NavInsID.RIGHT_CLICK, NavInsID.RIGHT_CLICK])
+        per_instruction = profiler.per_instruction()
+        self.assertEqual(per_instruction["RIGHT_CLICK"]["callback"].count, 2)
+        self.assertEqual(per_instruction["RIGHT_CLICK"]["settle"].count, 2)
+        self.assertEqual(per_instruction["WAIT"]["settle"].count, 1)
+        self.assertEqual(list(profiler.per_test()), ["some_test"])
+
     def test_navigate_and_compare_ok(self):
         cb_wait, cb1, cb2 = MagicMock(), MagicMock(), MagicMock()
         ni1, ni2 = NavIns(1, (1, ), {'1': 1}), NavIns(2, (2, ), {'2': 2})
@@ -219,3 +323,345 @@ class TestNavigator(TestCase):
 
         with self.assertRaises(TimeoutError):
             self.navigator.navigate_until_text_and_compare(ni, [], "not important", timeout=0)
+
+    def test_match_snap(self):
+        golden = self.pathdir / "snapshots" / self.firmware.device / "test"
+        golden.mkdir(parents=True)
+        for name in ("00000.png", "00001.png"):
+            Image.new("RGB", (4, 4), (int(name[-5]), 0, 0)).save(golden / name)
+        self.backend.match_screen_with_snapshots.side_effect = [None, "warning"]
+
+        key = self.navigator.match_snap(self.pathdir,
+                                        Path("test"), {
+                                            "review": "00000.png",
+                                            "warning": "00001.png"
+                                        },
+                                        timeout=10)
+        self.assertEqual(key, "warning")
+        self.assertEqual(self.backend.match_screen_with_snapshots.call_count, 2)
+        goldens = self.backend.match_screen_with_snapshots.call_args[0][0]
+        self.assertEqual(goldens.keys(), ["review", "warning"])
+
+    def test_match_snap_no_match(self):
+        golden = self.pathdir / "snapshots" / self.firmware.device / "test"
+        golden.mkdir(parents=True)
+        Image.new("RGB", (4, 4)).save(golden / "00000.png")
+        self.backend.match_screen_with_snapshots.return_value = None
+        self.assertIsNone(self.navigator.match_snap(self.pathdir, Path("test"), {0: "00000.png"}))
+        self.backend.match_screen_with_snapshots.assert_called_once()
+
+
+class TestNavigatorPlan(TestCase):
+
+    def setUp(self):
+        self.backend = MagicMock()
+        self.navigator = NanoNavigator(self.backend, Firmware("nanos", "2.1"))
+        self.navigator.plan_cache = PlanCache()
+
+    def test_compile_resolves_instructions(self):
+        plan = self.navigator.compile([NavInsID.RIGHT_CLICK, NavInsID.BOTH_CLICK],
+                                      screen_change_after_last_instruction=False)
+        self.assertTrue(plan.is_resolved)
+        self.assertEqual([step.actions for step in plan.steps], [(PlanAction("sleep", (0, )), ),
+                                                                 (PlanAction("right_click"), ),
+                                                                 (PlanAction("both_click"), )])
+        self.assertEqual([step.wait for step in plan.steps],
+                         [SCREEN_CHANGE, SCREEN_CHANGE, NO_WAIT])
+        self.assertEqual([step.snap_idx for step in plan.steps], [0, 1, None])
+        # Nothing performed while compiling
+        self.assertEqual(self.backend.method_calls, [])
+
+    def test_compile_waiting_instruction(self):
+        plan = self.navigator.compile([NavIns(NavInsID.WAIT_FOR_TEXT_ON_SCREEN, ("text", 2))])
+        self.assertEqual(plan.steps[1].actions, (PlanAction("wait_for_text_on_screen",
+                                                            ("text", 2)), ))
+        self.assertEqual(plan.steps[1].wait, NO_WAIT)
+
+    def test_compile_custom_callback(self):
+        callback = MagicMock()
+        self.navigator.add_callback(NavInsID.RIGHT_CLICK, callback)
+        plan = self.navigator.compile([NavIns(NavInsID.RIGHT_CLICK, (1, ))])
+        self.assertIsNone(plan.steps[1].actions)
+        self.navigator.execute_plan(plan)
+        callback.assert_called_once_with(1)
+        self.backend.right_click.assert_not_called()
+
+    def test_compile_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            self.navigator.compile([NavInsID.TOUCH])
+
+    def test_compile_cached(self):
+        plan = self.navigator.compile([NavInsID.RIGHT_CLICK])
+        self.assertIs(self.navigator.compile([NavIns(NavInsID.RIGHT_CLICK)]), plan)
+        self.assertIsNot(self.navigator.compile([NavInsID.LEFT_CLICK]), plan)
+        # Shared by the navigators of a same device
+        navigator = NanoNavigator(MagicMock(), Firmware("nanos", "2.1"))
+        navigator.plan_cache = self.navigator.plan_cache
+        self.assertIs(navigator.compile([NavInsID.RIGHT_CLICK]), plan)
+        # Not once the callback is replaced
+        navigator.add_callback(NavInsID.RIGHT_CLICK, MagicMock())
+        self.assertIsNot(navigator.compile([NavInsID.RIGHT_CLICK]), plan)
+
+    def test_repeated_clicks(self):
+        plan = self.navigator.compile([NavIns(NavInsID.RIGHT_CLICK, (3, ))])
+        self.assertEqual(plan.steps[1].actions, (PlanAction("press_sequence", (["right"] * 3, )), ))
+        self.navigator.execute_plan(plan)
+        self.backend.press_sequence.assert_called_once_with(["right"] * 3)
+        self.backend.right_click.assert_not_called()
+        # The screen is only waited for after the last click
+        self.assertEqual(self.backend.wait_for_screen_change.call_count, 2)
+
+    def test_execute_plan_batches_inputs(self):
+        plan = NavigationPlan([
+            PlanStep(NavInsID.RIGHT_CLICK, (PlanAction("right_click"), PlanAction("right_click")),
+                     NO_WAIT),
+            PlanStep(
+                NavInsID.TOUCH,
+                (PlanAction("finger_touch",
+                            (1, 2)), PlanAction("finger_touch",
+                                                (3, 4)), PlanAction("finger_touch",
+                                                                    (5, 6, 0.1))), NO_WAIT)
+        ])
+        self.navigator.execute_plan(plan)
+        self.backend.press_sequence.assert_called_once_with(["right", "right"])
+        self.backend.right_click.assert_not_called()
+        self.backend.touch_sequence.assert_called_once_with([(1, 2), (3, 4)])
+        # Touches with a specific delay are not batched
+        self.assertEqual(self.backend.finger_touch.call_args_list, [((5, 6, 0.1), )])
+
+    def test_execute_plan(self):
+        plan = self.navigator.compile([NavInsID.RIGHT_CLICK, NavInsID.RIGHT_CLICK])
+        self.navigator.execute_plan(NavigationPlan.from_json(plan.to_json()))
+        self.assertEqual(self.backend.right_click.call_count, 2)
+        self.assertEqual(self.backend.wait_for_screen_change.call_count, 3)
+
+    def test_navigate_and_compare_uses_plan(self):
+        self.navigator._compare_snap = MagicMock()
+        self.navigator._init_snaps_temp_dir = MagicMock()
+        self.navigator._check_snaps_dir_path = MagicMock()
+        self.navigator.navigate_and_compare(Path("path"), Path("test"),
+                                            [NavInsID.LEFT_CLICK, NavInsID.RIGHT_CLICK])
+        self.assertEqual(len(self.navigator.plan_cache), 1)
+        self.assertEqual([name for name, _, _ in self.backend.method_calls].count("left_click"), 1)
+        self.assertEqual([c[0][2] for c in self.navigator._compare_snap.call_args_list], [0, 1, 2])
+
+    def test_compile_stax_layouts(self):
+        backend = MagicMock()
+        navigator = StaxNavigator(backend, Firmware("stax", "1.0"))
+        navigator.plan_cache = PlanCache()
+        plan = navigator.compile(
+            [NavIns(NavInsID.KB_LETTER_ONLY_WRITE, ("ab", )), NavInsID.USE_CASE_REVIEW_CONFIRM])
+        self.assertTrue(plan.is_resolved)
+        self.assertEqual([action.name for action in plan.steps[1].actions], ["touch_sequence"])
+        self.assertEqual(plan.steps[2].wait, PROGRESS)
+        backend.finger_touch.assert_not_called()
+
+        backend.compare_screen_with_snapshot.return_value = False
+        navigator.execute_plan(plan)
+        self.assertEqual([c[0] for c in backend.finger_touch.call_args_list], [
+            action.args for step in plan.steps
+            for action in step.actions or () if action.name == "finger_touch"
+        ])
+        # The progress bar backup is not saved as a (possibly deferred) tmp snapshot
+        backup = backend.compare_screen_with_snapshot.call_args_list[0]
+        self.assertEqual(backup.kwargs, {"golden_run": True})
+
+
+class FakeScreensBackend:
+    """
+    Displays a list of screens, one more after each right click. The screen
+    events of the clicks are only emitted once waited for.
+    """
+
+    def __init__(self, texts, late=0):
+        self.mock = MagicMock()
+        # None stands for a screen without text (image only)
+        self.screens = [ScreenText([{"text": text}] if text is not None else []) for text in texts]
+        self.displayed = 0
+        self.pending = 0
+        self.sequence = 0
+        # Number of screen events waits the device is late for
+        self.late = late
+
+    def _process(self):
+        while self.pending:
+            self.pending -= 1
+            self.displayed = min(self.displayed + 1, len(self.screens) - 1)
+            self.sequence += 1
+
+    @property
+    def screen_events_sequence(self):
+        return self.sequence
+
+    def right_click(self):
+        self.pending += 1
+
+    def wait_for_screen_events(self, after, timeout=10.0):
+        self.mock.wait_for_screen_events(after, timeout)
+        if self.late:
+            self.late -= 1
+            return False
+        self._process()
+        return self.sequence > after
+
+    def wait_for_screen_change(self, timeout=10.0):
+        self.mock.wait_for_screen_change(timeout)
+
+    def sync_screen(self):
+        self.mock.sync_screen()
+        self._process()
+
+    def get_screen_text(self):
+        return self.screens[self.displayed]
+
+    def compare_screen_with_text(self, text):
+        return text in self.get_screen_text()
+
+
+class TestNavigatorFastForward(TestCase):
+
+    def navigator(self, backend):
+        return Navigator(backend, Firmware("nanos", "2.1"), {
+            NavInsID.WAIT: MagicMock(),
+            NavInsID.RIGHT_CLICK: backend.right_click
+        })
+
+    def test_fast_forward(self):
+        backend = FakeScreensBackend(["a", "b", "c", "Approve"])
+        navigator = self.navigator(backend)
+        navigator.navigate_until_text(NavInsID.RIGHT_CLICK, [], "Approve", fast_forward=True)
+        self.assertEqual(backend.displayed, 3)
+        self.assertEqual(navigator.fast_forward_stats.inputs, 3)
+        self.assertEqual(navigator.fast_forward_stats.resyncs, 0)
+        # Only the initial wait, and the final resynchronization
+        self.assertEqual(backend.mock.wait_for_screen_change.call_count, 1)
+        self.assertEqual(backend.mock.sync_screen.call_count, 1)
+        navigator.reset_fast_forward_stats()
+        self.assertEqual(navigator.fast_forward_stats.inputs, 0)
+
+    def test_fast_forward_device_late(self):
+        backend = FakeScreensBackend(["a", "b", "Approve"], late=1)
+        navigator = self.navigator(backend)
+        navigator.navigate_until_text(NavInsID.RIGHT_CLICK, [], "Approve", fast_forward=True)
+        # No more input sent than needed
+        self.assertEqual(backend.displayed, 2)
+        self.assertEqual(navigator.fast_forward_stats.inputs, 2)
+        self.assertEqual(navigator.fast_forward_stats.resyncs, 1)
+
+    def test_fast_forward_identical_screens(self):
+        backend = FakeScreensBackend(["a", "a", None, None, "Approve"])
+        navigator = self.navigator(backend)
+        navigator.navigate_until_text(NavInsID.RIGHT_CLICK, [], "Approve", fast_forward=True)
+        self.assertEqual(backend.displayed, 4)
+        self.assertEqual(navigator.fast_forward_stats.inputs, 4)
+        self.assertEqual(navigator.fast_forward_stats.resyncs, 0)
+
+    def test_fast_forward_resync_bounded_per_input(self):
+        backend = FakeScreensBackend(["a", "Approve"], late=2)
+        navigator = self.navigator(backend)
+        with self.assertRaises(TimeoutError):
+            navigator.navigate_until_text(NavInsID.RIGHT_CLICK, [], "Approve", fast_forward=True)
+        # The resynchronization did not wait for the whole navigation timeout
+        timeouts = [c.args[1] for c in backend.mock.wait_for_screen_events.call_args_list]
+        self.assertEqual(len(timeouts), 2)
+        self.assertLessEqual(timeouts[0], navigator.FAST_FORWARD_STEP_TIMEOUT)
+        self.assertLessEqual(timeouts[1], navigator.FAST_FORWARD_RESYNC_TIMEOUT)
+
+    def test_fast_forward_screen_events_lost(self):
+        backend = MagicMock(screen_events_sequence=None)
+        backend.compare_screen_with_text.side_effect = [False, False, True]
+        navigator = self.navigator(backend)
+        self.assertEqual(
+            navigator._fast_forward_until_text(NavInsID.RIGHT_CLICK, "Approve",
+                                               time() + 10), 2)
+        # Screen change waits instead of screen events waits
+        self.assertEqual(backend.wait_for_screen_change.call_count, 2)
+        backend.wait_for_screen_events.assert_not_called()
+
+    def test_fast_forward_text_not_found(self):
+        backend = FakeScreensBackend(["a", "b"])
+        navigator = self.navigator(backend)
+        with self.assertRaises(TimeoutError):
+            navigator.navigate_until_text(NavInsID.RIGHT_CLICK, [],
+                                          "Approve",
+                                          timeout=1,
+                                          fast_forward=True)
+
+    def test_fast_forward_without_screen_events(self):
+        backend = MagicMock(screen_events_sequence=None)
+        backend.compare_screen_with_text.side_effect = [False, True]
+        navigator = self.navigator(backend)
+        navigator.navigate_until_text(NavInsID.RIGHT_CLICK, [], "Approve", fast_forward=True)
+        # Default mode
+        self.assertEqual(backend.wait_for_screen_change.call_count, 2)
+        backend.sync_screen.assert_not_called()
+
+    def test_fast_forward_with_snapshots(self):
+        backend = FakeScreensBackend(["a"])
+        with self.assertRaises(ValueError):
+            self.navigator(backend).navigate_until_text_and_compare(NavInsID.RIGHT_CLICK, [],
+                                                                    "Approve",
+                                                                    Path("path"),
+                                                                    Path("test"),
+                                                                    fast_forward=True)
+
+
+def png(color) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (8, 4), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestNavigatorComparePool(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = ComparePool(workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.backend = MagicMock()
+        self.backend.image_comparator = None
+        self.navigator = NanoNavigator(self.backend, Firmware("nanos", "2.1"))
+        self.navigator.plan_cache = PlanCache()
+        self.navigator.compare_pool = self.pool
+        self.goldens = self.path / "snapshots" / "nanos" / "test"
+        self.goldens.mkdir(parents=True)
+        for index, color in enumerate([(0, 0, 0), (1, 1, 1), (2, 2, 2)]):
+            (self.goldens / f"{str(index).zfill(5)}.png").write_bytes(png(color))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def navigate(self, *colors):
+        self.backend.capture_screenshot.side_effect = [png(color) for color in colors]
+        self.navigator.navigate_and_compare(self.path, Path("test"),
+                                            [NavInsID.RIGHT_CLICK, NavInsID.RIGHT_CLICK])
+
+    def test_navigate_and_compare(self):
+        self.navigate((0, 0, 0), (1, 1, 1), (2, 2, 2))
+        self.assertEqual(self.backend.capture_screenshot.call_count, 3)
+        self.assertEqual(self.backend.right_click.call_count, 2)
+        self.backend.compare_screen_with_snapshot.assert_not_called()
+        tmp = self.path / "snapshots-tmp" / "nanos" / "test"
+        self.assertEqual(sorted(path.name for path in tmp.iterdir()),
+                         ["00000.png", "00001.png", "00002.png"])
+
+    def test_navigate_and_compare_reports_all_mismatches(self):
+        with self.assertRaises(SnapshotMismatchError) as error:
+            self.navigate((9, 9, 9), (1, 1, 1), (9, 9, 9))
+        self.assertEqual(error.exception.indexes, [0, 2])
+        # The navigation went on after the first mismatch
+        self.assertEqual(self.backend.right_click.call_count, 2)
+
+    def test_golden_run_not_pipelined(self):
+        navigator = NanoNavigator(self.backend, Firmware("nanos", "2.1"), golden_run=True)
+        navigator.compare_pool = self.pool
+        navigator.navigate_and_compare(self.path, Path("test"), [NavInsID.RIGHT_CLICK])
+        self.backend.capture_screenshot.assert_not_called()
+        self.assertEqual(self.backend.compare_screen_with_snapshot.call_count, 2)
@@ -0,0 +1,101 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ragger.navigator import NavInsID
+from ragger.navigator.plan import NO_WAIT, SCREEN_CHANGE, ActionTracer, NavigationPlan, PlanAction, \
+    PlanCache, PlanStep
+
+
+class TestPlanStep(TestCase):
+
+    def test_input_batches(self):
+        step = PlanStep(NavInsID.KB_LETTER_ONLY_WRITE,
+                        (PlanAction("finger_touch", (1, 2)), PlanAction("finger_touch", (3, 4)),
+                         PlanAction("wait_for_screen_change",
+                                    (1, )), PlanAction("right_click"), PlanAction("right_click")))
+        self.assertEqual([(name, len(actions)) for name, actions in step.input_batches()],
+                         [("finger_touch", 2), ("wait_for_screen_change", 1), ("right_click", 2)])
+
+    def test_input_batches_specific_delay(self):
+        step = PlanStep(
+            NavInsID.TOUCH,
+            (PlanAction("finger_touch",
+                        (1, 2)), PlanAction("finger_touch",
+                                            (3, 4, 0.1)), PlanAction("finger_touch", (5, 6))))
+        self.assertEqual([len(actions) for _, actions in step.input_batches()], [1, 1, 1])
+
+    def test_input_batches_not_resolved(self):
+        self.assertEqual(PlanStep(NavInsID.RIGHT_CLICK, None).input_batches(), [])
+
+
+class TestNavigationPlan(TestCase):
+
+    def setUp(self):
+        self.plan = NavigationPlan([
+            PlanStep(NavInsID.WAIT, (PlanAction("sleep", (0, )), ), SCREEN_CHANGE, 0, (0, )),
+            PlanStep(NavInsID.TOUCH, (PlanAction("finger_touch", (200, 300)), ), SCREEN_CHANGE, 1,
+                     (200, 300)),
+            PlanStep(NavInsID.RIGHT_CLICK, None, NO_WAIT, None, (), {"some": "arg"})
+        ])
+
+    def test_is_resolved(self):
+        self.assertFalse(self.plan.is_resolved)
+        self.assertTrue(NavigationPlan(self.plan.steps[:2]).is_resolved)
+
+    def test_json(self):
+        self.assertEqual(NavigationPlan.from_json(self.plan.to_json()), self.plan)
+
+    def test_json_unsupported_version(self):
+        plan = self.plan.to_json()
+        plan["version"] = 0
+        with self.assertRaises(ValueError):
+            NavigationPlan.from_json(plan)
+
+    def test_json_unserializable(self):
+        plan = NavigationPlan([PlanStep(NavInsID.RIGHT_CLICK, None, args=(object(), ))])
+        with self.assertRaises(TypeError):
+            plan.to_json()
+
+    def test_dump_load(self):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "plan.json"
+            self.plan.dump(path)
+            self.assertEqual(NavigationPlan.load(path), self.plan)
+
+
+class TestActionTracer(TestCase):
+
+    def test_trace(self):
+        tracer = ActionTracer()
+
+        def callback(x, y):
+            tracer.finger_touch(x, y)
+            tracer.wait_for_screen_change(timeout=2)
+
+        self.assertEqual(
+            tracer.trace(callback, 1, 2),
+            (PlanAction("finger_touch",
+                        (1, 2)), PlanAction("wait_for_screen_change", (), {"timeout": 2})))
+        self.assertEqual(tracer.trace(tracer.right_click), (PlanAction("right_click"), ))
+
+    def test_trace_untraceable(self):
+        with self.assertRaises(AttributeError):
+            ActionTracer().exchange
+
+
+class TestPlanCache(TestCase):
+
+    def test_lru(self):
+        cache = PlanCache(max_entries=2)
+        plans = [NavigationPlan([]) for _ in range(3)]
+        cache.put(0, plans[0])
+        cache.put(1, plans[1])
+        self.assertIs(cache.get(0), plans[0])
+        cache.put(2, plans[2])
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(1))
+        self.assertIs(cache.get(0), plans[0])
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,48 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ragger.navigator.snapshot_dirs import SnapshotDirManager
+
+
+class TestSnapshotDirManager(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name) / "snapshots-tmp" / "nanos" / "test"
+        self.manager = SnapshotDirManager()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_init_tmp_dir_creates_dir(self):
+        self.manager.init_tmp_dir(self.path)
+        self.assertTrue(self.path.is_dir())
+        self.assertEqual(self.manager.scans, 1)
+
+    def test_init_tmp_dir_scans_once(self):
+        self.path.mkdir(parents=True)
+        for name in ["00000.png", "00001.png", "12.png", "notes.txt", "golden.png"]:
+            (self.path / name).touch()
+        self.manager.init_tmp_dir(self.path, 1)
+        self.assertEqual(sorted(f.name for f in self.path.iterdir()),
+                         ["00000.png", "golden.png", "notes.txt"])
+        self.manager.record(self.path / "00001.png")
+        (self.path / "00001.png").touch()
+        # Recorded but never written
+        self.manager.record(self.path / "00002.png")
+        self.manager.init_tmp_dir(self.path)
+        self.assertEqual(sorted(f.name for f in self.path.iterdir()), ["golden.png", "notes.txt"])
+        self.assertEqual(self.manager.scans, 1)
+
+    def test_record_unknown_dir_ignored(self):
+        self.manager.record(self.path / "00000.png")
+        self.manager.init_tmp_dir(self.path)
+        self.assertEqual(self.manager.scans, 1)
+
+    def test_checked(self):
+        self.assertFalse(self.manager.is_checked(self.path))
+        self.manager.set_checked(self.path)
+        self.assertTrue(self.manager.is_checked(self.path))
+        self.manager.clear()
+        self.assertFalse(self.manager.is_checked(self.path))
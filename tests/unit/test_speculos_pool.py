@@ -0,0 +1,67 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from ragger.conftest.speculos_pool import SpeculosPool
+from ragger.firmware import Firmware
+
+
+class TestSpeculosPool(TestCase):
+
+    def setUp(self):
+        self.ports = list()
+
+        def factory(firmware, port, apdu_port):
+            self.ports.append((port, apdu_port))
+            backend = MagicMock()
+            backend.firmware = firmware
+            backend.__enter__.return_value = backend
+            return backend
+
+        self.factory = factory
+        self.firmware = Firmware("nanos", "2.1")
+
+    def test_acquire_dynamic_ports(self):
+        pool = SpeculosPool(self.factory)
+        first = pool.acquire(self.firmware)
+        second = pool.acquire(self.firmware)
+        self.assertIsNot(first, second)
+        self.assertEqual(first.__enter__.call_count, 1)
+        self.assertEqual(len(self.ports), 2)
+        for ports in self.ports:
+            self.assertNotEqual(ports[0], ports[1])
+
+    def test_release_no_reuse_stops(self):
+        pool = SpeculosPool(self.factory)
+        self.assertFalse(pool.reuse)
+        backend = pool.acquire(self.firmware)
+        pool.release(backend)
+        self.assertEqual(backend.__exit__.call_count, 1)
+        self.assertIsNot(pool.acquire(self.firmware), backend)
+
+    def test_release_reuse_keeps_running(self):
+        pool = SpeculosPool(self.factory, warm_reset=True)
+        backend = pool.acquire(self.firmware)
+        pool.release(backend)
+        self.assertEqual(backend.__exit__.call_count, 0)
+        self.assertIs(pool.acquire(self.firmware), backend)
+        self.assertEqual(len(self.ports), 1)
+        other = pool.acquire(Firmware("nanox", "2.0.2"))
+        self.assertIsNot(other, backend)
+
+    def test_close_stops_everything(self):
+        pool = SpeculosPool(self.factory, warm_reset=True)
+        idle = pool.acquire(self.firmware)
+        busy = pool.acquire(self.firmware)
+        pool.release(idle)
+        pool.close()
+        self.assertEqual(idle.__exit__.call_count, 1)
+        self.assertEqual(busy.__exit__.call_count, 1)
+
+    def test_warm_reset_on_reuse(self):
+        pool = SpeculosPool(self.factory, warm_reset=True, warm_reset_timeout=1.0)
+        self.assertTrue(pool.reuse)
+        backend = pool.acquire(self.firmware)
+        self.assertFalse(backend.warm_reset.called)
+        pool.release(backend)
+        self.assertIs(pool.acquire(self.firmware), backend)
+        self.assertEqual(backend.warm_reset.call_args, ((1.0, ), ))
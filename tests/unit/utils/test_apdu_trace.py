@@ -0,0 +1,83 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import sleep
+from unittest import TestCase
+
+from ragger.utils import RAPDU
+from ragger.utils.apdu_trace import ApduTraceRecorder, Direction, convert_trace_to_text, \
+    read_trace
+
+
+class TestApduTraceRecorder(TestCase):
+
+    def setUp(self):
+        self.dir = TemporaryDirectory()
+        self.path = Path(self.dir.name) / "apdu.trace"
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_records(self):
+        with ApduTraceRecorder(self.path) as recorder:
+            recorder.record_command(bytes.fromhex("e0010000"))
+            sleep(0.01)
+            recorder.record_response(RAPDU(0x9000, bytes.fromhex("0102")))
+        command, response = list(read_trace(self.path))
+        self.assertEqual(command.direction, Direction.COMMAND)
+        self.assertEqual(command.data, bytes.fromhex("e0010000"))
+        self.assertEqual(response.direction, Direction.RESPONSE)
+        self.assertEqual(response.data, bytes.fromhex("0102"))
+        self.assertEqual(response.status, 0x9000)
+        self.assertGreater(response.latency, 0.005)
+        self.assertLessEqual(command.timestamp, response.timestamp)
+
+    def test_background_flush(self):
+        recorder = ApduTraceRecorder(self.path, buffer_size=1, flush_interval=10)
+        try:
+            recorder.record_command(b"\x00" * 4)
+            for _ in range(100):
+                if len(list(read_trace(self.path))) == 1:
+                    break
+                sleep(0.01)
+            self.assertEqual(len(list(read_trace(self.path))), 1)
+        finally:
+            recorder.close()
+
+    def test_flush(self):
+        with ApduTraceRecorder(self.path, flush_interval=10) as recorder:
+            recorder.record_command(b"\x00" * 4)
+            recorder.flush()
+            self.assertEqual(len(list(read_trace(self.path))), 1)
+
+    def test_order_kept(self):
+        with ApduTraceRecorder(self.path, buffer_size=64) as recorder:
+            for index in range(500):
+                recorder.record_command(index.to_bytes(2, "big"))
+        self.assertEqual([int.from_bytes(r.data, "big") for r in read_trace(self.path)],
+                         list(range(500)))
+
+    def test_record_after_close(self):
+        recorder = ApduTraceRecorder(self.path)
+        recorder.close()
+        with self.assertRaises(ValueError):
+            recorder.record_command(b"\x00" * 4)
+        with self.assertRaises(ValueError):
+            recorder.record_response(RAPDU(0x9000, b""))
+
+    def test_convert_trace_to_text(self):
+        with ApduTraceRecorder(self.path) as recorder:
+            recorder.record_command(bytes.fromhex("e0010000"))
+            recorder.record_response(RAPDU(0x6985, b""))
+        text_path = Path(self.dir.name) / "apdu.log"
+        self.assertEqual(convert_trace_to_text(self.path, text_path), 2)
+        self.assertEqual(text_path.read_text().splitlines(), ["=> e0010000", "<= 6985"])
+
+    def test_read_trace_errors(self):
+        self.path.write_bytes(b"not a trace")
+        with self.assertRaises(ValueError):
+            list(read_trace(self.path))
+        with ApduTraceRecorder(self.path) as recorder:
+            recorder.record_command(bytes.fromhex("e0010000"))
+        self.path.write_bytes(self.path.read_bytes()[:-1])
+        with self.assertRaises(ValueError):
+            list(read_trace(self.path))
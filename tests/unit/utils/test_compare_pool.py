@@ -0,0 +1,105 @@
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from PIL import Image
+
+from ragger.utils import Crop
+from ragger.utils.compare_pool import CompareJob, ComparePool, SnapshotMismatchError, \
+    run_compare_job
+from ragger.utils.image_diff import ImageComparator
+from ragger.utils.snapshot_bundle import SNAPSHOT_BUNDLES, pack_snapshots
+
+from .test_screenshot import make_png
+
+
+class TestCompareJob(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.golden = self.path / "00000.png"
+        self.golden.write_bytes(make_png((1, 2, 3)).getvalue())
+
+    def tearDown(self):
+        SNAPSHOT_BUNDLES.clear()
+        self.directory.cleanup()
+
+    def test_run(self):
+        tmp = self.path / "tmp.png"
+        screenshot = make_png((1, 2, 3)).getvalue()
+        job = CompareJob.create(3, screenshot, self.golden, tmp)
+        self.assertEqual(job.golden_path, str(self.golden))
+        self.assertEqual(run_compare_job(job), (3, True))
+        self.assertEqual(tmp.read_bytes(), screenshot)
+
+    def test_run_mismatch(self):
+        job = CompareJob.create(0, make_png((1, 2, 4)).getvalue(), self.golden)
+        self.assertEqual(run_compare_job(job), (0, False))
+
+    def test_run_cropped(self):
+        image = Image.new("RGB", (8, 4), (1, 2, 3))
+        image.paste((9, 9, 9), (0, 2, 8, 4))
+        screenshot = BytesIO()
+        image.save(screenshot, format="PNG")
+        job = CompareJob.create(0, screenshot.getvalue(), self.golden)
+        self.assertEqual(run_compare_job(job), (0, False))
+        job = CompareJob.create(0, screenshot.getvalue(), self.golden, crop=Crop(lower=2))
+        self.assertEqual(run_compare_job(job), (0, True))
+
+    def test_run_comparator(self):
+        job = CompareJob.create(0,
+                                make_png((1, 2, 4)).getvalue(),
+                                self.golden,
+                                comparator=ImageComparator(tolerance=2))
+        self.assertEqual(run_compare_job(job), (0, True))
+
+    def test_create_bundled_golden(self):
+        SNAPSHOT_BUNDLES.open(pack_snapshots(self.path), self.path)
+        self.golden.unlink()
+        job = CompareJob.create(0, make_png((1, 2, 3)).getvalue(), self.golden)
+        self.assertIsNone(job.golden_path)
+        self.assertIsNotNone(job.golden)
+        self.assertEqual(run_compare_job(job), (0, True))
+
+
+class TestComparePool(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.pool = ComparePool(workers=1)
+
+    def tearDown(self):
+        self.pool.close()
+        self.directory.cleanup()
+
+    def submit(self, index, golden_color, color):
+        golden = self.path / f"{index}.png"
+        golden.write_bytes(make_png(golden_color).getvalue())
+        job = CompareJob.create(index,
+                                make_png(color).getvalue(), golden, self.path / f"tmp-{index}.png")
+        return job, self.pool.submit(job)
+
+    def test_check(self):
+        jobs = [self.submit(0, (1, 2, 3), (1, 2, 3)), self.submit(1, (4, 5, 6), (4, 5, 6))]
+        ComparePool.check(jobs)
+        self.assertTrue((self.path / "tmp-1.png").is_file())
+
+    def test_check_reports_all_failures(self):
+        jobs = [
+            self.submit(0, (1, 2, 3), (1, 2, 4)),
+            self.submit(1, (4, 5, 6), (4, 5, 6)),
+            self.submit(2, (7, 8, 9), (7, 8, 0))
+        ]
+        with self.assertRaises(SnapshotMismatchError) as error:
+            ComparePool.check(jobs)
+        self.assertEqual(error.exception.indexes, [0, 2])
+        self.assertIsInstance(error.exception, AssertionError)
+
+    def test_check_missing_golden(self):
+        job = CompareJob.create(0, make_png((1, 2, 3)).getvalue(), self.path / "missing.png")
+        with self.assertRaises(SnapshotMismatchError) as error:
+            ComparePool.check([(job, self.pool.submit(job))])
+        self.assertIn("FileNotFoundError", error.exception.failures[0][1])
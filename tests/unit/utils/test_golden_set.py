@@ -0,0 +1,86 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ragger.utils import Crop
+from ragger.utils.golden_set import GoldenSet
+from ragger.utils.image_diff import ImageComparator
+from ragger.utils.screenshot import GoldenCache
+from ragger.utils.snapshot_store import SNAPSHOT_STORES
+
+from .test_screenshot import make_png
+
+
+class TestGoldenSet(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def golden(self, name, color) -> Path:
+        path = self.path / name
+        path.write_bytes(make_png(color).getvalue())
+        return path
+
+    def test_match(self):
+        goldens = GoldenSet(
+            {
+                "first": self.golden("first.png", (1, 2, 3)),
+                "second": self.golden("second.png", (4, 5, 6))
+            },
+            cache=GoldenCache())
+        self.assertEqual(len(goldens), 2)
+        self.assertEqual(goldens.keys(), ["first", "second"])
+        self.assertEqual(goldens.match(make_png((4, 5, 6))), "second")
+        self.assertEqual(goldens.match(make_png((1, 2, 3))), "first")
+        self.assertIsNone(goldens.match(make_png((1, 2, 4))))
+
+    def test_match_identical_goldens_first_key_wins(self):
+        goldens = GoldenSet(
+            {
+                0: self.golden("first.png", (1, 2, 3)),
+                1: self.golden("second.png", (1, 2, 3))
+            },
+            cache=GoldenCache())
+        self.assertEqual(goldens.match(make_png((1, 2, 3))), 0)
+
+    def test_match_cropped(self):
+        goldens = GoldenSet({"golden": self.golden("golden.png", (1, 2, 3))},
+                            crop=Crop(left=2),
+                            cache=GoldenCache())
+        self.assertEqual(goldens.match(make_png((1, 2, 3))), "golden")
+
+    def test_match_comparator(self):
+        goldens = GoldenSet(
+            {
+                "first": self.golden("first.png", (1, 2, 3)),
+                "second": self.golden("second.png", (100, 100, 100))
+            },
+            cache=GoldenCache())
+        self.assertIsNone(goldens.match(make_png((101, 100, 100))))
+        self.assertEqual(goldens.match(make_png((101, 100, 100)), ImageComparator(tolerance=1)),
+                         "second")
+
+    def test_goldens_decoded_once(self):
+        cache = GoldenCache()
+        path = self.golden("golden.png", (1, 2, 3))
+        GoldenSet({"first": path}, cache=cache)
+        GoldenSet({"second": path}, cache=cache)
+        self.assertEqual(len(cache), 1)
+
+    def test_missing_golden_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            GoldenSet({"missing": self.path / "missing.png"}, cache=GoldenCache())
+
+    def test_snapshot_store_golden(self):
+        store = SNAPSHOT_STORES.open(self.path / "nanos")
+        try:
+            golden = self.path / "nanos" / "test" / "00000.png"
+            store.add(golden, make_png((1, 2, 3)))
+            goldens = GoldenSet({"golden": golden}, cache=GoldenCache())
+            self.assertEqual(goldens.match(make_png((1, 2, 3))), "golden")
+        finally:
+            SNAPSHOT_STORES.clear()
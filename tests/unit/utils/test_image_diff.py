@@ -0,0 +1,103 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from PIL import Image
+
+from ragger.utils.image_diff import ImageComparator, Region, diff_with_golden, to_array
+from ragger.utils.screenshot import Frame, GoldenCache, compare_with_golden
+
+from .test_screenshot import make_png
+
+
+def frame(color=(0, 0, 0), size=(8, 4), pixels=dict()) -> Frame:
+    image = Image.new("RGB", size, color)
+    for position, value in pixels.items():
+        image.putpixel(position, value)
+    return Frame(image.size, image.tobytes())
+
+
+class TestImageComparator(TestCase):
+
+    def test_to_array(self):
+        array = to_array(frame(pixels={(7, 0): (1, 2, 3)}))
+        self.assertEqual(array.shape, (4, 8, 3))
+        self.assertEqual(tuple(array[0, 7]), (1, 2, 3))
+
+    def test_exact(self):
+        comparator = ImageComparator()
+        self.assertTrue(comparator.exact)
+        self.assertTrue(comparator(frame(), frame()))
+        self.assertFalse(comparator(frame(), frame(pixels={(0, 0): (0, 0, 1)})))
+        self.assertFalse(comparator(frame(), frame(size=(4, 8))))
+
+    def test_tolerance(self):
+        comparator = ImageComparator(tolerance=10)
+        self.assertTrue(comparator(frame(), frame(pixels={(0, 0): (10, 0, 250 - 245)})))
+        self.assertFalse(comparator(frame(), frame(pixels={(0, 0): (0, 11, 0)})))
+        # Differences are computed in both directions
+        self.assertTrue(comparator(frame((20, 20, 20)), frame((10, 30, 20))))
+
+    def test_max_differing_pixels(self):
+        comparator = ImageComparator(max_differing_pixels=1)
+        self.assertTrue(comparator(frame(), frame(pixels={(0, 0): (255, 0, 0)})))
+        self.assertFalse(
+            comparator(frame(), frame(pixels={
+                (0, 0): (255, 0, 0),
+                (1, 0): (255, 0, 0)
+            })))
+
+    def test_masks(self):
+        comparator = ImageComparator(masks=[Region(0, 0, 2, 2), Region(6, 3, 8, 4)])
+        golden = frame(pixels={(1, 1): (255, 0, 0), (7, 3): (0, 255, 0)})
+        self.assertTrue(comparator(frame(), golden))
+        self.assertFalse(comparator(frame(), frame(pixels={(2, 2): (255, 0, 0)})))
+
+    def test_diff(self):
+        comparator = ImageComparator(tolerance=5)
+        result = comparator.diff(frame(), frame(pixels={(0, 0): (200, 0, 0), (1, 0): (3, 0, 0)}))
+        self.assertFalse(result.equal)
+        self.assertEqual(result.differing_pixels, 1)
+        self.assertEqual(result.max_delta, 200)
+        self.assertEqual(result.delta.shape, (4, 8))
+        heatmap = result.heatmap()
+        self.assertEqual(heatmap.size, (8, 4))
+        self.assertEqual(heatmap.getpixel((0, 0)), (228, 0, 0))
+        self.assertEqual(heatmap.getpixel((1, 0)), (0, 0, 0))
+        with self.assertRaises(ValueError):
+            comparator.diff(frame(), frame(size=(4, 8)))
+
+    def test_match(self):
+        goldens = [frame((idx, 0, 0)) for idx in range(0, 200, 5)] + [frame(size=(4, 8))]
+        self.assertEqual(ImageComparator().match(frame((50, 0, 0)), goldens), 10)
+        self.assertIsNone(ImageComparator().match(frame((51, 0, 0)), goldens))
+        self.assertEqual(ImageComparator(tolerance=2).match(frame((152, 0, 0)), goldens), 30)
+        self.assertIsNone(ImageComparator().match(frame(size=(1, 1)), goldens))
+
+
+class TestCompareWithGolden(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.golden = Path(self.directory.name) / "golden.png"
+        self.golden.write_bytes(make_png((100, 100, 100)).getvalue())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_compare_with_golden_comparator(self):
+        cache = GoldenCache()
+        screenshot = make_png((104, 100, 100))
+        self.assertFalse(compare_with_golden(screenshot, self.golden, cache=cache))
+        self.assertTrue(
+            compare_with_golden(screenshot,
+                                self.golden,
+                                cache=cache,
+                                comparator=ImageComparator(tolerance=4)))
+
+    def test_diff_with_golden(self):
+        result = diff_with_golden(make_png((104, 100, 100)), self.golden, ImageComparator())
+        self.assertEqual(result.differing_pixels, 32)
+        output = Path(self.directory.name) / "diff.png"
+        result.save_heatmap(output)
+        self.assertTrue(output.is_file())
@@ -1,4 +1,5 @@
 import os
+import socket
 from contextlib import contextmanager
 from pathlib import Path
 from tempfile import mkdtemp
@@ -60,6 +61,18 @@ class TestMisc(TestCase):
             with self.assertRaises(ValueError):
                 misc.find_project_root_dir(nested_dir)
 
+    def test_find_free_port(self):
+        port = misc.find_free_port()
+        self.assertGreater(port, 0)
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", port))
+
+    def test_find_free_ports(self):
+        ports = misc.find_free_ports(3)
+        self.assertEqual(len(set(ports)), 3)
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", ports[0]))
+
     def test_prefix_with_len(self):
         buffer = bytes.fromhex("0123456789")
         self.assertEqual(b"\x05" + buffer, misc.prefix_with_len(buffer))
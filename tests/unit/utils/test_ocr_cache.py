@@ -0,0 +1,90 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Event
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from ragger.utils.ocr_cache import OcrCache
+
+from .test_screenshot import make_png
+
+
+class TestOcrCache(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.ocr = MagicMock(return_value=["Review", "transaction"])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def snapshot(self, name, color=(255, 255, 255)) -> Path:
+        path = self.path / name
+        path.write_bytes(make_png(color).getvalue())
+        return path
+
+    def test_texts_recognized_once(self):
+        cache = OcrCache(ocr=self.ocr)
+        first, second = self.snapshot("first.png"), self.snapshot("second.png")
+        self.assertEqual(cache.texts(first), ["Review", "transaction"])
+        self.assertTrue(cache.contains(first, "transact"))
+        self.assertFalse(cache.contains(first, "Approve"))
+        # Same content, other file
+        self.assertTrue(cache.contains(second, "Review"))
+        self.ocr.assert_called_once()
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_invert(self):
+        cache = OcrCache(ocr=self.ocr)
+        path = self.snapshot("snap.png", (255, 255, 255))
+        cache.texts(path, invert=True)
+        self.assertEqual(self.ocr.call_args[0][0].getpixel((0, 0)), (0, 0, 0))
+        # Inverted and plain recognitions are cached separately
+        cache.texts(path)
+        self.assertEqual(self.ocr.call_count, 2)
+
+    def test_lru(self):
+        cache = OcrCache(max_entries=1, ocr=self.ocr)
+        first, second = self.snapshot("first.png", (1, 1, 1)), self.snapshot("second.png")
+        cache.texts(first)
+        cache.texts(second)
+        self.assertEqual(len(cache), 1)
+        cache.texts(first)
+        self.assertEqual(self.ocr.call_count, 3)
+
+    def test_persisted_on_disk(self):
+        path = self.snapshot("snap.png")
+        OcrCache(self.path / "cache", ocr=self.ocr).texts(path)
+        self.assertEqual(len(list((self.path / "cache").glob("*.json"))), 1)
+        other_ocr = MagicMock(return_value=[])
+        self.assertEqual(
+            OcrCache(self.path / "cache", ocr=other_ocr).texts(path), ["Review", "transaction"])
+        other_ocr.assert_not_called()
+
+    def test_prewarm(self):
+        cache = OcrCache(workers=2, ocr=self.ocr)
+        paths = [self.snapshot(f"{idx}.png", (idx, 0, 0)) for idx in range(4)]
+        cache.wait(cache.prewarm(paths))
+        self.assertEqual(self.ocr.call_count, 4)
+        self.assertTrue(cache.contains(paths[2], "Review"))
+        self.assertEqual(self.ocr.call_count, 4)
+        cache.close()
+
+    def test_pending_recognition_waited_for(self):
+        started, release = Event(), Event()
+
+        def slow_ocr(image):
+            started.set()
+            release.wait(5)
+            return ["slow"]
+
+        cache = OcrCache(ocr=MagicMock(side_effect=slow_ocr))
+        path = self.snapshot("snap.png")
+        futures = cache.prewarm([path])
+        started.wait(5)
+        release.set()
+        self.assertEqual(cache.texts(path), ["slow"])
+        cache.wait(futures)
+        cache._ocr.assert_called_once()
+        cache.close()
@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ragger.navigator import NavInsID
+from ragger.utils.profiler import NavigationProfiler, PhaseStats, NO_INSTRUCTION, \
+    profile_instruction, profile_phase
+
+
+class TestPhaseStats(TestCase):
+
+    def test_add_merge(self):
+        stats = PhaseStats()
+        self.assertEqual(stats.mean, 0.0)
+        stats.add(1.0)
+        stats.add(3.0)
+        other = PhaseStats()
+        other.add(4.0)
+        stats.merge(other)
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.total, 8.0)
+        self.assertEqual(stats.maximum, 4.0)
+
+
+class TestNavigationProfiler(TestCase):
+
+    def setUp(self):
+        self.profiler = NavigationProfiler()
+        with self.profiler.test("test_a"):
+            with self.profiler.instruction(NavInsID.RIGHT_CLICK):
+                self.profiler.record("callback", 0.1)
+                self.profiler.record("settle", 0.2)
+            with self.profiler.instruction(NavInsID.BOTH_CLICK):
+                self.profiler.record("callback", 0.3)
+        with self.profiler.test("test_b"):
+            with self.profiler.instruction(NavInsID.RIGHT_CLICK):
+                self.profiler.record("callback", 0.5)
+            self.profiler.record("comparison", 1.0)
+
+    def test_per_instruction(self):
+        result = self.profiler.per_instruction()
+        self.assertEqual(set(result), {"RIGHT_CLICK", "BOTH_CLICK", NO_INSTRUCTION})
+        self.assertEqual(result["RIGHT_CLICK"]["callback"].count, 2)
+        self.assertAlmostEqual(result["RIGHT_CLICK"]["callback"].total, 0.6)
+        self.assertEqual(result[NO_INSTRUCTION]["comparison"].count, 1)
+
+    def test_per_test(self):
+        result = self.profiler.per_test()
+        self.assertEqual(set(result), {"test_a", "test_b"})
+        self.assertAlmostEqual(result["test_a"]["callback"].total, 0.4)
+        self.assertAlmostEqual(result["test_b"]["comparison"].total, 1.0)
+
+    def test_phase(self):
+        profiler = NavigationProfiler()
+        with profile_instruction(profiler, "custom"):
+            with profile_phase(profiler, "write"):
+                pass
+        self.assertEqual(profiler.per_instruction()["custom"]["write"].count, 1)
+
+    def test_no_profiler(self):
+        with profile_instruction(None, "custom"):
+            with profile_phase(None, "write"):
+                pass
+
+    def test_dump_json(self):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "profile.json"
+            self.profiler.dump_json(path)
+            content = json.loads(path.read_text())
+        self.assertEqual(content["per_instruction"]["BOTH_CLICK"]["callback"]["count"], 1)
+        self.assertAlmostEqual(content["per_test"]["test_b"]["comparison"]["max"], 1.0)
+
+    def test_summary(self):
+        lines = self.profiler.summary(slowest_tests=1)
+        self.assertTrue(lines[0].startswith("instruction"))
+        # Slowest instruction first
+        self.assertTrue(lines[1].startswith(NO_INSTRUCTION))
+        self.assertTrue(lines[-1].endswith("test_b"))
+        self.assertEqual(len([line for line in lines if "test_a" in line]), 0)
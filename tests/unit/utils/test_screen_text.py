@@ -0,0 +1,76 @@
+import re
+from unittest import TestCase
+
+from ragger.utils.screen_text import ScreenText, TextEvent
+
+EVENTS = [{
+    "text": "Review",
+    "x": 41,
+    "y": 3
+}, {
+    "text": "transaction",
+    "x": 29,
+    "y": 17
+}, {
+    "text": "Amount",
+    "x": 0,
+    "y": 40
+}, {
+    "text": "BTC 0.00014",
+    "x": 0,
+    "y": 54
+}]
+
+
+class TestScreenText(TestCase):
+
+    def setUp(self):
+        self.screen = ScreenText(EVENTS)
+
+    def test_events(self):
+        self.assertEqual(len(self.screen), 4)
+        self.assertEqual(self.screen.events[0], TextEvent("Review", 41, 3))
+        self.assertEqual(self.screen.texts, ["Review", "transaction", "Amount", "BTC 0.00014"])
+        self.assertEqual(self.screen.to_dict(), {"events": EVENTS})
+
+    def test_contains(self):
+        self.assertIn("transact", self.screen)
+        self.assertTrue(self.screen.contains("BTC"))
+        # A substring never spans two texts
+        self.assertFalse(self.screen.contains("Reviewtransaction"))
+
+    def test_has(self):
+        self.assertTrue(self.screen.has("Amount"))
+        self.assertFalse(self.screen.has("Amoun"))
+
+    def test_find(self):
+        self.assertEqual(self.screen.find("a"), [self.screen.events[1]])
+        self.assertEqual(self.screen.find("Amount", exact=True), [self.screen.events[2]])
+        self.assertEqual(self.screen.find("mount", exact=True), [])
+
+    def test_search(self):
+        self.assertEqual(self.screen.search(r"BTC \d+\.\d+"), self.screen.events[3])
+        self.assertEqual(self.screen.search(re.compile("^amount$", re.IGNORECASE)),
+                         self.screen.events[2])
+        self.assertIsNone(self.screen.search("ETH"))
+
+    def test_in_region(self):
+        self.assertEqual(self.screen.in_region(upper=32).texts, ["Amount", "BTC 0.00014"])
+        self.assertEqual(self.screen.in_region(left=10, lower=17).texts, ["Review"])
+        self.assertFalse(self.screen.in_region(lower=32).contains("BTC"))
+
+    def test_multi_pattern(self):
+        self.assertEqual(self.screen.missing(["Review", "Fees", "0.00014", "Address"]),
+                         ["Fees", "Address"])
+        self.assertTrue(self.screen.contains_all(["Review", "Amount"]))
+        self.assertFalse(self.screen.contains_all(["Review", "Fees"]))
+        self.assertTrue(self.screen.contains_any(["Fees", "Amount"]))
+        self.assertFalse(self.screen.contains_any(["Fees", "Address"]))
+
+    def test_serialized(self):
+        self.assertIn('"text": "Review"', self.screen.serialized)
+        self.assertIs(self.screen.serialized, self.screen.serialized)
+
+    def test_equality(self):
+        self.assertEqual(self.screen, ScreenText(list(EVENTS)))
+        self.assertNotEqual(self.screen, ScreenText(EVENTS[1:]))
@@ -0,0 +1,76 @@
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from PIL import Image
+
+from ragger.utils import Crop
+from ragger.utils.screenshot import GoldenCache, compare_with_golden, decode_frame
+
+
+def make_png(color, size=(8, 4)) -> BytesIO:
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer
+
+
+class TestScreenshot(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_golden(self, name, color, size=(8, 4)) -> Path:
+        path = self.path / name
+        path.write_bytes(make_png(color, size).getvalue())
+        return path
+
+    def test_decode_frame_crop(self):
+        frame = decode_frame(make_png((1, 2, 3)), Crop(left=2, lower=1))
+        self.assertEqual(frame.size, (6, 3))
+        self.assertEqual(frame.pixels, bytes([1, 2, 3]) * 18)
+
+    def test_frame_digest(self):
+        self.assertEqual(
+            decode_frame(make_png((1, 2, 3))).digest,
+            decode_frame(make_png((1, 2, 3))).digest)
+        self.assertNotEqual(
+            decode_frame(make_png((1, 2, 3))).digest,
+            decode_frame(make_png((1, 2, 3), (4, 8))).digest)
+
+    def test_cache_hit(self):
+        cache = GoldenCache()
+        golden = self.write_golden("golden.png", (0, 0, 0))
+        self.assertTrue(compare_with_golden(make_png((0, 0, 0)), golden, cache=cache))
+        self.assertFalse(compare_with_golden(make_png((0, 0, 1)), golden, cache=cache))
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+        self.assertEqual(len(cache), 1)
+
+    def test_cache_invalidated_on_rewrite(self):
+        cache = GoldenCache()
+        golden = self.write_golden("golden.png", (0, 0, 0))
+        self.assertTrue(compare_with_golden(make_png((0, 0, 0)), golden, cache=cache))
+        golden = self.write_golden("golden.png", (0, 0, 1), (4, 4))
+        self.assertTrue(compare_with_golden(make_png((0, 0, 1), (4, 4)), golden, cache=cache))
+        self.assertEqual(cache.misses, 2)
+
+    def test_cache_eviction(self):
+        # one 8x4 RGB frame is 96 bytes
+        cache = GoldenCache(max_bytes=200)
+        goldens = [self.write_golden(f"{i}.png", (i, i, i)) for i in range(3)]
+        for golden in goldens:
+            cache.get(golden)
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.size, 200)
+        cache.get(goldens[0])
+        self.assertEqual(cache.misses, 4)
+        cache.clear()
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+    def test_missing_golden_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            GoldenCache().get(self.path / "missing.png")
@@ -0,0 +1,69 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from ragger.utils.session_trace import COMMAND, FRAMES_DIR, INPUT, RECORDS_NAME, RESPONSE, \
+    SCREEN, Session, SessionRecorder
+
+
+class TestSessionTrace(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name) / "session"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_record_and_load(self):
+        content = MagicMock(return_value={"events": [{"text": "Home", "x": 0, "y": 0}]})
+        with SessionRecorder(self.path) as recorder:
+            self.assertTrue(recorder.record_screen(b"home", content))
+            recorder.record_command(bytes.fromhex("e001000000"))
+            recorder.record_response(0x9000, b"\x01\x02")
+            recorder.record_input("finger_touch", 10, 20)
+            self.assertTrue(recorder.record_screen(b"review", content))
+            # Same screen again: not recorded
+            self.assertFalse(recorder.record_screen(b"review", content))
+            self.assertTrue(recorder.record_screen(b"home", content))
+            self.assertEqual(len(recorder), 6)
+        # Screen content only retrieved for recorded screens
+        self.assertEqual(content.call_count, 3)
+        self.assertEqual(len(list((self.path / FRAMES_DIR).iterdir())), 2)
+
+        session = Session.load(self.path)
+        self.assertEqual([record.kind for record in session.records],
+                         [SCREEN, COMMAND, RESPONSE, INPUT, SCREEN, SCREEN])
+        self.assertEqual(session.records[1].data, bytes.fromhex("e001000000"))
+        self.assertEqual((session.records[2].status, session.records[2].data),
+                         (0x9000, b"\x01\x02"))
+        self.assertEqual((session.records[3].action, session.records[3].args),
+                         ("finger_touch", (10, 20)))
+        self.assertEqual(session.frames[session.records[4].frame], b"review")
+        self.assertEqual(session.records[0].content["events"][0]["text"], "Home")
+
+    def test_reopen(self):
+        with SessionRecorder(self.path) as recorder:
+            recorder.record_command(b"\x01")
+        with self.assertRaises(ValueError):
+            recorder.record_command(b"\x02")
+        recorder.reopen()
+        recorder.record_command(b"\x03")
+        recorder.close()
+        self.assertEqual([record.data for record in Session.load(self.path).records],
+                         [b"\x01", b"\x03"])
+
+    def test_load_nok(self):
+        self.path.mkdir()
+        (self.path / RECORDS_NAME).write_text('{"version": 0}\n')
+        with self.assertRaises(ValueError):
+            Session.load(self.path)
+
+    def test_load_missing_frame(self):
+        with SessionRecorder(self.path) as recorder:
+            recorder.record_screen(b"home", dict)
+        for frame in (self.path / FRAMES_DIR).iterdir():
+            frame.unlink()
+        with self.assertRaises(ValueError):
+            Session.load(self.path)
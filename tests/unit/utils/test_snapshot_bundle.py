@@ -0,0 +1,84 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ragger.utils.screenshot import GoldenCache
+from ragger.utils.snapshot_bundle import SnapshotBundle, SnapshotBundleRegistry, pack_snapshots, \
+    unpack_snapshots
+
+from .test_screenshot import make_png
+
+
+class TestSnapshotBundle(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.snapshots = self.path / "nanos"
+        for test, colors in (("first", ((1, 2, 3), (4, 5, 6))), ("second", ((1, 2, 3), ))):
+            (self.snapshots / test).mkdir(parents=True)
+            for idx, color in enumerate(colors):
+                (self.snapshots / test / f"{idx:05}.png").write_bytes(make_png(color).getvalue())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_pack_dedups_frames(self):
+        bundle_path = pack_snapshots(self.snapshots)
+        self.assertEqual(bundle_path, self.path / "nanos.bundle")
+        with SnapshotBundle(bundle_path) as bundle:
+            self.assertEqual(len(bundle), 3)
+            self.assertEqual(bundle.unique_frames, 2)
+            self.assertEqual(sorted(bundle.names()),
+                             ["first/00000.png", "first/00001.png", "second/00000.png"])
+            self.assertEqual(bundle.digest("first/00000.png"), bundle.digest("second/00000.png"))
+            self.assertEqual(bundle.read("first/00001.png"),
+                             (self.snapshots / "first" / "00001.png").read_bytes())
+            self.assertEqual(bundle.relative_name(self.snapshots / "second" / "00000.png"),
+                             "second/00000.png")
+            self.assertIsNone(bundle.relative_name(self.snapshots / "second" / "00001.png"))
+            self.assertIsNone(bundle.relative_name(self.path / "other" / "00000.png"))
+
+    def test_not_a_bundle_raises(self):
+        path = self.path / "nanos.bundle"
+        path.write_bytes(b"\x00" * 32)
+        with self.assertRaises(ValueError):
+            SnapshotBundle(path)
+
+    def test_unpack_round_trip(self):
+        bundle_path = pack_snapshots(self.snapshots)
+        output = self.path / "unpacked"
+        self.assertEqual(unpack_snapshots(bundle_path, output), 3)
+        for image in self.snapshots.rglob("*.png"):
+            self.assertEqual((output / image.relative_to(self.snapshots)).read_bytes(),
+                             image.read_bytes())
+
+    def test_registry_reopens_changed_bundle(self):
+        registry = SnapshotBundleRegistry()
+        bundle_path = pack_snapshots(self.snapshots)
+        bundle = registry.open(bundle_path)
+        self.assertIs(registry.open(bundle_path), bundle)
+        (self.snapshots / "third").mkdir()
+        (self.snapshots / "third" / "00000.png").write_bytes(make_png((7, 8, 9)).getvalue())
+        pack_snapshots(self.snapshots)
+        reopened = registry.open(bundle_path)
+        self.assertIsNot(reopened, bundle)
+        self.assertEqual(len(reopened), 4)
+        registry.clear()
+
+    def test_golden_cache_reads_from_bundle(self):
+        registry = SnapshotBundleRegistry()
+        registry.open(pack_snapshots(self.snapshots))
+        cache = GoldenCache(bundles=registry)
+        golden = self.snapshots / "first" / "00001.png"
+        expected = cache.get(golden)
+        # The directory is no longer needed
+        for image in self.snapshots.rglob("*.png"):
+            image.unlink()
+        self.assertEqual(registry.lookup(golden)[1], "first/00001.png")
+        self.assertEqual(cache.get(golden), expected)
+        self.assertEqual(cache.get(golden), expected)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        with self.assertRaises(FileNotFoundError):
+            cache.get(self.snapshots / "first" / "00002.png")
+        registry.clear()
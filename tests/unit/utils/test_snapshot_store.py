@@ -0,0 +1,97 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ragger.utils import Crop
+from ragger.utils.screenshot import GoldenCache
+from ragger.utils.snapshot_store import MANIFEST_NAME, SnapshotStore, SnapshotStoreRegistry, \
+    convert_from_store, convert_to_store, is_snapshot_store
+
+from .test_screenshot import make_png
+
+
+class TestSnapshotStore(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.root = Path(self.directory.name) / "nanos"
+        self.store = SnapshotStore(self.root)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_add_stores_unique_frames(self):
+        first = self.store.add(self.root / "first" / "00000.png", make_png((1, 2, 3)))
+        second = self.store.add(self.root / "second" / "00000.png", make_png((1, 2, 3)))
+        other = self.store.add(self.root / "second" / "00001.png", make_png((4, 5, 6)))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(list(self.store.frames_dir.iterdir())), 2)
+        self.assertEqual(self.store.manifest(self.root / "second"), {
+            "00000.png": first,
+            "00001.png": other
+        })
+        self.assertEqual(self.store.digest(self.root / "first" / "00000.png"), first)
+        self.assertIsNone(self.store.digest(self.root / "first" / "00001.png"))
+        self.assertFalse((self.root / "first" / "00000.png").exists())
+
+    def test_compare_short_circuits_on_hash(self):
+        golden = self.root / "test" / "00000.png"
+        digest = self.store.add(golden, make_png((1, 2, 3)))
+        cache = GoldenCache()
+        self.assertTrue(self.store.compare(make_png((1, 2, 3)), golden, cache=cache))
+        self.assertFalse(self.store.compare(make_png((1, 2, 4)), golden, cache=cache))
+        # Neither comparison needed the golden image
+        self.assertEqual(len(cache), 0)
+        self.store.frame_path(digest).unlink()
+        self.assertTrue(self.store.compare(make_png((1, 2, 3)), golden, cache=cache))
+
+    def test_compare_cropped(self):
+        golden = self.root / "test" / "00000.png"
+        self.store.add(golden, make_png((1, 2, 3)))
+        crop = Crop(left=1)
+        cache = GoldenCache()
+        self.assertTrue(self.store.compare(make_png((1, 2, 3)), golden, crop, cache))
+        self.assertFalse(self.store.compare(make_png((1, 2, 4)), golden, crop, cache))
+        self.assertEqual(len(cache), 1)
+
+    def test_compare_unreferenced_golden(self):
+        golden = self.root / "test" / "00000.png"
+        golden.parent.mkdir(parents=True)
+        golden.write_bytes(make_png((1, 2, 3)).getvalue())
+        self.assertTrue(self.store.compare(make_png((1, 2, 3)), golden, cache=GoldenCache()))
+
+    def test_convert_round_trip(self):
+        images = {
+            "first/00000.png": make_png((1, 2, 3)).getvalue(),
+            "first/00001.png": make_png((4, 5, 6)).getvalue(),
+            "second/00000.png": make_png((1, 2, 3)).getvalue(),
+            "group/nested/00000.png": make_png((7, 8, 9)).getvalue(),
+        }
+        for name, content in images.items():
+            (self.root / name).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / name).write_bytes(content)
+        self.assertFalse(is_snapshot_store(self.root))
+        self.assertEqual(convert_to_store(self.root), (4, 3))
+        self.assertTrue(is_snapshot_store(self.root))
+        self.assertEqual(list(self.root.glob("[!.]*/**/*.png")), [])
+        self.assertTrue((self.root / "first" / MANIFEST_NAME).is_file())
+        self.assertTrue((self.root / "group" / "nested" / MANIFEST_NAME).is_file())
+
+        self.assertEqual(convert_from_store(self.root), 4)
+        self.assertFalse(is_snapshot_store(self.root))
+        for name, content in images.items():
+            self.assertEqual((self.root / name).read_bytes(), content)
+        self.assertFalse((self.root / "first" / MANIFEST_NAME).exists())
+        self.assertFalse((self.root / "group" / "nested" / MANIFEST_NAME).exists())
+
+    def test_registry_lookup(self):
+        registry = SnapshotStoreRegistry()
+        self.assertIsNone(registry.lookup(self.root / "test" / "00000.png"))
+        store = registry.open(self.root)
+        self.assertIs(registry.open(self.root), store)
+        self.assertIs(registry.lookup(self.root / "test" / "00000.png"), store)
+        self.assertIs(registry.lookup(self.root / "group" / "test" / "00000.png"), store)
+        self.assertIsNone(registry.lookup(self.root.parent / "nanox" / "test" / "00000.png"))
+        registry.clear()
+        self.assertIsNone(registry.lookup(self.root / "test" / "00000.png"))
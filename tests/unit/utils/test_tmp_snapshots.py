@@ -0,0 +1,91 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ragger.utils.tmp_snapshots import TmpSnapshotWriter
+
+
+class TestTmpSnapshotWriter(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_save_eager(self):
+        writer = TmpSnapshotWriter()
+        writer.save(self.path / "00000.png", b"first", True)
+        writer.save(self.path / "00001.png", b"second", False)
+        self.assertEqual((self.path / "00000.png").read_bytes(), b"first")
+        self.assertEqual((self.path / "00001.png").read_bytes(), b"second")
+        self.assertEqual(writer.deferred, 0)
+
+    def test_save_lazy_flush(self):
+        writer = TmpSnapshotWriter(lazy=True)
+        writer.save(self.path / "00000.png", b"match", True)
+        writer.save(self.path / "00001.png", b"mismatch", False)
+        writer.save(self.path / "00002.png", b"unknown")
+        self.assertFalse((self.path / "00000.png").exists())
+        self.assertEqual((self.path / "00001.png").read_bytes(), b"mismatch")
+        self.assertEqual((self.path / "00002.png").read_bytes(), b"unknown")
+        self.assertEqual(writer.deferred, 1)
+        self.assertEqual(writer.flush(), 1)
+        self.assertEqual((self.path / "00000.png").read_bytes(), b"match")
+        self.assertEqual(writer.deferred, 0)
+
+    def test_save_lazy_discard(self):
+        writer = TmpSnapshotWriter(lazy=True)
+        writer.save(self.path / "00000.png", b"match", True)
+        self.assertEqual(writer.discard(), 1)
+        self.assertEqual(writer.flush(), 0)
+        self.assertFalse((self.path / "00000.png").exists())
+
+    def test_save_lazy_superseded(self):
+        writer = TmpSnapshotWriter(lazy=True)
+        writer.save(self.path / "00000.png", b"match", True)
+        writer.save(self.path / "00000.png", b"mismatch", False)
+        self.assertEqual(writer.flush(), 0)
+        self.assertEqual((self.path / "00000.png").read_bytes(), b"mismatch")
+
+    def test_invalidate(self):
+        writer = TmpSnapshotWriter(lazy=True)
+        other = self.path / "other"
+        for idx in range(3):
+            writer.save(self.path / f"{idx:05}.png", b"match", True)
+        writer.save(other / "00002.png", b"match", True)
+        self.assertEqual(writer.invalidate(self.path, 1), 2)
+        self.assertEqual(writer.deferred, 2)
+        other.mkdir()
+        self.assertEqual(writer.flush(), 2)
+        self.assertTrue((self.path / "00000.png").exists())
+        self.assertFalse((self.path / "00001.png").exists())
+        self.assertFalse((self.path / "00002.png").exists())
+        self.assertTrue((other / "00002.png").exists())
+
+    def test_invalidate_waits_for_pending_writes(self):
+        writer = TmpSnapshotWriter(workers=1)
+        for idx in range(10):
+            writer.save(self.path / f"{idx:05}.png", bytes([idx]))
+        writer.invalidate(self.path)
+        # Every write landed before the directory is cleaned up
+        for idx in range(10):
+            self.assertTrue((self.path / f"{idx:05}.png").exists())
+        writer.close()
+
+    def test_save_background(self):
+        writer = TmpSnapshotWriter(workers=2)
+        for idx in range(10):
+            writer.save(self.path / f"{idx:05}.png", bytes([idx]))
+        writer.wait()
+        for idx in range(10):
+            self.assertEqual((self.path / f"{idx:05}.png").read_bytes(), bytes([idx]))
+        writer.close()
+
+    def test_background_error_raised_on_wait(self):
+        writer = TmpSnapshotWriter(workers=1)
+        writer.save(self.path / "missing" / "00000.png", b"")
+        with self.assertRaises(FileNotFoundError):
+            writer.wait()
+        writer.close()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from statistics import mean
+from time import perf_counter
+from typing import List
+
+from ragger.backend import SpeculosBackend
+from ragger.conftest.speculos_pool import SpeculosPool
+from ragger.firmware import Firmware
+
+
+def parse_args() -> Namespace:
+    description = """
+Compares the Speculos startup cost paid by each test, with and without instances shared by the
+`SpeculosPool` (`WARM_RESET` configuration option).
+
+Each simulated test acquires a Speculos instance from the pool, takes a screenshot, then releases
+it. Without warm reset, every test starts its own instance. With warm reset, the instance is
+started once then warm reset between tests.
+"""
+    parser = ArgumentParser(description=description)
+    parser.add_argument("app", type=Path, help="The application ELF to run in Speculos")
+    parser.add_argument("--model", "-m", default="nanox", help="The emulated device model")
+    parser.add_argument("--version", "-v", default="2.0.2", help="The emulated firmware version")
+    parser.add_argument("--tests", "-n", type=int, default=10, help="The number of simulated tests")
+    return parser.parse_args()
+
+
+def run(args: Namespace, warm_reset: bool) -> List[float]:
+    firmware = Firmware(args.model, args.version)
+
+    def factory(firmware: Firmware, port: int, apdu_port: int) -> SpeculosBackend:
+        return SpeculosBackend(args.app, firmware=firmware, port=port, apdu_port=apdu_port)
+
+    pool = SpeculosPool(factory, warm_reset=warm_reset)
+    durations = list()
+    try:
+        for _ in range(args.tests):
+            start = perf_counter()
+            backend = pool.acquire(firmware)
+            durations.append(perf_counter() - start)
+            backend.capture_screenshot()
+            pool.release(backend)
+    finally:
+        pool.close()
+    return durations
+
+
+def main():
+    args = parse_args()
+    for name, warm_reset in (("per-test startup", False), ("pooled (warm reset)", True)):
+        durations = run(args, warm_reset)
+        print(f"{name:>20}: {sum(durations):7.3f}s for {len(durations)} tests "
+              f"(first {durations[0]:.3f}s, mean {mean(durations):.3f}s, "
+              f"max {max(durations):.3f}s)")
+
+
+if __name__ == "__main__":
+    main()